@@ -6,13 +6,18 @@ Collects system metrics and sends to AutoStack backend
 
 import os
 import sys
+import gzip
+import json
 import time
+import random
 import socket
 import platform
 import psutil
 import requests
+from collections import deque
 from datetime import datetime
-from typing import Dict, Optional
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
 import logging
 
 # Setup logging
@@ -23,24 +28,239 @@ logging.basicConfig(
 logger = logging.getLogger('autostack-agent')
 
 
+def _summary(values: List[float]) -> Dict[str, float]:
+    """min/max/avg/p95 (nearest rank) of a window's readings"""
+    ordered = sorted(values)
+    p95 = ordered[max(0, -(-len(ordered) * 95 // 100) - 1)]
+    return {
+        "min": ordered[0],
+        "max": ordered[-1],
+        "avg": sum(ordered) / len(ordered),
+        "p95": p95,
+    }
+
+
+class MetricsSampler:
+    """
+    Cheap, non-blocking system readings taken every few seconds.
+    
+    CPU usage is the delta since the previous reading
+    (``cpu_percent(interval=None)``) instead of sleeping for a second, and
+    network traffic is reported as per-interface byte rates from counter
+    deltas instead of cumulative totals. Readings are aggregated into one
+    sample per window by ``summarize``; the process count is taken once per
+    window, as walking the process table costs O(processes).
+    """
+    
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.readings: List[Dict] = []
+        self.window_start = clock()
+        # The first cpu_percent(None) call only primes the delta
+        psutil.cpu_percent(interval=None)
+        self._net = psutil.net_io_counters(pernic=True)
+        self._net_at = clock()
+    
+    def sample(self):
+        """Take one reading; returns immediately"""
+        now = self.clock()
+        net = psutil.net_io_counters(pernic=True)
+        elapsed = max(now - self._net_at, 1e-6)
+        rates = {}
+        for nic, counters in net.items():
+            previous = self._net.get(nic)
+            if nic == "lo" or previous is None:
+                continue
+            recv = counters.bytes_recv - previous.bytes_recv
+            sent = counters.bytes_sent - previous.bytes_sent
+            if recv < 0 or sent < 0:
+                continue  # Counter reset (interface restarted)
+            rates[nic] = (recv / elapsed, sent / elapsed)
+        self._net, self._net_at = net, now
+        
+        self.readings.append({
+            "cpu": psutil.cpu_percent(interval=None),
+            "memory": psutil.virtual_memory().percent,
+            "net": rates,
+        })
+    
+    def summarize(self) -> Optional[Dict]:
+        """Aggregate the readings since the last call into one sample"""
+        readings, self.readings = self.readings, []
+        self.window_start = self.clock()
+        if not readings:
+            return None
+        
+        interfaces: Dict[str, Dict[str, List[float]]] = {}
+        for reading in readings:
+            for nic, (recv, sent) in reading["net"].items():
+                rates = interfaces.setdefault(nic, {"in": [], "out": []})
+                rates["in"].append(recv)
+                rates["out"].append(sent)
+        network = {
+            nic: {
+                "in_bytes_per_sec": sum(rates["in"]) / len(rates["in"]),
+                "out_bytes_per_sec": sum(rates["out"]) / len(rates["out"]),
+            }
+            for nic, rates in interfaces.items()
+        }
+        cpu = _summary([reading["cpu"] for reading in readings])
+        memory = _summary([reading["memory"] for reading in readings])
+        
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "cpu_usage": cpu["avg"],
+            "memory_usage": memory["avg"],
+            "disk_usage": psutil.disk_usage('/').percent,
+            "network_in": sum(rates["in_bytes_per_sec"] for rates in network.values()),
+            "network_out": sum(rates["out_bytes_per_sec"] for rates in network.values()),
+            "readings": len(readings),
+            "cpu": cpu,
+            "memory": memory,
+            "network": network,
+            "process_count": len(psutil.pids()),
+        }
+
+
+class SampleSpool:
+    """
+    Append-only JSON-lines file holding samples that could not be uploaded,
+    so metrics survive backend outages and agent restarts.
+
+    The file is capped at ``max_bytes``; once full, new samples are dropped
+    (the oldest history is the most valuable to backfill gaps).
+    """
+    
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Uploaded samples are skipped by offset rather than rewriting the
+        # file; after a restart a partly drained spool is re-sent from the start
+        self.offset = 0
+        self._read_to = 0
+    
+    def append(self, samples: List[Dict]) -> int:
+        """Spill samples to disk; returns how many were written"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            size = self.path.stat().st_size if self.path.exists() else 0
+            written = 0
+            with self.path.open("a") as f:
+                for sample in samples:
+                    line = json.dumps(sample) + "\n"
+                    if size + len(line) > self.max_bytes:
+                        break
+                    f.write(line)
+                    size += len(line)
+                    written += 1
+            if written < len(samples):
+                logger.warning(f"Spool full, dropped {len(samples) - written} samples")
+            return written
+        except OSError as e:
+            logger.error(f"Cannot write spool {self.path}: {e}")
+            return 0
+    
+    def read(self, limit: int) -> List[Dict]:
+        """Oldest ``limit`` unsent samples, without removing them"""
+        samples = []
+        try:
+            with self.path.open("rb") as f:
+                f.seek(self.offset)
+                while len(samples) < limit:
+                    line = f.readline()
+                    if not line:
+                        break
+                    try:
+                        samples.append(json.loads(line))
+                    except ValueError:
+                        pass  # Torn write from a crash
+                self._read_to = f.tell()
+        except FileNotFoundError:
+            pass
+        return samples
+    
+    def consume(self):
+        """Mark the samples returned by the last ``read`` as uploaded"""
+        self.offset = self._read_to
+        try:
+            if self.offset >= self.path.stat().st_size:
+                # Fully drained: start over with an empty file
+                self.path.unlink()
+                self.offset = self._read_to = 0
+        except FileNotFoundError:
+            self.offset = self._read_to = 0
+    
+    def __bool__(self) -> bool:
+        try:
+            return self.path.stat().st_size > self.offset
+        except FileNotFoundError:
+            return False
+
+
 class AutoStackAgent:
-    """Monitoring agent that collects and sends system metrics"""
+    """
+    Monitoring agent that collects and sends system metrics.
     
-    def __init__(self, api_key: str, backend_url: str, interval: int = 30):
+    Readings are taken every ``sample_interval`` seconds and aggregated into
+    one sample (avg plus min/max/p95) per ``interval`` window, kept in an
+    in-memory ring buffer and uploaded as one gzip-compressed batch every
+    ``flush_interval`` seconds over a persistent HTTP session. Upload times
+    are jittered so a fleet does not report in lockstep; failed uploads back
+    off exponentially (with jitter) and spill the buffer to disk, and the
+    spool is drained oldest-first once the backend is reachable again.
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        backend_url: str,
+        interval: int = 30,
+        sample_interval: int = 5,
+        flush_interval: int = 300,
+        buffer_size: int = 1000,
+        batch_size: int = 500,
+        spool_path: Optional[Path] = None,
+        spool_max_bytes: int = 50 * 1024 * 1024,
+        max_backoff: int = 600,
+    ):
         """
         Initialize the agent
         
         Args:
             api_key: API key for authentication
             backend_url: URL of AutoStack backend
-            interval: Seconds between metric collections (default: 30)
+            interval: Seconds covered by each aggregated sample (default: 30)
+            sample_interval: Seconds between readings within a window (default: 5)
+            flush_interval: Seconds between batched uploads (default: 300)
+            buffer_size: Samples kept in memory before the oldest are spilled
+            batch_size: Maximum samples per upload request
+            spool_path: File for samples that could not be uploaded
+            spool_max_bytes: Size cap of the spool file
+            max_backoff: Upper bound of the retry delay after failed uploads
         """
         self.api_key = api_key
         self.backend_url = backend_url.rstrip('/')
         self.interval = interval
+        self.sample_interval = min(sample_interval, interval)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
         self.agent_id: Optional[str] = None
         self.hostname = socket.gethostname()
         
+        self.buffer: Deque[Dict] = deque()
+        self.buffer_size = buffer_size
+        self.spool = SampleSpool(
+            spool_path or Path.home() / ".autostack-agent" / "spool.jsonl",
+            spool_max_bytes,
+        )
+        self.failures = 0
+        self.sampler = MetricsSampler()
+        
+        # One keep-alive connection pool for every request
+        self.session = requests.Session()
+        self.session.headers.update({"X-API-Key": self.api_key})
+        
         logger.info(f"Initializing AutoStack Agent on {self.hostname}")
     
     def get_local_ip(self) -> str:
@@ -57,18 +277,21 @@ class AutoStackAgent:
     def register(self) -> bool:
         """Register agent with backend"""
         try:
+            ip = self.get_local_ip()
             data = {
+                "name": self.hostname,
+                "host": self.hostname,
+                "ip": ip,
                 "hostname": self.hostname,
-                "ip_address": self.get_local_ip(),
+                "ip_address": ip,
                 "os": platform.system(),
                 "os_version": platform.release(),
                 "python_version": platform.python_version(),
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.backend_url}/agents/register",
                 json=data,
-                headers={"X-API-Key": self.api_key},
                 timeout=10
             )
             
@@ -85,99 +308,77 @@ class AutoStackAgent:
             logger.error(f"Registration error: {e}")
             return False
     
-    def collect_metrics(self) -> Dict:
-        """Collect system metrics"""
+    def record(self, sample: Dict):
+        """Add a sample to the ring buffer, spilling the oldest when full"""
+        self.buffer.append(sample)
+        if len(self.buffer) > self.buffer_size:
+            overflow = [self.buffer.popleft() for _ in range(len(self.buffer) - self.buffer_size)]
+            self.spool.append(overflow)
+    
+    def upload(self, samples: List[Dict]) -> bool:
+        """Send one gzip-compressed batch to the bulk ingest endpoint"""
+        body = gzip.compress(json.dumps({
+            "samples": [dict(sample, agent_id=self.agent_id) for sample in samples]
+        }).encode())
         try:
-            # CPU metrics
-            cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_count = psutil.cpu_count()
-            
-            # Memory metrics
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
-            memory_total = memory.total
-            memory_used = memory.used
-            
-            # Disk metrics
-            disk = psutil.disk_usage('/')
-            disk_percent = disk.percent
-            disk_total = disk.total
-            disk_used = disk.used
-            
-            # Network metrics
-            net_io = psutil.net_io_counters()
-            network_sent = net_io.bytes_sent
-            network_recv = net_io.bytes_recv
-            
-            # System uptime
-            boot_time = psutil.boot_time()
-            uptime_seconds = time.time() - boot_time
-            
-            # Process count
-            process_count = len(psutil.pids())
-            
-            metrics = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "cpu_percent": cpu_percent,
-                "cpu_count": cpu_count,
-                "memory_percent": memory_percent,
-                "memory_total_bytes": memory_total,
-                "memory_used_bytes": memory_used,
-                "disk_percent": disk_percent,
-                "disk_total_bytes": disk_total,
-                "disk_used_bytes": disk_used,
-                "network_sent_bytes": network_sent,
-                "network_recv_bytes": network_recv,
-                "uptime_seconds": uptime_seconds,
-                "process_count": process_count,
-            }
-            
-            return metrics
-            
-        except Exception as e:
-            logger.error(f"Error collecting metrics: {e}")
-            return {}
+            response = self.session.post(
+                f"{self.backend_url}/agents/metrics",
+                data=body,
+                headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+                timeout=30
+            )
+        except requests.exceptions.ConnectionError:
+            logger.error("Cannot connect to backend")
+            return False
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Upload error: {e}")
+            return False
+        
+        if response.status_code == 200:
+            # MetricsIngestResponse; samples outside server retention are rejected
+            result = response.json()
+            if result.get("rejected"):
+                logger.warning(f"Backend rejected {result['rejected']} of {len(samples)} samples")
+            logger.debug(f"Uploaded {len(samples)} samples ({len(body)} bytes gzipped)")
+            return True
+        if response.status_code in (401, 403, 404):
+            # Key revoked, or 404: the agent was deleted; register again on the next flush
+            self.agent_id = None
+        logger.warning(f"Upload failed: {response.status_code}")
+        return False
     
-    def send_heartbeat(self) -> bool:
-        """Send heartbeat with metrics to backend"""
+    def flush(self) -> bool:
+        """Upload the spool (oldest first), then the ring buffer"""
         if not self.agent_id:
             logger.warning("Agent not registered, attempting registration...")
             if not self.register():
                 return False
         
-        try:
-            metrics = self.collect_metrics()
-            
-            if not metrics:
-                logger.warning("No metrics collected, skipping heartbeat")
+        while self.spool:
+            batch = self.spool.read(self.batch_size)
+            if not batch:
+                break
+            if not self.upload(batch):
                 return False
-            
-            data = {
-                "agent_id": self.agent_id,
-                "status": "active",
-                "metrics": metrics
-            }
-            
-            response = requests.post(
-                f"{self.backend_url}/agents/heartbeat",
-                json=data,
-                headers={"X-API-Key": self.api_key},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logger.debug(f"Heartbeat sent successfully")
-                return True
-            else:
-                logger.warning(f"Heartbeat failed: {response.status_code}")
+            self.spool.consume()
+        
+        while self.buffer:
+            batch = [self.buffer[i] for i in range(min(self.batch_size, len(self.buffer)))]
+            if not self.upload(batch):
+                # Keep memory bounded while offline; the spool survives restarts
+                self.spool.append(list(self.buffer))
+                self.buffer.clear()
                 return False
-                
-        except requests.exceptions.ConnectionError:
-            logger.error("Cannot connect to backend")
-            return False
-        except Exception as e:
-            logger.error(f"Heartbeat error: {e}")
-            return False
+            for _ in batch:
+                self.buffer.popleft()
+        return True
+    
+    def next_flush_delay(self) -> float:
+        """Jittered delay until the next upload; backs off after failures"""
+        if self.failures:
+            # Exponential backoff with full jitter
+            return random.uniform(self.interval, min(self.max_backoff, self.flush_interval * 2 ** self.failures))
+        return self.flush_interval * random.uniform(0.8, 1.2)
     
     def run(self):
         """Main agent loop"""
@@ -185,31 +386,36 @@ class AutoStackAgent:
         
         # Initial registration
         if not self.register():
-            logger.error("Failed to register agent. Retrying in 60 seconds...")
-            time.sleep(60)
+            logger.error("Failed to register agent, will retry on the next upload")
         
-        # Main monitoring loop
-        consecutive_failures = 0
-        max_failures = 5
+        # Spread the first upload so restarted fleets do not report in lockstep
+        next_flush = time.monotonic() + random.uniform(0, self.flush_interval)
+        next_tick = time.monotonic()
         
         while True:
             try:
-                success = self.send_heartbeat()
+                self.sampler.sample()
                 
-                if success:
-                    consecutive_failures = 0
-                else:
-                    consecutive_failures += 1
+                if time.monotonic() - self.sampler.window_start >= self.interval:
+                    sample = self.sampler.summarize()
+                    if sample:
+                        self.record(sample)
                 
-                if consecutive_failures >= max_failures:
-                    logger.error(f"Failed {max_failures} times, attempting re-registration...")
-                    self.agent_id = None
-                    consecutive_failures = 0
+                if time.monotonic() >= next_flush:
+                    if self.flush():
+                        self.failures = 0
+                    else:
+                        self.failures += 1
+                    next_flush = time.monotonic() + self.next_flush_delay()
                 
-                time.sleep(self.interval)
+                # Fixed-rate ticks: slow uploads do not shift the sampling grid
+                next_tick = max(next_tick + self.sample_interval, time.monotonic())
+                time.sleep(max(0.0, next_tick - time.monotonic()))
                 
             except KeyboardInterrupt:
                 logger.info("Agent stopped by user")
+                # Keep unsent samples for the next start
+                self.spool.append(list(self.buffer))
                 break
             except Exception as e:
                 logger.error(f"Unexpected error in main loop: {e}")
@@ -222,6 +428,10 @@ def main():
     api_key = os.getenv("AUTOSTACK_API_KEY")
     backend_url = os.getenv("AUTOSTACK_BACKEND_URL", "http://localhost:8000")
     interval = int(os.getenv("AUTOSTACK_INTERVAL", "30"))
+    sample_interval = int(os.getenv("AUTOSTACK_SAMPLE_INTERVAL", "5"))
+    flush_interval = int(os.getenv("AUTOSTACK_FLUSH_INTERVAL", "300"))
+    buffer_size = int(os.getenv("AUTOSTACK_BUFFER_SIZE", "1000"))
+    spool_path = os.getenv("AUTOSTACK_SPOOL_PATH")
     
     if not api_key:
         logger.error("AUTOSTACK_API_KEY environment variable is required")
@@ -231,7 +441,11 @@ def main():
     agent = AutoStackAgent(
         api_key=api_key,
         backend_url=backend_url,
-        interval=interval
+        interval=interval,
+        sample_interval=sample_interval,
+        flush_interval=flush_interval,
+        buffer_size=buffer_size,
+        spool_path=Path(spool_path) if spool_path else None,
     )
     
     agent.run()
@@ -0,0 +1,47 @@
+"""add sequence numbers to deployment logs
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Deploy logs become append-only rows ordered by a per-deployment sequence
+    op.add_column('deployment_logs', sa.Column('sequence', sa.Integer, nullable=True))
+
+    # Backfill existing rows in timestamp order
+    op.execute("""
+        UPDATE deployment_logs AS dl
+        SET sequence = ordered.seq
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY deployment_id ORDER BY timestamp, id) AS seq
+            FROM deployment_logs
+        ) AS ordered
+        WHERE dl.id = ordered.id
+    """)
+
+    op.alter_column('deployment_logs', 'sequence', nullable=False)
+
+    # Paginated reads are range scans on (deployment_id, sequence)
+    op.create_unique_constraint(
+        'uq_deployment_logs_deployment_sequence',
+        'deployment_logs',
+        ['deployment_id', 'sequence']
+    )
+    op.drop_index('ix_deployment_logs_deployment_id', table_name='deployment_logs')
+
+
+def downgrade():
+    op.create_index('ix_deployment_logs_deployment_id', 'deployment_logs', ['deployment_id'])
+    op.drop_constraint('uq_deployment_logs_deployment_sequence', 'deployment_logs', type_='unique')
+    op.drop_column('deployment_logs', 'sequence')
@@ -0,0 +1,29 @@
+"""add build fingerprint and image ref to deployments
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Hash of tracked files + Dockerfile, and the image built from them
+    op.add_column('deployments', sa.Column('build_fingerprint', sa.String(64), nullable=True))
+    op.add_column('deployments', sa.Column('image_ref', sa.String(500), nullable=True))
+
+    op.create_index('ix_deployments_build_fingerprint', 'deployments', ['build_fingerprint'])
+
+
+def downgrade():
+    op.drop_index('ix_deployments_build_fingerprint', table_name='deployments')
+    op.drop_column('deployments', 'image_ref')
+    op.drop_column('deployments', 'build_fingerprint')
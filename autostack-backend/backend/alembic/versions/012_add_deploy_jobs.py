@@ -0,0 +1,47 @@
+"""add durable deploy job queue
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Deploy work is queued here and claimed by workers instead of BackgroundTasks
+    op.create_table(
+        'deploy_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('kind', sa.String(50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False, server_default='10'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('worker_id', sa.String(255), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_index('ix_deploy_jobs_claim', 'deploy_jobs', ['status', 'priority', 'created_at'])
+    op.create_index('ix_deploy_jobs_user_status', 'deploy_jobs', ['user_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_deploy_jobs_user_status', table_name='deploy_jobs')
+    op.drop_index('ix_deploy_jobs_claim', table_name='deploy_jobs')
+    op.drop_table('deploy_jobs')
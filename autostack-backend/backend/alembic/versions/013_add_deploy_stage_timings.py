@@ -0,0 +1,24 @@
+"""add stage timings to deployments
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Seconds spent in each deploy pipeline stage (clone, build, push, apply, ...)
+    op.add_column('deployments', sa.Column('stage_timings', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('deployments', 'stage_timings')
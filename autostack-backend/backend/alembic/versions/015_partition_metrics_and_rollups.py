@@ -0,0 +1,119 @@
+"""partition metrics by day and add rollup tables
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+import os
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+METRIC_COLUMNS = "id, agent_id, cpu_usage, memory_usage, disk_usage, network_in, network_out, timestamp, user_id"
+
+
+def _metrics_columns():
+    return [
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('agent_id', sa.String(), nullable=True),
+        sa.Column('cpu_usage', sa.Float(), nullable=False),
+        sa.Column('memory_usage', sa.Float(), nullable=False),
+        sa.Column('disk_usage', sa.Float(), nullable=True),
+        sa.Column('network_in', sa.Float(), nullable=True),
+        sa.Column('network_out', sa.Float(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    ]
+
+
+def _create_rollup(name, trunc):
+    op.create_table(
+        name,
+        sa.Column('agent_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('cpu_sum', sa.Float(), nullable=False),
+        sa.Column('cpu_min', sa.Float(), nullable=False),
+        sa.Column('cpu_max', sa.Float(), nullable=False),
+        sa.Column('memory_sum', sa.Float(), nullable=False),
+        sa.Column('memory_min', sa.Float(), nullable=False),
+        sa.Column('memory_max', sa.Float(), nullable=False),
+        sa.Column('disk_max', sa.Float(), nullable=True),
+        sa.Column('network_in_sum', sa.Float(), nullable=False),
+        sa.Column('network_out_sum', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('agent_id', 'bucket'),
+    )
+    op.create_index(f'ix_{name}_user_bucket', name, ['user_id', 'bucket'])
+
+    # Backfill from the existing samples
+    op.execute(f"""
+        INSERT INTO {name}
+        SELECT agent_id, max(user_id), date_trunc('{trunc}', timestamp), count(*),
+               sum(cpu_usage), min(cpu_usage), max(cpu_usage),
+               sum(memory_usage), min(memory_usage), max(memory_usage),
+               max(disk_usage), coalesce(sum(network_in), 0), coalesce(sum(network_out), 0)
+        FROM metrics
+        WHERE agent_id IS NOT NULL
+        GROUP BY agent_id, date_trunc('{trunc}', timestamp)
+    """)
+
+
+def upgrade():
+    # Postgres cannot turn a table into a partitioned one in place: rebuild it
+    op.rename_table('metrics', 'metrics_legacy')
+    op.execute("ALTER TABLE metrics_legacy RENAME CONSTRAINT metrics_pkey TO metrics_legacy_pkey")
+
+    op.create_table(
+        'metrics',
+        *_metrics_columns(),
+        sa.PrimaryKeyConstraint('id', 'timestamp'),
+        postgresql_partition_by='RANGE (timestamp)',
+    )
+    op.create_index('ix_metrics_agent_time', 'metrics', ['agent_id', 'timestamp'])
+    op.create_index('ix_metrics_user_time', 'metrics', ['user_id', 'timestamp'])
+    op.execute("CREATE TABLE metrics_default PARTITION OF metrics DEFAULT")
+
+    # Daily partitions for the retention window and a few days ahead; the
+    # metrics store keeps creating them from here on
+    retention = int(float(os.getenv("METRICS_RAW_RETENTION_DAYS", "7")))
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(-retention, 4):
+        day = today + timedelta(days=offset)
+        op.execute(
+            f"CREATE TABLE metrics_p{day:%Y%m%d} PARTITION OF metrics "
+            f"FOR VALUES FROM ('{day:%Y-%m-%d}') TO ('{day + timedelta(days=1):%Y-%m-%d}')"
+        )
+
+    # Older rows go to metrics_default, where the first retention pass drops them
+    op.execute(f"INSERT INTO metrics ({METRIC_COLUMNS}) SELECT {METRIC_COLUMNS} FROM metrics_legacy")
+    op.drop_table('metrics_legacy')
+
+    _create_rollup('metrics_rollup_1m', 'minute')
+    _create_rollup('metrics_rollup_1h', 'hour')
+    _create_rollup('metrics_rollup_1d', 'day')
+
+
+def downgrade():
+    op.drop_table('metrics_rollup_1d')
+    op.drop_table('metrics_rollup_1h')
+    op.drop_table('metrics_rollup_1m')
+
+    op.rename_table('metrics', 'metrics_partitioned')
+    op.execute("ALTER TABLE metrics_partitioned RENAME CONSTRAINT metrics_pkey TO metrics_partitioned_pkey")
+    op.create_table('metrics', *_metrics_columns(), sa.PrimaryKeyConstraint('id'))
+    op.execute(f"INSERT INTO metrics ({METRIC_COLUMNS}) SELECT {METRIC_COLUMNS} FROM metrics_partitioned")
+    # Dropping the parent drops every partition with it
+    op.drop_table('metrics_partitioned')
@@ -0,0 +1,32 @@
+"""add agent liveness indexes
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Overview counts per user and status
+    op.create_index('ix_agents_user_status', 'agents', ['user_id', 'status'])
+    # Sweeper scans online agents by heartbeat age
+    op.create_index(
+        'ix_agents_online_heartbeat',
+        'agents',
+        ['last_heartbeat'],
+        postgresql_where=sa.text("status = 'online'"),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_agents_online_heartbeat', table_name='agents')
+    op.drop_index('ix_agents_user_status', table_name='agents')
@@ -0,0 +1,41 @@
+"""add budget period start
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # current_spend now covers [period_start, now) and is kept up to date as
+    # snapshots arrive, instead of being recomputed on every status read
+    op.add_column('budget_alerts', sa.Column('period_start', sa.DateTime(), nullable=True))
+
+    # Calendar periods in UTC; anything not daily or weekly is monthly
+    op.execute("""
+        UPDATE budget_alerts SET period_start = CASE budget_period
+            WHEN 'daily' THEN date_trunc('day', timezone('utc', now()))
+            WHEN 'weekly' THEN date_trunc('week', timezone('utc', now()))
+            ELSE date_trunc('month', timezone('utc', now()))
+        END
+    """)
+    op.execute("""
+        UPDATE budget_alerts b SET current_spend = coalesce((
+            SELECT sum(s.total_cost) FROM cost_snapshots s
+            WHERE s.project_id = b.project_id AND s.timestamp >= b.period_start
+        ), 0)
+    """)
+    op.execute("UPDATE budget_alerts SET is_exceeded = current_spend >= budget_limit")
+
+
+def downgrade():
+    op.drop_column('budget_alerts', 'period_start')
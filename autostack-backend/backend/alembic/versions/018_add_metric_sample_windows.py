@@ -0,0 +1,38 @@
+"""add per-sample reading spread to metrics
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ('readings', sa.Integer),
+    ('cpu_min', sa.Float),
+    ('cpu_max', sa.Float),
+    ('cpu_p95', sa.Float),
+    ('memory_min', sa.Float),
+    ('memory_max', sa.Float),
+    ('memory_p95', sa.Float),
+    ('network_interfaces', sa.JSON),
+    ('process_count', sa.Integer),
+)
+
+
+def upgrade():
+    # Added to the partitioned parent, so every daily partition gets them
+    for name, type_ in COLUMNS:
+        op.add_column('metrics', sa.Column(name, type_(), nullable=True))
+
+
+def downgrade():
+    for name, _ in reversed(COLUMNS):
+        op.drop_column('metrics', name)
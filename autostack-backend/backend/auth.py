@@ -10,16 +10,18 @@ from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 import httpx
-from passlib.context import CryptContext
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import crud, models, schemas
 from .db import get_db
+from .services.api_key_usage import api_key_usage
+from .utils.password_pool import PasswordPoolBusy, password_pool
+from .utils.principal_cache import principal_cache
 
 
 router = APIRouter(tags=["auth"])
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = password_pool.context
 
 
 SECRET_KEY = os.getenv("SECRET_KEY", "autostack-secret-key")
@@ -43,11 +45,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the bounded hashing pool; 503 when the pool is saturated"""
+    try:
+        return await password_pool.hash(password)
+    except PasswordPoolBusy:
+        raise _hashing_busy()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bounded hashing pool; 503 when the pool is saturated"""
+    try:
+        return await password_pool.verify(plain_password, hashed_password)
+    except PasswordPoolBusy:
+        raise _hashing_busy()
+
+
+def create_access_token(
+    subject: str, expires_delta: timedelta | None = None, token_version: int = 0
+) -> str:
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode = {"sub": subject, "exp": expire, "type": "access"}
+    to_encode = {"sub": subject, "exp": expire, "type": "access", "tv": token_version}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -63,7 +91,7 @@ def hash_token(token: str) -> str:
 
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> models.User | None:
     user = await crud.get_user_by_email(db, email)
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await verify_password_async(password, user.password_hash):
         return None
     return user
 
@@ -88,13 +116,28 @@ async def get_current_user(
     except (JWTError, ValidationError):
         raise credentials_exception
 
+    # Tokens issued before token_version existed carry no "tv" and match version 0
+    token_version = payload.get("tv", 0)
+    user = principal_cache.get(token_data.sub, token_version)
+    if user is not None:
+        return user
+
     user = await crud.get_user_by_id(db, token_data.sub)
-    if user is None:
+    if user is None or user.token_version != token_version:
         raise credentials_exception
 
+    # Shared between requests from here on, so detach it from this session
+    db.expunge(user)
+    principal_cache.put(user, token_version)
     return user
 
 
+async def revoke_access_tokens(db: AsyncSession, user: models.User):
+    """Invalidate every access token issued to ``user`` (password reset, account compromise)"""
+    await crud.bump_token_version(db, user)
+    principal_cache.invalidate(user.id)
+
+
 async def get_current_user_or_api_key(
     db: AsyncSession = Depends(get_db),
     token: str | None = Depends(oauth2_scheme),
@@ -103,14 +146,12 @@ async def get_current_user_or_api_key(
     """Authenticate user via JWT token or API key."""
     # Try API key first
     if x_api_key:
-        key_hash = hash_token(x_api_key)
-        api_key = await crud.get_api_key_by_hash(db, key_hash)
-        if api_key:
-            # Update last used
-            await crud.update_api_key_last_used(db, api_key)
-            user = await crud.get_user_by_id(db, api_key.user_id)
-            if user:
-                return user
+        found = await crud.get_api_key_user(db, hash_token(x_api_key))
+        if found:
+            api_key_id, user = found
+            # last_used is written behind in batches, not per request
+            api_key_usage.record(api_key_id)
+            return user
 
     # Fall back to JWT token
     return await get_current_user(db, token)
@@ -127,7 +168,7 @@ async def signup(payload: schemas.UserCreate, db: AsyncSession = Depends(get_db)
     if existing_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
 
-    password_hash = hash_password(payload.password)
+    password_hash = await hash_password_async(payload.password)
     user = await crud.create_user(db, email=payload.email, password_hash=password_hash)
     
     # Create audit log
@@ -145,7 +186,7 @@ async def login(payload: schemas.UserLogin, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
 
     # Create access token
-    access_token = create_access_token(str(user.id))
+    access_token = create_access_token(str(user.id), token_version=user.token_version)
     
     # Create refresh token
     refresh_token = create_refresh_token()
@@ -167,8 +208,14 @@ async def read_me(current_user: models.User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout():
-    """Placeholder endpoint for client-side logout handling."""
+async def logout(token: str | None = Depends(oauth2_scheme)):
+    """Client-side logout; drops this process's cached principal for the caller."""
+    if token:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            principal_cache.invalidate(payload.get("sub", ""))
+        except JWTError:
+            pass
 
     return {"detail": "Logout handled on client"}
 
@@ -208,7 +255,7 @@ async def refresh_token(
             )
         
         # Create new access token and return BOTH tokens (use user.id for consistency with login)
-        access_token = create_access_token(str(user.id))
+        access_token = create_access_token(str(user.id), token_version=user.token_version)
         
         # Return the same refresh token (it's still valid)
         return schemas.TokenResponse(
@@ -417,7 +464,7 @@ async def github_callback(code: str, state: str, db: AsyncSession = Depends(get_
                 print(f"Creating new user for: {email}")
                 user = models.User(
                     email=email,
-                    password_hash=hash_password(secrets.token_urlsafe(32)),  # Random password
+                    password_hash=await hash_password_async(secrets.token_urlsafe(32)),  # Random password
                     github_token=github_token,
                     github_username=github_user.get("login")
                 )
@@ -446,6 +493,7 @@ async def github_callback(code: str, state: str, db: AsyncSession = Depends(get_
                 user.github_token = github_token
                 user.github_username = github_user.get("login")
                 await db.commit()
+                principal_cache.invalidate(user.id)
                 print(f"Updated user with ID: {user.id}")
                 
                 # Create audit log (safe)
@@ -464,7 +512,7 @@ async def github_callback(code: str, state: str, db: AsyncSession = Depends(get_
             
             # Create JWT tokens (use user.id for consistency)
             print("Generating JWT tokens...")
-            access_token = create_access_token(str(user.id))
+            access_token = create_access_token(str(user.id), token_version=user.token_version)
             
             # Create refresh token
             refresh_token = create_refresh_token()
@@ -678,7 +726,7 @@ async def google_callback(code: str, state: str, db: AsyncSession = Depends(get_
                 print(f"Creating new user for: {email}")
                 user = models.User(
                     email=email,
-                    password_hash=hash_password(secrets.token_urlsafe(32)),  # Random password
+                    password_hash=await hash_password_async(secrets.token_urlsafe(32)),  # Random password
                     google_id=google_id,
                     google_email=email,
                     name=name,
@@ -716,6 +764,7 @@ async def google_callback(code: str, state: str, db: AsyncSession = Depends(get_
                 if email_verified:
                     user.email_verified = True
                 await db.commit()
+                principal_cache.invalidate(user.id)
                 print(f"Updated user with ID: {user.id}")
                 
                 # Create audit log (safe)
@@ -734,7 +783,7 @@ async def google_callback(code: str, state: str, db: AsyncSession = Depends(get_
             
             # Create JWT tokens (use user.id for consistency)
             print("Generating JWT tokens...")
-            access_token = create_access_token(str(user.id))
+            access_token = create_access_token(str(user.id), token_version=user.token_version)
             
             # Create refresh token
             refresh_token = create_refresh_token()
@@ -856,7 +905,10 @@ __all__ = [
     "get_current_user_or_api_key",
     "hash_password",
     "verify_password",
+    "hash_password_async",
+    "verify_password_async",
     "create_access_token",
+    "revoke_access_tokens",
     "create_refresh_token",
     "hash_token",
 ]
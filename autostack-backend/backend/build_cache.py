@@ -0,0 +1,77 @@
+"""
+Build-context fingerprinting for AutoStack deploy engines
+Lets a deploy reuse an image built from an identical source tree
+"""
+
+import hashlib
+import logging
+import os
+from typing import Awaitable, Callable, Optional
+
+import git
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Bump when the fingerprint inputs change so old fingerprints stop matching
+FINGERPRINT_VERSION = b"autostack-build-v1"
+
+# Resolves a fingerprint to the image ref of an earlier successful build
+ImageLookup = Callable[[str], Awaitable[Optional[str]]]
+
+BUILD_CACHE_LOOKUPS = registry.counter(
+    "autostack_build_cache_lookups_total",
+    "Build-context fingerprint lookups by engine and result (hit, miss, stale)",
+    ["engine", "result"],
+)
+
+
+def compute_fingerprint(repo_path: str, dockerfile: str) -> str:
+    """
+    Hash the tracked files of a checkout plus the Dockerfile used to build it.
+
+    For git checkouts the index already holds a content hash per file, so
+    ``git ls-files -s`` covers the tree without reading file contents.
+    """
+    digest = hashlib.sha256(FINGERPRINT_VERSION + b"\0")
+    try:
+        digest.update(git.Repo(repo_path).git.ls_files("-s", "-z").encode())
+    except Exception:
+        # Not a git checkout: hash every file's path and contents
+        for root, dirs, files in os.walk(repo_path):
+            dirs[:] = sorted(d for d in dirs if d != ".git")
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, repo_path).encode() + b"\0")
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+    digest.update(b"\0Dockerfile\0" + dockerfile.encode())
+    return digest.hexdigest()
+
+
+async def lookup_image(
+    image_lookup: Optional[ImageLookup],
+    fingerprint: str,
+    engine: str,
+    verify: Optional[Callable[[str], Awaitable[bool]]] = None,
+) -> Optional[str]:
+    """Return a reusable image ref for ``fingerprint``, recording hit/miss metrics"""
+    if image_lookup is None:
+        return None
+    try:
+        image_ref = await image_lookup(fingerprint)
+    except Exception as e:
+        logger.error(f"Image lookup failed for {fingerprint[:12]}: {e}")
+        image_ref = None
+
+    if not image_ref:
+        BUILD_CACHE_LOOKUPS.inc(engine=engine, result="miss")
+        return None
+    if verify and not await verify(image_ref):
+        BUILD_CACHE_LOOKUPS.inc(engine=engine, result="stale")
+        return None
+
+    BUILD_CACHE_LOOKUPS.inc(engine=engine, result="hit")
+    return image_ref
@@ -2,12 +2,14 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import Sequence
+from typing import Iterable, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import case, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import models
+from .services.deploy_log_service import deploy_log_service
+from .services.metrics_store import metrics_store
 
 
 async def create_user(db: AsyncSession, *, email: str, password_hash: str) -> models.User:
@@ -30,6 +32,19 @@ async def get_user_by_id(db: AsyncSession, user_id: str) -> models.User | None:
     return result.scalars().first()
 
 
+async def bump_token_version(db: AsyncSession, user: models.User) -> int:
+    """Increment the user's token version, revoking access tokens issued before"""
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user.id)
+        .values(token_version=models.User.token_version + 1)
+        .returning(models.User.token_version)
+    )
+    token_version = result.scalar_one()
+    await db.commit()
+    return token_version
+
+
 async def create_deploy(
     db: AsyncSession,
     *,
@@ -68,13 +83,65 @@ async def get_deploy(db: AsyncSession, deploy_id: str) -> models.Deploy | None:
     return result.scalars().first()
 
 
-async def append_log(db: AsyncSession, deploy: models.Deploy, text: str) -> models.Deploy:
-    deploy.logs = (deploy.logs or "") + text + "\n"
+async def find_reusable_image(
+    db: AsyncSession, user_id: str, build_fingerprint: str
+) -> str | None:
+    """Image ref of the user's latest successful deploy with this fingerprint."""
+    result = await db.execute(
+        select(models.Deploy.image_ref)
+        .where(
+            models.Deploy.user_id == user_id,
+            models.Deploy.build_fingerprint == build_fingerprint,
+            models.Deploy.status == "success",
+            models.Deploy.image_ref.is_not(None),
+        )
+        .order_by(models.Deploy.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar()
+
+
+async def append_log(
+    db: AsyncSession, deploy: models.Deploy, text: str, log_type: str = "deploy"
+) -> models.Deploy:
+    """Queue a log line for the deployment.
+
+    Lines are buffered and written to ``deployment_logs`` in batches; the
+    ``deploy.logs`` snapshot is filled in once by ``finish_deploy_logs``.
+    """
+    await deploy_log_service.append(deploy.id, text, log_type=log_type)
+    return deploy
+
+
+async def finish_deploy_logs(db: AsyncSession, deploy: models.Deploy) -> models.Deploy:
+    """Flush buffered log lines and store the full text on ``deploy.logs``."""
+    deploy.logs = await deploy_log_service.finish(deploy.id)
     await db.commit()
-    await db.refresh(deploy)
     return deploy
 
 
+async def list_deploy_logs(
+    db: AsyncSession, deploy_id: str, after_sequence: int = 0, limit: int = 500
+) -> list[dict]:
+    return await deploy_log_service.read(db, deploy_id, after_sequence=after_sequence, limit=limit)
+
+
+async def tail_deploy_logs(db: AsyncSession, deploy_id: str, lines: int = 100) -> list[dict]:
+    return await deploy_log_service.tail(db, deploy_id, lines=lines)
+
+
+async def get_deploy_log_text(db: AsyncSession, deploy: models.Deploy, lines: int = 1000) -> str:
+    """
+    Log text of a deploy. ``deploy.logs`` is only written when the deploy
+    finishes, so until then the last ``lines`` stored and buffered lines
+    are rendered instead.
+    """
+    if deploy.logs and deploy.status in ("success", "failed"):
+        return deploy.logs
+    entries = await deploy_log_service.tail(db, deploy.id, lines=lines)
+    return deploy_log_service.render(entries) or deploy.logs or ""
+
+
 # ========================
 # Agent CRUD
 # ========================
@@ -107,6 +174,14 @@ async def get_agent(db: AsyncSession, agent_id: str) -> models.Agent | None:
     return result.scalars().first()
 
 
+async def owned_agent_ids(db: AsyncSession, user: models.User, agent_ids: Iterable[str]) -> set[str]:
+    """The subset of ``agent_ids`` that exist and belong to ``user``"""
+    result = await db.execute(
+        select(models.Agent.id).where(models.Agent.id.in_(set(agent_ids)), models.Agent.user_id == user.id)
+    )
+    return set(result.scalars())
+
+
 async def list_user_agents(db: AsyncSession, user: models.User) -> Sequence[models.Agent]:
     result = await db.execute(
         select(models.Agent)
@@ -116,18 +191,29 @@ async def list_user_agents(db: AsyncSession, user: models.User) -> Sequence[mode
     return result.scalars().all()
 
 
-async def update_agent_heartbeat(
+async def record_agent_heartbeat(
     db: AsyncSession,
     agent: models.Agent,
     cpu_usage: float,
     memory_usage: float,
 ) -> models.Agent:
+    """Update the agent's status and store the sample in a single transaction."""
+    now = datetime.utcnow()
     agent.cpu_usage = cpu_usage
     agent.memory_usage = memory_usage
-    agent.last_heartbeat = datetime.now(timezone.utc)
+    agent.last_heartbeat = now
     agent.status = "online"
+    row = {
+        "user_id": agent.user_id,
+        "agent_id": agent.id,
+        "cpu_usage": cpu_usage,
+        "memory_usage": memory_usage,
+        "timestamp": now,
+    }
+    db.add(models.Metrics(**row))
+    await metrics_store.write_rollups(db, [row])
+    # expire_on_commit is off, so the agent needs no refresh round-trip
     await db.commit()
-    await db.refresh(agent)
     return agent
 
 
@@ -138,6 +224,45 @@ async def mark_agent_offline(db: AsyncSession, agent: models.Agent) -> models.Ag
     return agent
 
 
+async def mark_stale_agents_offline(
+    db: AsyncSession, *, cutoff: datetime
+) -> list[tuple[str, str, str]]:
+    """
+    Mark every online agent without a heartbeat since ``cutoff`` offline and
+    raise an alert for each, in one UPDATE ... RETURNING and one INSERT.
+
+    Rows are only returned for agents this call moved, so concurrent
+    sweepers never alert twice. Returns (agent id, user id, name) tuples.
+    """
+    stale = (
+        await db.execute(
+            update(models.Agent)
+            .where(
+                models.Agent.status == "online",
+                or_(models.Agent.last_heartbeat.is_(None), models.Agent.last_heartbeat < cutoff),
+            )
+            .values(status="offline")
+            .returning(models.Agent.id, models.Agent.user_id, models.Agent.name, models.Agent.last_heartbeat)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+    if stale:
+        await db.execute(
+            insert(models.Alert),
+            [
+                {
+                    "user_id": user_id,
+                    "severity": "warning",
+                    "source": f"agent:{agent_id}",
+                    "message": f"Agent {name} went offline (last heartbeat {last_heartbeat or 'never'})",
+                }
+                for agent_id, user_id, name, last_heartbeat in stale
+            ],
+        )
+    await db.commit()
+    return [(agent_id, user_id, name) for agent_id, user_id, name, _ in stale]
+
+
 # ========================
 # Alert CRUD
 # ========================
@@ -225,39 +350,129 @@ async def create_metric(
         disk_usage=disk_usage,
         network_in=network_in,
         network_out=network_out,
+        timestamp=datetime.utcnow(),
     )
     db.add(metric)
+    await metrics_store.write_rollups(
+        db,
+        [{column: getattr(metric, column) for column in (
+            "agent_id", "user_id", "timestamp", "cpu_usage", "memory_usage",
+            "disk_usage", "network_in", "network_out",
+        )}],
+    )
     await db.commit()
     await db.refresh(metric)
     return metric
 
 
-async def get_metrics_overview(db: AsyncSession, user: models.User) -> dict:
-    """Calculate metrics overview for a user."""
-    # Get all user agents
-    agents = await list_user_agents(db, user)
-    total_agents = len(agents)
-    active_agents = sum(1 for a in agents if a.status == "online")
-
-    # Calculate average CPU and memory
-    total_cpu = sum(a.cpu_usage for a in agents if a.status == "online")
-    total_memory = sum(a.memory_usage for a in agents if a.status == "online")
-    avg_cpu = total_cpu / active_agents if active_agents > 0 else 0.0
-    avg_memory = total_memory / active_agents if active_agents > 0 else 0.0
-
-    # Calculate uptime percentage (agents that sent heartbeat in last 5 minutes)
-    five_min_ago = datetime.now(timezone.utc) - timedelta(minutes=5)
-    five_min_ago_naive = five_min_ago.replace(tzinfo=None)  # Make naive for comparison
-    online_count = sum(
-        1
-        for a in agents
-        if a.last_heartbeat and a.last_heartbeat > five_min_ago_naive
+def to_utc_naive(value: datetime | None, default: datetime) -> datetime:
+    """Normalize an optional datetime to naive UTC, as stored in the database."""
+    if value is None:
+        return default
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _window_columns(prefix: str, window: dict | None) -> dict:
+    """Metrics columns for an agent's min/max/p95 summary of one resource"""
+    window = window or {}
+    return {f"{prefix}_{stat}": window.get(stat) for stat in ("min", "max", "p95")}
+
+
+async def ingest_metrics(
+    db: AsyncSession, *, user: models.User, samples: Sequence[dict]
+) -> tuple[int, int, int]:
+    """
+    Store metric samples from any number of the user's agents in one
+    transaction: one ownership query, one multi-row INSERT, one upsert per
+    rollup resolution and one UPDATE that moves each agent to its newest
+    sample. Samples for other users' agents, older than raw retention or
+    more than a day in the future are rejected.
+
+    Returns (accepted, rejected, agents updated).
+    """
+    owned = await owned_agent_ids(db, user, (sample["agent_id"] for sample in samples))
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "agent_id": sample["agent_id"],
+            "user_id": user.id,
+            "timestamp": to_utc_naive(sample.get("timestamp"), now),
+            "cpu_usage": sample["cpu_usage"],
+            "memory_usage": sample["memory_usage"],
+            "disk_usage": sample.get("disk_usage"),
+            "network_in": sample.get("network_in"),
+            "network_out": sample.get("network_out"),
+            "readings": sample.get("readings"),
+            **_window_columns("cpu", sample.get("cpu")),
+            **_window_columns("memory", sample.get("memory")),
+            "network_interfaces": sample.get("network"),
+            "process_count": sample.get("process_count"),
+        }
+        for sample in samples
+        if sample["agent_id"] in owned
+    ]
+    rows = [row for row in rows if metrics_store.accepts(row["timestamp"], now)]
+    if not rows:
+        return 0, len(samples), 0
+
+    await db.execute(insert(models.Metrics), rows)
+    await metrics_store.write_rollups(db, rows)
+
+    latest: dict[str, dict] = {}
+    for row in rows:
+        current = latest.get(row["agent_id"])
+        if current is None or row["timestamp"] >= current["timestamp"]:
+            latest[row["agent_id"]] = row
+
+    def by_agent(field: str):
+        return case({agent_id: row[field] for agent_id, row in latest.items()}, value=models.Agent.id)
+
+    sample_time = by_agent("timestamp")
+    await db.execute(
+        update(models.Agent)
+        .where(
+            models.Agent.id.in_(latest),
+            # Late (spooled) samples must not move an agent back in time
+            or_(models.Agent.last_heartbeat.is_(None), models.Agent.last_heartbeat <= sample_time),
+        )
+        .values(
+            cpu_usage=by_agent("cpu_usage"),
+            memory_usage=by_agent("memory_usage"),
+            last_heartbeat=sample_time,
+            status="online",
+        )
+        .execution_options(synchronize_session=False)
     )
-    uptime_percentage = (online_count / total_agents * 100) if total_agents > 0 else 0.0
+    await db.commit()
+    return len(rows), len(samples) - len(rows), len(latest)
+
+
+async def get_metrics_overview(db: AsyncSession, user: models.User) -> dict:
+    """
+    Calculate metrics overview for a user in one aggregate query.
+
+    The agent sweeper keeps ``status`` current, so uptime is the share of
+    agents online and the query is a scan of ix_agents_user_status.
+    """
+    online = models.Agent.status == "online"
+    total_agents, active_agents, avg_cpu, avg_memory = (
+        await db.execute(
+            select(
+                func.count(),
+                func.count().filter(online),
+                func.avg(models.Agent.cpu_usage).filter(online),
+                func.avg(models.Agent.memory_usage).filter(online),
+            ).where(models.Agent.user_id == user.id)
+        )
+    ).one()
+    uptime_percentage = (active_agents / total_agents * 100) if total_agents > 0 else 0.0
 
     return {
-        "total_cpu_usage": round(avg_cpu, 2),
-        "total_memory_usage": round(avg_memory, 2),
+        "total_cpu_usage": round(avg_cpu or 0.0, 2),
+        "total_memory_usage": round(avg_memory or 0.0, 2),
         "uptime_percentage": round(uptime_percentage, 2),
         "active_agents": active_agents,
         "total_agents": total_agents,
@@ -361,6 +576,19 @@ async def delete_api_key(db: AsyncSession, api_key: models.APIKey) -> None:
     await db.commit()
 
 
+async def get_api_key_user(
+    db: AsyncSession, key_hash: str
+) -> tuple[str, models.User] | None:
+    """Resolve an API key hash to (key id, owning user) in one joined query."""
+    result = await db.execute(
+        select(models.APIKey.id, models.User)
+        .join(models.User, models.User.id == models.APIKey.user_id)
+        .where(models.APIKey.key_hash == key_hash)
+    )
+    row = result.first()
+    return (row[0], row[1]) if row else None
+
+
 async def update_api_key_last_used(
     db: AsyncSession, api_key: models.APIKey
 ) -> models.APIKey:
@@ -5,21 +5,29 @@ Supports both local Docker and cloud EKS deployments via Jenkins
 """
 
 import os
-import shutil
 import asyncio
+import functools
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 import docker
-from docker.errors import DockerException, BuildError, APIError
-import git
+from docker.errors import DockerException, BuildError, APIError, ImageNotFound
 from git.exc import GitCommandError
 import logging
 import httpx
 import json
 
+from .build_cache import ImageLookup, compute_fingerprint, lookup_image
+from .port_allocator import DEPLOY_LABEL, PORT_LABEL, PortAllocator, container_port_leases
+from .repo_cache import repo_cache
+from .stage_timings import StageTimings
+
 logger = logging.getLogger(__name__)
 
+# Async callback receiving one line of build output at a time
+LogCallback = Callable[[str], Awaitable[None]]
+
 
 class DeployEngine:
     """Handles deployment of applications from GitHub to Docker"""
@@ -35,10 +43,97 @@ class DeployEngine:
         self.workspace_base = os.getenv("DEPLOY_WORKSPACE", "/tmp/autostack-deploys")
         self.base_port = int(os.getenv("DEPLOY_BASE_PORT", "10000"))
         self.max_port = int(os.getenv("DEPLOY_MAX_PORT", "20000"))
+        self.ports = PortAllocator(self.base_port, self.max_port)
+        
+        # The Docker SDK and GitPython are blocking, so every call goes through a
+        # dedicated thread pool instead of the event loop. The semaphore caps how
+        # many image builds run at once; the pool has headroom for clones,
+        # stops and log reads that happen while builds are in flight.
+        self.build_concurrency = max(1, int(os.getenv("DEPLOY_BUILD_CONCURRENCY", "4")))
+        self._build_slots = asyncio.Semaphore(self.build_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.build_concurrency * 2 + 2,
+            thread_name_prefix="deploy-engine",
+        )
         
         # Create workspace directory
         Path(self.workspace_base).mkdir(parents=True, exist_ok=True)
     
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call on the engine's thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+    
+    async def _stream_build(self, repo_path: str, image_tag: str) -> AsyncIterator[Dict]:
+        """
+        Run a Docker build on the thread pool and yield its decoded output
+        chunks as they arrive, so callers can forward build logs live.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        def pump():
+            try:
+                for chunk in self.docker_client.api.build(
+                    path=repo_path,
+                    tag=image_tag,
+                    rm=True,
+                    forcerm=True,
+                    decode=True
+                ):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+        
+        producer = loop.run_in_executor(self._executor, pump)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            await producer
+    
+    async def _build_image(
+        self,
+        repo_path: str,
+        image_tag: str,
+        log_callback: Optional[LogCallback] = None
+    ) -> str:
+        """
+        Build an image without blocking the event loop
+        
+        Returns:
+            The built image ID
+        """
+        image_id = None
+        build_log = []
+        
+        async for chunk in self._stream_build(repo_path, image_tag):
+            build_log.append(chunk)
+            if "error" in chunk:
+                raise BuildError(chunk["error"], build_log)
+            if "aux" in chunk and "ID" in chunk["aux"]:
+                image_id = chunk["aux"]["ID"]
+            line = chunk.get("stream", "").rstrip()
+            if line:
+                logger.debug(line)
+                if log_callback:
+                    await log_callback(line)
+        
+        if not image_id:
+            image = await self._run_blocking(self.docker_client.images.get, image_tag)
+            image_id = image.id
+        return image_id
+    
     def detect_project_type(self, repo_path: str) -> Optional[str]:
         """
         Detect project type based on files in repository
@@ -136,15 +231,10 @@ CMD ["nginx", "-g", "daemon off;"]
             
             logger.info(f"Cloning {repo_url} (branch: {branch}) to {repo_dir}")
             
-            # Clone repository
-            git.Repo.clone_from(
-                repo_url,
-                repo_dir,
-                branch=branch,
-                depth=1  # Shallow clone for speed
-            )
+            # Check out from the shared mirror, fetching only what changed
+            sha = await self._run_blocking(repo_cache.checkout, repo_url, branch, repo_dir)
             
-            logger.info(f"Successfully cloned repository to {repo_dir}")
+            logger.info(f"Checked out {sha[:12]} to {repo_dir}")
             return True, repo_dir, ""
             
         except GitCommandError as e:
@@ -156,34 +246,40 @@ CMD ["nginx", "-g", "daemon off;"]
             logger.error(error_msg)
             return False, "", error_msg
     
-    def find_available_port(self) -> Optional[int]:
-        """Find an available port in the configured range"""
-        import socket
-        
-        for port in range(self.base_port, self.max_port):
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                try:
-                    s.bind(('', port))
-                    return port
-                except OSError:
-                    continue
+    async def reconcile_ports(self):
+        """Rebuild port leases from the containers Docker already knows about"""
+        if not self.docker_client:
+            return
         
-        logger.error("No available ports in range")
-        return None
+        try:
+            containers = await self._run_blocking(self.docker_client.containers.list, all=True)
+            self.ports.reconcile(container_port_leases(containers))
+        except Exception as e:
+            logger.error(f"Failed to reconcile deployment ports: {e}")
     
     async def build_and_deploy(
         self,
         repo_path: str,
         deploy_id: str,
-        project_type: Optional[str] = None
+        project_type: Optional[str] = None,
+        log_callback: Optional[LogCallback] = None,
+        image_lookup: Optional[ImageLookup] = None,
+        timings: Optional[StageTimings] = None
     ) -> Tuple[bool, Dict, str]:
         """
         Build Docker image and run container
         
+        At most DEPLOY_BUILD_CONCURRENCY builds run at once; extra deploys
+        wait for a slot without holding up the event loop.
+        
         Args:
             repo_path: Path to cloned repository
             deploy_id: Unique deployment ID
             project_type: Type of project (optional, will be detected)
+            log_callback: Async callback receiving build output line by line
+            image_lookup: Resolves a build fingerprint to a reusable image
+            timings: Collects stage durations (build_wait, detect, dockerfile,
+                fingerprint, build, run)
             
         Returns:
             Tuple of (success, deployment_info, error_message)
@@ -191,10 +287,30 @@ CMD ["nginx", "-g", "daemon off;"]
         if not self.docker_client:
             return False, {}, "Docker not available in this environment (running in Kubernetes)"
         
+        timings = timings or StageTimings("docker")
+        with timings.stage("build_wait"):
+            await self._build_slots.acquire()
+        try:
+            return await self._build_and_run(repo_path, deploy_id, project_type, log_callback, image_lookup, timings)
+        finally:
+            self._build_slots.release()
+    
+    async def _build_and_run(
+        self,
+        repo_path: str,
+        deploy_id: str,
+        project_type: Optional[str],
+        log_callback: Optional[LogCallback],
+        image_lookup: Optional[ImageLookup] = None,
+        timings: Optional[StageTimings] = None
+    ) -> Tuple[bool, Dict, str]:
+        """Build and run one deployment (caller holds a build slot)"""
+        timings = timings or StageTimings("docker")
         try:
             # Detect project type if not provided
             if not project_type:
-                project_type = self.detect_project_type(repo_path)
+                with timings.stage("detect"):
+                    project_type = self.detect_project_type(repo_path)
                 if not project_type:
                     return False, {}, "Could not detect project type"
             
@@ -202,29 +318,37 @@ CMD ["nginx", "-g", "daemon off;"]
             
             # Check if Dockerfile exists, if not create one
             dockerfile_path = Path(repo_path) / "Dockerfile"
-            if not dockerfile_path.exists():
-                logger.info("No Dockerfile found, generating one")
-                dockerfile_content = self.generate_dockerfile(project_type, repo_path)
-                dockerfile_path.write_text(dockerfile_content)
-            
-            # Build Docker image
-            image_tag = f"autostack-deploy-{deploy_id}"
-            logger.info(f"Building Docker image: {image_tag}")
-            
-            image, build_logs = self.docker_client.images.build(
-                path=repo_path,
-                tag=image_tag,
-                rm=True,
-                forcerm=True
-            )
-            
-            # Log build output
-            for log in build_logs:
-                if 'stream' in log:
-                    logger.debug(log['stream'].strip())
+            with timings.stage("dockerfile"):
+                if not dockerfile_path.exists():
+                    logger.info("No Dockerfile found, generating one")
+                    dockerfile_content = self.generate_dockerfile(project_type, repo_path)
+                    dockerfile_path.write_text(dockerfile_content)
+            
+            # Skip the build when an identical source tree was built before
+            with timings.stage("fingerprint"):
+                fingerprint = await self._run_blocking(
+                    compute_fingerprint, repo_path, dockerfile_path.read_text()
+                )
+                image_tag = await lookup_image(
+                    image_lookup, fingerprint, "docker", verify=self._image_exists
+                )
+            build_reused = image_tag is not None
+            
+            if build_reused:
+                logger.info(f"Reusing image {image_tag} for fingerprint {fingerprint[:12]}")
+                if log_callback:
+                    await log_callback(f"♻️  Source unchanged, reusing image {image_tag}")
+                image_id = image_tag
+            else:
+                # Build Docker image
+                image_tag = f"autostack-deploy-{deploy_id}"
+                logger.info(f"Building Docker image: {image_tag}")
+                
+                with timings.stage("build"):
+                    image_id = await self._build_image(repo_path, image_tag, log_callback)
             
-            # Find available port
-            port = self.find_available_port()
+            # Lease a host port; released again if the container never starts
+            port = self.ports.allocate(deploy_id)
             if not port:
                 return False, {}, "No available ports"
             
@@ -241,23 +365,34 @@ CMD ["nginx", "-g", "daemon off;"]
             }
             internal_port = internal_ports.get(project_type, 8000)
             
-            container = self.docker_client.containers.run(
-                image=image.id,
-                name=container_name,
-                ports={f'{internal_port}/tcp': port},
-                detach=True,
-                restart_policy={"Name": "unless-stopped"}
-            )
+            try:
+                with timings.stage("run"):
+                    container = await self._run_blocking(
+                        self.docker_client.containers.run,
+                        image=image_id,
+                        name=container_name,
+                        ports={f'{internal_port}/tcp': port},
+                        labels={PORT_LABEL: str(port), DEPLOY_LABEL: deploy_id},
+                        detach=True,
+                        restart_policy={"Name": "unless-stopped"}
+                    )
+            except Exception:
+                self.ports.release(port)
+                raise
             
             deployment_info = {
                 "container_id": container.id,
                 "container_name": container_name,
-                "image_id": image.id,
+                "image_id": image_id,
                 "image_tag": image_tag,
+                "image": image_tag,
+                "build_fingerprint": fingerprint,
+                "build_reused": build_reused,
                 "port": port,
                 "internal_port": internal_port,
                 "url": f"http://localhost:{port}",
                 "project_type": project_type,
+                "stage_timings": timings.as_dict(),
                 "status": "running"
             }
             
@@ -277,15 +412,24 @@ CMD ["nginx", "-g", "daemon off;"]
             logger.error(error_msg)
             return False, {}, error_msg
     
+    async def _image_exists(self, image_ref: str) -> bool:
+        try:
+            await self._run_blocking(self.docker_client.images.get, image_ref)
+            return True
+        except ImageNotFound:
+            return False
+    
     async def stop_deployment(self, container_id: str) -> Tuple[bool, str]:
         """Stop and remove a deployment container"""
         if not self.docker_client:
             return False, "Docker not available in this environment"
         
         try:
-            container = self.docker_client.containers.get(container_id)
-            container.stop(timeout=10)
-            container.remove()
+            container = await self._run_blocking(self.docker_client.containers.get, container_id)
+            await self._run_blocking(container.stop, timeout=10)
+            await self._run_blocking(container.remove)
+            for port in container_port_leases([container]):
+                self.ports.release(port)
             logger.info(f"Stopped and removed container {container_id}")
             return True, ""
         except Exception as e:
@@ -299,8 +443,8 @@ CMD ["nginx", "-g", "daemon off;"]
             return "Docker not available in this environment (running in Kubernetes)"
         
         try:
-            container = self.docker_client.containers.get(container_id)
-            logs = container.logs(tail=tail, timestamps=True)
+            container = await self._run_blocking(self.docker_client.containers.get, container_id)
+            logs = await self._run_blocking(container.logs, tail=tail, timestamps=True)
             return logs.decode('utf-8')
         except Exception as e:
             logger.error(f"Failed to get logs: {e}")
@@ -310,7 +454,7 @@ CMD ["nginx", "-g", "daemon off;"]
         """Clean up cloned repository"""
         try:
             if os.path.exists(repo_path):
-                shutil.rmtree(repo_path)
+                repo_cache.release(repo_path)
                 logger.info(f"Cleaned up workspace: {repo_path}")
         except Exception as e:
             logger.error(f"Failed to cleanup workspace: {e}")
@@ -319,7 +463,10 @@ CMD ["nginx", "-g", "daemon off;"]
         self,
         repo_url: str,
         branch: str,
-        deploy_id: str
+        deploy_id: str,
+        log_callback: Optional[LogCallback] = None,
+        image_lookup: Optional[ImageLookup] = None,
+        timings: Optional[StageTimings] = None
     ) -> Tuple[bool, Dict, str]:
         """
         Complete deployment flow: clone, build, and deploy
@@ -328,23 +475,31 @@ CMD ["nginx", "-g", "daemon off;"]
             repo_url: GitHub repository URL
             branch: Branch to deploy
             deploy_id: Unique deployment ID
+            log_callback: Async callback receiving build output line by line
+            image_lookup: Resolves a build fingerprint to a reusable image
+            timings: Collects stage durations, including the clone
             
         Returns:
             Tuple of (success, deployment_info, error_message)
         """
         repo_path = ""
+        timings = timings or StageTimings("docker")
         
         try:
             # Step 1: Clone repository
-            success, repo_path, error = await self.clone_repository(repo_url, branch)
+            with timings.stage("clone"):
+                success, repo_path, error = await self.clone_repository(repo_url, branch)
             if not success:
                 return False, {}, error
             
             # Step 2: Build and deploy
-            success, deploy_info, error = await self.build_and_deploy(repo_path, deploy_id)
+            success, deploy_info, error = await self.build_and_deploy(
+                repo_path, deploy_id, log_callback=log_callback, image_lookup=image_lookup,
+                timings=timings
+            )
             
             # Step 3: Cleanup (always run)
-            self.cleanup_workspace(repo_path)
+            await self._run_blocking(self.cleanup_workspace, repo_path)
             
             return success, deploy_info, error
             
@@ -354,7 +509,7 @@ CMD ["nginx", "-g", "daemon off;"]
             
             # Cleanup on error
             if repo_path:
-                self.cleanup_workspace(repo_path)
+                await self._run_blocking(self.cleanup_workspace, repo_path)
             
             return False, {}, error_msg
 
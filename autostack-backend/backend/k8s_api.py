@@ -0,0 +1,325 @@
+"""
+Kubernetes API client for AutoStack
+Pooled async HTTP access to the API server with server-side apply
+"""
+
+import asyncio
+import atexit
+import base64
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+import yaml
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SERVICE_ACCOUNT_DIR = "/var/run/secrets/kubernetes.io/serviceaccount"
+FIELD_MANAGER = "autostack"
+
+# Plural resource names for the kinds AutoStack manages
+RESOURCE_PLURALS = {
+    "Deployment": "deployments",
+    "Service": "services",
+    "HorizontalPodAutoscaler": "horizontalpodautoscalers",
+    "Job": "jobs",
+    "Pod": "pods",
+    "ConfigMap": "configmaps",
+    "Secret": "secrets",
+    "Ingress": "ingresses",
+    "Namespace": "namespaces",
+}
+CLUSTER_SCOPED_KINDS = {"Namespace"}
+
+
+class KubernetesAPIError(Exception):
+    """Raised when the API server rejects a request"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+class ExecCredentialAuth(httpx.Auth):
+    """
+    Bearer auth from a kubeconfig ``exec`` plugin (e.g. ``aws eks get-token``).
+    The token is cached until shortly before it expires.
+    """
+
+    def __init__(self, exec_config: Dict):
+        self.exec_config = exec_config
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def async_auth_flow(self, request):
+        async with self._lock:
+            if not self._token or time.time() > self._expires_at - 60:
+                self._token, self._expires_at = await asyncio.to_thread(self._fetch_token)
+        request.headers["Authorization"] = f"Bearer {self._token}"
+        yield request
+
+    def _fetch_token(self):
+        env = dict(os.environ)
+        for item in self.exec_config.get("env") or []:
+            env[item["name"]] = item["value"]
+        result = subprocess.run(
+            [self.exec_config["command"], *(self.exec_config.get("args") or [])],
+            capture_output=True, check=True, env=env, timeout=30,
+        )
+        status = json.loads(result.stdout).get("status", {})
+        expires_at = time.time() + 600
+        if status.get("expirationTimestamp"):
+            expires_at = datetime.fromisoformat(
+                status["expirationTimestamp"].replace("Z", "+00:00")
+            ).timestamp()
+        return status["token"], expires_at
+
+
+# kubeconfig ``*-data`` field -> temp file holding it, removed at exit
+_materialized: Dict[str, str] = {}
+
+
+def _materialize(data: Optional[str], path: Optional[str], suffix: str) -> Optional[str]:
+    """Return a file path for kubeconfig ``*-data`` fields (ssl needs files)"""
+    if path or not data:
+        return path
+    existing = _materialized.get(data)
+    if existing and os.path.exists(existing):
+        return existing
+    handle = tempfile.NamedTemporaryFile(prefix="autostack-kube-", suffix=suffix, delete=False)
+    handle.write(base64.b64decode(data))
+    handle.close()
+    _materialized[data] = handle.name
+    return handle.name
+
+
+@atexit.register
+def _remove_materialized():
+    """Delete the CA, client certificate and key files written by ``_materialize``"""
+    for name in _materialized.values():
+        try:
+            os.unlink(name)
+        except OSError:
+            pass
+    _materialized.clear()
+
+
+def _load_kubeconfig(path: str) -> Optional[Dict[str, Any]]:
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+
+    context_name = os.getenv("K8S_CONTEXT") or config.get("current-context")
+    context = next((c["context"] for c in config.get("contexts", []) if c["name"] == context_name), None)
+    if not context:
+        return None
+    cluster = next(c["cluster"] for c in config.get("clusters", []) if c["name"] == context["cluster"])
+    user = next((u["user"] for u in config.get("users", []) if u["name"] == context.get("user")), {})
+
+    settings: Dict[str, Any] = {"server": cluster["server"], "headers": {}}
+    if cluster.get("insecure-skip-tls-verify"):
+        settings["verify"] = False
+    else:
+        settings["verify"] = _materialize(
+            cluster.get("certificate-authority-data"), cluster.get("certificate-authority"), ".crt"
+        ) or True
+
+    if user.get("token"):
+        settings["headers"]["Authorization"] = f"Bearer {user['token']}"
+    elif user.get("exec"):
+        settings["auth"] = ExecCredentialAuth(user["exec"])
+    cert = _materialize(user.get("client-certificate-data"), user.get("client-certificate"), ".crt")
+    key = _materialize(user.get("client-key-data"), user.get("client-key"), ".key")
+    if cert and key:
+        settings["cert"] = (cert, key)
+    return settings
+
+
+def load_api_config() -> Optional[Dict[str, Any]]:
+    """
+    Resolve API server settings, in order: K8S_API_SERVER (+ K8S_API_TOKEN,
+    e.g. ``kubectl proxy``), the in-cluster service account, then the
+    kubeconfig at $KUBECONFIG or ~/.kube/config. None when nothing is found.
+    """
+    server = os.getenv("K8S_API_SERVER")
+    if server:
+        token = os.getenv("K8S_API_TOKEN")
+        return {
+            "server": server,
+            "headers": {"Authorization": f"Bearer {token}"} if token else {},
+            "verify": os.getenv("K8S_API_CA_FILE") or True,
+        }
+
+    if os.getenv("KUBERNETES_SERVICE_HOST"):
+        host = os.environ["KUBERNETES_SERVICE_HOST"]
+        port = os.getenv("KUBERNETES_SERVICE_PORT", "443")
+        settings: Dict[str, Any] = {"server": f"https://{host}:{port}", "headers": {}, "verify": True}
+        try:
+            with open(os.path.join(SERVICE_ACCOUNT_DIR, "token")) as f:
+                settings["headers"]["Authorization"] = f"Bearer {f.read().strip()}"
+        except OSError:
+            pass
+        ca_file = os.path.join(SERVICE_ACCOUNT_DIR, "ca.crt")
+        if os.path.exists(ca_file):
+            settings["verify"] = ca_file
+        return settings
+
+    kubeconfig = os.getenv("KUBECONFIG", str(Path.home() / ".kube" / "config")).split(os.pathsep)[0]
+    if os.path.exists(kubeconfig):
+        try:
+            return _load_kubeconfig(kubeconfig)
+        except Exception as e:
+            logger.error(f"Failed to load kubeconfig {kubeconfig}: {e}")
+    return None
+
+
+def create_api_client() -> Optional[httpx.AsyncClient]:
+    """
+    Build one long-lived HTTP client for the API server. Connections are kept
+    alive and reused (multiplexed over HTTP/2 when ``h2`` is installed).
+    """
+    settings = load_api_config()
+    if settings is None:
+        return None
+
+    max_connections = int(os.getenv("K8S_API_MAX_CONNECTIONS", "20"))
+    return httpx.AsyncClient(
+        base_url=settings["server"],
+        headers=settings.get("headers") or {},
+        auth=settings.get("auth"),
+        verify=settings.get("verify", True),
+        cert=settings.get("cert"),
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=httpx.Timeout(30.0),
+    )
+
+
+class KubernetesAPI:
+    """Typed-enough wrapper over the API server for AutoStack's resources"""
+
+    def __init__(self, client: httpx.AsyncClient, namespace: str = "user-apps"):
+        self.client = client
+        self.namespace = namespace
+
+    @classmethod
+    def from_environment(cls, namespace: str = "user-apps") -> Optional["KubernetesAPI"]:
+        client = create_api_client()
+        if client is None:
+            return None
+        return cls(client, namespace=namespace)
+
+    # ========================
+    # Paths
+    # ========================
+
+    def collection_path(self, api_version: str, kind: str, namespace: Optional[str] = None) -> str:
+        prefix = "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+        plural = RESOURCE_PLURALS.get(kind) or f"{kind.lower()}s"
+        if kind in CLUSTER_SCOPED_KINDS:
+            return f"{prefix}/{plural}"
+        return f"{prefix}/namespaces/{namespace or self.namespace}/{plural}"
+
+    def object_path(self, obj: Dict) -> str:
+        metadata = obj.get("metadata", {})
+        collection = self.collection_path(obj["apiVersion"], obj["kind"], metadata.get("namespace"))
+        return f"{collection}/{metadata['name']}"
+
+    # ========================
+    # Operations
+    # ========================
+
+    async def apply(self, obj: Dict) -> Dict:
+        """Server-side apply a manifest; creates or updates in one request"""
+        response = await self.client.patch(
+            self.object_path(obj),
+            params={"fieldManager": FIELD_MANAGER, "force": "true"},
+            # JSON is valid YAML, so no temp files or YAML serialization
+            content=json.dumps(obj),
+            headers={"Content-Type": "application/apply-patch+yaml"},
+        )
+        return self._json(response)
+
+    async def apply_many(self, objs: Iterable[Dict]) -> List[Dict]:
+        """Apply manifests concurrently (cluster-scoped objects first)"""
+        objs = list(objs)
+        cluster_scoped = [o for o in objs if o["kind"] in CLUSTER_SCOPED_KINDS]
+        namespaced = [o for o in objs if o["kind"] not in CLUSTER_SCOPED_KINDS]
+        results = [await self.apply(o) for o in cluster_scoped]
+        results.extend(await asyncio.gather(*(self.apply(o) for o in namespaced)))
+        return results
+
+    async def get(self, api_version: str, kind: str, name: str) -> Optional[Dict]:
+        response = await self.client.get(f"{self.collection_path(api_version, kind)}/{name}")
+        if response.status_code == 404:
+            return None
+        return self._json(response)
+
+    async def list(self, api_version: str, kind: str, label_selector: Optional[str] = None) -> List[Dict]:
+        params = {"labelSelector": label_selector} if label_selector else None
+        response = await self.client.get(self.collection_path(api_version, kind), params=params)
+        return self._json(response).get("items", [])
+
+    async def delete(self, api_version: str, kind: str, name: str) -> bool:
+        """Delete one object (dependents in the background); False if it was absent"""
+        response = await self.client.request(
+            "DELETE",
+            f"{self.collection_path(api_version, kind)}/{name}",
+            json={"kind": "DeleteOptions", "apiVersion": "v1", "propagationPolicy": "Background"},
+        )
+        if response.status_code == 404:
+            return False
+        self._json(response)
+        return True
+
+    async def delete_by_label(self, kinds: Iterable[tuple], label_selector: str) -> int:
+        """Delete every object of the given (api_version, kind) pairs matching a selector"""
+        listings = await asyncio.gather(*(self.list(v, k, label_selector) for v, k in kinds))
+        deletions = [
+            self.delete(v, k, item["metadata"]["name"])
+            for (v, k), items in zip(kinds, listings)
+            for item in items
+        ]
+        return sum(await asyncio.gather(*deletions))
+
+    async def pod_logs(self, label_selector: str, tail: int = 100) -> str:
+        """Tail logs of every pod matching a selector, fetched concurrently"""
+        pods = await self.list("v1", "Pod", label_selector)
+
+        async def fetch(pod: Dict) -> str:
+            response = await self.client.get(
+                f"{self.collection_path('v1', 'Pod')}/{pod['metadata']['name']}/log",
+                params={"tailLines": str(tail)},
+            )
+            if response.status_code >= 400:
+                return ""
+            return response.text
+
+        logs = await asyncio.gather(*(fetch(p) for p in pods))
+        return "".join(text if text.endswith("\n") or not text else text + "\n" for text in logs)
+
+    async def close(self):
+        await self.client.aclose()
+
+    @staticmethod
+    def _json(response: httpx.Response) -> Dict:
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise KubernetesAPIError(response.status_code, message)
+        return response.json() if response.content else {}
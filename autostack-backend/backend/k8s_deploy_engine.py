@@ -4,20 +4,26 @@ Deploys user applications to AWS EKS with full DevOps features
 """
 
 import os
-import tempfile
 import asyncio
 import logging
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 from datetime import datetime
-import git
 from git.exc import GitCommandError
-import yaml
 import base64
 import secrets
 
+from .build_cache import ImageLookup, compute_fingerprint, lookup_image
+from .k8s_api import KubernetesAPI, KubernetesAPIError
+from .k8s_watch import RolloutTracker
+from .repo_cache import repo_cache
+from .stage_timings import StageTimings
+
 logger = logging.getLogger(__name__)
 
+# Receives human-readable progress lines for a deployment
+LogCallback = Callable[[str], Awaitable[None]]
+
 
 class K8sDeployEngine:
     """Deploys user applications to Kubernetes with full DevOps features"""
@@ -28,6 +34,11 @@ class K8sDeployEngine:
         self.aws_region = os.getenv("AWS_REGION", "ap-south-1")
         self.workspace_base = os.getenv("DEPLOY_WORKSPACE", "/tmp/autostack-deploys")
         Path(self.workspace_base).mkdir(parents=True, exist_ok=True)
+        self.build_timeout = int(os.getenv("K8S_BUILD_TIMEOUT", "600"))
+        self.load_balancer_timeout = int(os.getenv("K8S_LB_TIMEOUT", "300"))
+        # One pooled API client and one watch stream per kind, shared by all deploys
+        self.k8s = KubernetesAPI.from_environment(self.namespace)
+        self.rollout_tracker = RolloutTracker(self.k8s.client, self.namespace) if self.k8s else None
         
     def generate_app_name(self, repo_url: str) -> str:
         """Generate a unique app name from repo URL"""
@@ -46,50 +57,94 @@ class K8sDeployEngine:
         branch: str,
         deploy_id: str,
         user_id: str,
-        project_type: Optional[str] = None
+        project_type: Optional[str] = None,
+        log_callback: Optional[LogCallback] = None,
+        image_lookup: Optional[ImageLookup] = None,
+        timings: Optional[StageTimings] = None
     ) -> Tuple[bool, Dict, str]:
         """
         Build and deploy user application to Kubernetes
         
+        Progress lines are passed to ``log_callback`` as each step starts.
+        When ``image_lookup`` knows an image built from the same source tree
+        and Dockerfile, the build and push steps are skipped. Stage durations
+        (clone, detect, dockerfile, fingerprint, build, push, apply, lb_wait)
+        are recorded on ``timings``.
+        
         Returns:
             (success, metadata, message)
         """
+        async def emit(line: str):
+            if log_callback:
+                try:
+                    await log_callback(line)
+                except Exception as e:
+                    logger.warning(f"Log callback failed: {e}")
+        
+        if self.k8s is None:
+            return False, {}, "Kubernetes API not configured"
+        
+        timings = timings or StageTimings("k8s")
+        repo_path = None
         try:
             app_name = self.generate_app_name(repo_url)
             logger.info(f"Starting deployment {deploy_id} for {repo_url} as {app_name}")
             
             # Step 1: Clone repository
-            repo_path = await self._clone_repo(repo_url, branch, deploy_id)
+            await emit("📦 Cloning repository...")
+            with timings.stage("clone"):
+                repo_path = await self._clone_repo(repo_url, branch, deploy_id)
             if not repo_path:
                 return False, {}, "Failed to clone repository"
             
             # Step 2: Detect project type
-            if not project_type:
-                project_type = self._detect_project_type(repo_path)
+            with timings.stage("detect"):
+                if not project_type:
+                    project_type = self._detect_project_type(repo_path)
             logger.info(f"Detected project type: {project_type}")
+            await emit(f"🔎 Detected project type: {project_type}")
             
             # Step 3: Create Dockerfile if needed
-            dockerfile_path = await self._ensure_dockerfile(repo_path, project_type)
+            with timings.stage("dockerfile"):
+                dockerfile_path = await self._ensure_dockerfile(repo_path, project_type)
             
-            # Step 4: Build Docker image using Kubernetes Job
-            image_name = f"{self.ecr_registry}/user-{app_name}:{deploy_id[:8]}"
-            build_success = await self._build_image_k8s(repo_path, image_name, deploy_id)
-            if not build_success:
-                return False, {"image": image_name}, "Failed to build Docker image"
+            # Step 4: Reuse an image built from an identical source tree
+            with timings.stage("fingerprint"):
+                fingerprint = await asyncio.to_thread(
+                    compute_fingerprint, repo_path, Path(dockerfile_path).read_text()
+                )
+                image_name = await lookup_image(image_lookup, fingerprint, "k8s")
+            build_reused = image_name is not None
             
-            # Step 5: Push to ECR
-            push_success = await self._push_to_ecr(image_name)
-            if not push_success:
-                return False, {"image": image_name}, "Failed to push image to ECR"
+            if build_reused:
+                logger.info(f"Reusing image {image_name} for fingerprint {fingerprint[:12]}")
+                await emit(f"♻️  Source unchanged, reusing image {image_name}")
+            else:
+                # Step 5: Build Docker image using Kubernetes Job
+                image_name = f"{self.ecr_registry}/user-{app_name}:{deploy_id[:8]}"
+                await emit("🔨 Building Docker image...")
+                with timings.stage("build"):
+                    build_success = await self._build_image_k8s(repo_path, image_name, deploy_id)
+                if not build_success:
+                    return False, {"image": image_name}, "Failed to build Docker image"
+                
+                # Step 6: Push to ECR
+                await emit("☁️  Pushing to AWS ECR...")
+                with timings.stage("push"):
+                    push_success = await self._push_to_ecr(image_name)
+                if not push_success:
+                    return False, {"image": image_name}, "Failed to push image to ECR"
             
-            # Step 6: Deploy to Kubernetes
+            # Step 7: Deploy to Kubernetes
+            await emit("🚀 Deploying to Kubernetes...")
             deployment_url = await self._deploy_to_k8s(
                 app_name=app_name,
                 image_name=image_name,
                 deploy_id=deploy_id,
                 user_id=user_id,
                 repo_url=repo_url,
-                project_type=project_type
+                project_type=project_type,
+                timings=timings
             )
             
             if not deployment_url:
@@ -101,6 +156,9 @@ class K8sDeployEngine:
                 "url": deployment_url,
                 "namespace": self.namespace,
                 "project_type": project_type,
+                "build_fingerprint": fingerprint,
+                "build_reused": build_reused,
+                "stage_timings": timings.as_dict(),
                 "deployed_at": datetime.utcnow().isoformat()
             }
             
@@ -113,22 +171,16 @@ class K8sDeployEngine:
         finally:
             # Cleanup
             if repo_path and Path(repo_path).exists():
-                import shutil
-                shutil.rmtree(repo_path, ignore_errors=True)
+                await asyncio.to_thread(repo_cache.release, repo_path)
     
     async def _clone_repo(self, repo_url: str, branch: str, deploy_id: str) -> Optional[str]:
-        """Clone Git repository"""
+        """Check out the repository from the shared mirror cache"""
         try:
             repo_path = os.path.join(self.workspace_base, deploy_id)
-            logger.info(f"Cloning {repo_url} branch {branch} to {repo_path}")
+            logger.info(f"Checking out {repo_url} branch {branch} to {repo_path}")
             
-            await asyncio.to_thread(
-                git.Repo.clone_from,
-                repo_url,
-                repo_path,
-                branch=branch,
-                depth=1
-            )
+            sha = await asyncio.to_thread(repo_cache.checkout, repo_url, branch, repo_path)
+            logger.info(f"Checked out {sha[:12]} to {repo_path}")
             return repo_path
         except GitCommandError as e:
             logger.error(f"Git clone failed: {str(e)}")
@@ -212,48 +264,24 @@ CMD ["./main"]
             # Create Kubernetes Job manifest for building with Kaniko
             job_manifest = self._create_kaniko_job(repo_path, image_name, deploy_id)
             
-            # Apply job and wait for completion
-            job_file = f"/tmp/build-job-{deploy_id}.yaml"
-            with open(job_file, 'w') as f:
-                yaml.dump(job_manifest, f)
-            
-            # Apply job
-            proc = await asyncio.create_subprocess_exec(
-                "kubectl", "apply", "-f", job_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await proc.communicate()
+            await self._api().apply(job_manifest)
             
-            if proc.returncode != 0:
-                logger.error("Failed to create build job")
+            job_name = job_manifest["metadata"]["name"]
+            try:
+                succeeded = await self.rollout_tracker.wait_for_job(job_name, self.build_timeout)
+            except asyncio.TimeoutError:
+                logger.error("Build job timed out")
                 return False
             
-            # Wait for job completion (with timeout)
-            for _ in range(60):  # 10 minutes timeout
-                proc = await asyncio.create_subprocess_exec(
-                    "kubectl", "get", "job", f"build-{deploy_id[:8]}", 
-                    "-n", self.namespace, "-o", "json",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, _ = await proc.communicate()
-                
-                if proc.returncode == 0:
-                    import json
-                    job_status = json.loads(stdout)
-                    if job_status.get("status", {}).get("succeeded", 0) > 0:
-                        logger.info("Build job completed successfully")
-                        return True
-                    elif job_status.get("status", {}).get("failed", 0) > 0:
-                        logger.error("Build job failed")
-                        return False
-                
-                await asyncio.sleep(10)
+            if succeeded:
+                logger.info("Build job completed successfully")
+            else:
+                logger.error("Build job failed")
+            return succeeded
             
-            logger.error("Build job timed out")
+        except KubernetesAPIError as e:
+            logger.error(f"Failed to create build job: {e}")
             return False
-            
         except Exception as e:
             logger.error(f"Image build failed: {str(e)}")
             return False
@@ -307,55 +335,37 @@ CMD ["./main"]
         deploy_id: str,
         user_id: str,
         repo_url: str,
-        project_type: str
+        project_type: str,
+        timings: Optional[StageTimings] = None
     ) -> Optional[str]:
         """Deploy application to Kubernetes and return public URL"""
+        timings = timings or StageTimings("k8s")
         try:
             # Create deployment and service manifests
             manifests = self._create_k8s_manifests(
                 app_name, image_name, user_id, repo_url, project_type
             )
             
-            # Apply manifests
-            manifest_file = f"/tmp/deploy-{deploy_id}.yaml"
-            with open(manifest_file, 'w') as f:
-                yaml.dump_all(manifests, f)
-            
-            proc = await asyncio.create_subprocess_exec(
-                "kubectl", "apply", "-f", manifest_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await proc.communicate()
-            
-            if proc.returncode != 0:
-                logger.error("Failed to apply Kubernetes manifests")
-                return None
+            # Server-side apply all manifests concurrently over the pooled client
+            with timings.stage("apply"):
+                await self._api().apply_many(manifests)
             
             # Wait for LoadBalancer URL
-            for _ in range(30):  # 5 minutes timeout
-                proc = await asyncio.create_subprocess_exec(
-                    "kubectl", "get", "service", app_name,
-                    "-n", self.namespace, "-o", "json",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
+            with timings.stage("lb_wait"):
+                hostname = await self.rollout_tracker.wait_for_load_balancer(
+                    app_name, self.load_balancer_timeout
                 )
-                stdout, _ = await proc.communicate()
-                
-                if proc.returncode == 0:
-                    import json
-                    service = json.loads(stdout)
-                    ingress = service.get("status", {}).get("loadBalancer", {}).get("ingress", [])
-                    if ingress and ingress[0].get("hostname"):
-                        url = f"http://{ingress[0]['hostname']}"
-                        logger.info(f"LoadBalancer URL ready: {url}")
-                        return url
-                
-                await asyncio.sleep(10)
+            if hostname:
+                url = f"http://{hostname}"
+                logger.info(f"LoadBalancer URL ready: {url}")
+                return url
             
             # Fallback: return service name
             return f"http://{app_name}.{self.namespace}.svc.cluster.local"
             
+        except KubernetesAPIError as e:
+            logger.error(f"Failed to apply Kubernetes manifests: {e}")
+            return None
         except Exception as e:
             logger.error(f"Kubernetes deployment failed: {str(e)}")
             return None
@@ -468,19 +478,18 @@ CMD ["./main"]
     async def delete_deployment(self, app_name: str) -> Tuple[bool, str]:
         """Delete a deployment from Kubernetes"""
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "kubectl", "delete", "all", "-l", f"app={app_name}",
-                "-n", self.namespace,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            api = self._api()
+            await api.delete_by_label(
+                [("apps/v1", "Deployment"), ("v1", "Service"), ("batch/v1", "Job")],
+                f"app={app_name}",
             )
-            await proc.communicate()
-            
-            if proc.returncode == 0:
-                return True, f"Deployment {app_name} deleted successfully"
-            else:
-                return False, f"Failed to delete deployment {app_name}"
+            # The HPA carries no app label; it shares the app's name
+            await api.delete("autoscaling/v2", "HorizontalPodAutoscaler", app_name)
+            return True, f"Deployment {app_name} deleted successfully"
                 
+        except KubernetesAPIError as e:
+            logger.error(f"Delete failed: {str(e)}")
+            return False, f"Failed to delete deployment {app_name}"
         except Exception as e:
             logger.error(f"Delete failed: {str(e)}")
             return False, f"Error deleting deployment: {str(e)}"
@@ -488,13 +497,20 @@ CMD ["./main"]
     async def get_deployment_logs(self, app_name: str, tail: int = 100) -> str:
         """Get logs from deployment"""
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "kubectl", "logs", "-l", f"app={app_name}",
-                "-n", self.namespace, f"--tail={tail}",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await proc.communicate()
-            return stdout.decode('utf-8')
+            return await self._api().pod_logs(f"app={app_name}", tail=tail)
         except Exception as e:
             return f"Error fetching logs: {str(e)}"
+    
+    async def close(self):
+        """Stop watch streams and release pooled API connections"""
+        if self.rollout_tracker:
+            await self.rollout_tracker.close()
+        if self.k8s:
+            await self.k8s.close()
+    
+    def _api(self) -> KubernetesAPI:
+        if self.k8s is None:
+            raise RuntimeError(
+                "Kubernetes API not configured: set K8S_API_SERVER, run in-cluster, or provide a kubeconfig"
+            )
+        return self.k8s
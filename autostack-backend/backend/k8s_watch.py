@@ -0,0 +1,237 @@
+"""
+Kubernetes rollout tracking for AutoStack
+Watch-based status updates for build Jobs and LoadBalancer Services
+"""
+
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .k8s_api import create_api_client
+
+logger = logging.getLogger(__name__)
+
+# Collection paths per tracked resource kind
+RESOURCE_PATHS = {
+    "jobs": "/apis/batch/v1/namespaces/{namespace}/jobs",
+    "services": "/api/v1/namespaces/{namespace}/services",
+}
+
+_PENDING = object()
+
+
+class ResourceWatcher:
+    """
+    Keeps one list+watch stream open for a resource collection and hands every
+    event to ``on_event(event_type, obj)``.
+
+    Follows the usual reflector protocol: list to get a resourceVersion, watch
+    from it, and relist when the server answers 410 Gone.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        path: str,
+        on_event: Callable[[str, Dict], None],
+        retry_delay: float = 1.0,
+        watch_timeout: int = 300,
+    ):
+        self.client = client
+        self.path = path
+        self.on_event = on_event
+        self.retry_delay = retry_delay
+        self.watch_timeout = watch_timeout
+        self.synced = asyncio.Event()
+
+    async def run(self):
+        resource_version = None
+        while True:
+            try:
+                if resource_version is None:
+                    resource_version = await self._list()
+                resource_version = await self._watch(resource_version)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Watch on {self.path} interrupted: {e}")
+                await asyncio.sleep(self.retry_delay)
+
+    async def _list(self) -> str:
+        response = await self.client.get(self.path)
+        response.raise_for_status()
+        body = response.json()
+        for obj in body.get("items", []):
+            self.on_event("ADDED", obj)
+        self.synced.set()
+        return body.get("metadata", {}).get("resourceVersion", "")
+
+    async def _watch(self, resource_version: str) -> Optional[str]:
+        """Stream events; return the version to resume from, or None to relist"""
+        params = {
+            "watch": "1",
+            "resourceVersion": resource_version,
+            "allowWatchBookmarks": "true",
+            "timeoutSeconds": str(self.watch_timeout),
+        }
+        timeout = httpx.Timeout(10.0, read=self.watch_timeout + 30)
+        async with self.client.stream("GET", self.path, params=params, timeout=timeout) as response:
+            if response.status_code == 410:
+                return None
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                event_type = event.get("type")
+                obj = event.get("object", {})
+
+                if event_type == "ERROR":
+                    if obj.get("code") == 410:
+                        return None
+                    raise RuntimeError(obj.get("message", "watch error"))
+
+                resource_version = obj.get("metadata", {}).get("resourceVersion", resource_version)
+                if event_type != "BOOKMARK":
+                    self.on_event(event_type, obj)
+
+        return resource_version
+
+
+class RolloutTracker:
+    """
+    Resolves "build job finished" and "LoadBalancer ready" waits from watch
+    events, sharing one stream per resource kind across all in-flight deploys.
+
+    Watches start lazily on the first wait for a kind and keep the latest
+    status of every object, so a wait registered after the event still
+    resolves immediately.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, namespace: str = "user-apps", retry_delay: float = 1.0):
+        self.client = client
+        self.namespace = namespace
+        self.retry_delay = retry_delay
+        self._status: Dict[str, Dict[str, Dict]] = {kind: {} for kind in RESOURCE_PATHS}
+        self._waiters: Dict[str, Dict[str, List[Tuple[Callable, asyncio.Future]]]] = {
+            kind: {} for kind in RESOURCE_PATHS
+        }
+        self._watchers: Dict[str, ResourceWatcher] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_environment(cls, namespace: str = "user-apps") -> Optional["RolloutTracker"]:
+        client = create_api_client()
+        if client is None:
+            return None
+        return cls(client, namespace=namespace)
+
+    async def wait_for_job(self, name: str, timeout: float) -> bool:
+        """
+        Wait for a Job to finish. Returns True on success, False on failure
+        (or deletion); raises asyncio.TimeoutError after ``timeout`` seconds.
+        """
+        return await self._wait("jobs", name, self._job_result, timeout)
+
+    async def wait_for_load_balancer(self, name: str, timeout: float) -> Optional[str]:
+        """Wait for a Service's LoadBalancer address; None on timeout"""
+        try:
+            return await self._wait("services", name, self._load_balancer_address, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._watchers.clear()
+
+    # ========================
+    # Resolution
+    # ========================
+
+    @staticmethod
+    def _job_result(obj: Optional[Dict]):
+        if obj is None:
+            return False  # deleted before finishing
+        status = obj.get("status", {})
+        for condition in status.get("conditions") or []:
+            if condition.get("status") != "True":
+                continue
+            if condition.get("type") == "Complete":
+                return True
+            if condition.get("type") == "Failed":
+                return False
+        if status.get("succeeded", 0) > 0:
+            return True
+        return _PENDING
+
+    @staticmethod
+    def _load_balancer_address(obj: Optional[Dict]):
+        if obj is None:
+            return _PENDING
+        ingress = obj.get("status", {}).get("loadBalancer", {}).get("ingress") or []
+        if ingress:
+            address = ingress[0].get("hostname") or ingress[0].get("ip")
+            if address:
+                return address
+        return _PENDING
+
+    async def _wait(self, kind: str, name: str, resolve: Callable, timeout: float):
+        self._ensure_watch(kind)
+
+        cached = self._status[kind].get(name)
+        if cached is not None:
+            result = resolve(cached)
+            if result is not _PENDING:
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (resolve, future)
+        self._waiters[kind].setdefault(name, []).append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self._waiters[kind].get(name, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self._waiters[kind].pop(name, None)
+
+    def _on_event(self, kind: str, event_type: str, obj: Dict):
+        name = obj.get("metadata", {}).get("name")
+        if not name:
+            return
+
+        if event_type == "DELETED":
+            self._status[kind].pop(name, None)
+            current = None
+        else:
+            # Keep only what the resolvers read
+            current = {"status": obj.get("status") or {}}
+            self._status[kind][name] = current
+
+        for resolve, future in list(self._waiters[kind].get(name, [])):
+            if future.done():
+                continue
+            result = resolve(current)
+            if result is not _PENDING:
+                future.set_result(result)
+
+    def _ensure_watch(self, kind: str):
+        task = self._tasks.get(kind)
+        if task and not task.done():
+            return
+        watcher = ResourceWatcher(
+            self.client,
+            RESOURCE_PATHS[kind].format(namespace=self.namespace),
+            lambda event_type, obj: self._on_event(kind, event_type, obj),
+            retry_delay=self.retry_delay,
+        )
+        self._watchers[kind] = watcher
+        self._tasks[kind] = asyncio.create_task(watcher.run())
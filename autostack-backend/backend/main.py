@@ -1,7 +1,9 @@
 # main.py
 import asyncio
+import os
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
 
 import aiohttp
 from dotenv import load_dotenv
@@ -10,21 +12,34 @@ from fastapi import (
     Depends,
     FastAPI,
     HTTPException,
+    Query,
     Request,
     WebSocket,
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from . import crud, models
-from .auth import get_current_user, router as auth_router
+from .auth import get_current_user, get_current_user_or_api_key, router as auth_router
 from .db import AsyncSessionLocal, get_db
-from .middleware import ErrorHandlingMiddleware, RateLimitMiddleware
-from .middleware.rate_limit import RateLimitMiddleware as NewRateLimitMiddleware, AccountLockoutMiddleware
+from .middleware import EdgeMiddleware
 from .deploy_engine import DeployEngine
 from .k8s_deploy_engine import K8sDeployEngine
+from .metrics import registry as metrics_registry
+from .stage_timings import StageTimings
+from .worker import DeployWorker
+from .services.agent_sweeper import agent_sweeper
+from .services.api_key_usage import api_key_usage
+from .services.budget_service import budget_service
+from .services.deploy_log_service import deploy_log_service
+from .services.job_queue import PRIORITY_DEPLOY, QueueFull, job_queue
+from .services.log_bus import LogBusLagged, log_bus
+from .services.metrics_store import metrics_store
+from .utils.overview_cache import overview_cache
+from .utils.password_pool import password_pool
 from .schemas import (
     AgentHeartbeat,
     AgentRegister,
@@ -38,7 +53,12 @@ from .schemas import (
     APIKeyResponse,
     AuditLogResponse,
     DeployCreate,
+    DeployLogEntry,
+    DeployLogPage,
     DeployResponse,
+    MetricSeries,
+    MetricsIngest,
+    MetricsIngestResponse,
     MetricsOverview,
 )
 
@@ -51,62 +71,8 @@ app = FastAPI(
     version="1.0.0",
 )
 
-# Middleware (order matters - error handling should be last)
-import os
-import re
-
-# CORS configuration - allow all localhost, 127.0.0.1, and frontend container origins
-def is_allowed_origin(origin: str) -> bool:
-    """Check if origin is allowed (localhost, 127.0.0.1, or frontend container on any port)"""
-    if not origin:
-        return False
-    # Allow localhost, 127.0.0.1, and frontend container on any port
-    # Also allow http://frontend:3000 for Docker internal networking
-    pattern = r'^https?://(localhost|127\.0\.0\.1|frontend)(:\d+)?$'
-    return bool(re.match(pattern, origin))
-
-# Custom CORS middleware that allows localhost/127.0.0.1 dynamically
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-
-class DynamicCORSMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        origin = request.headers.get("origin")
-        
-        # Handle preflight
-        if request.method == "OPTIONS":
-            if origin and is_allowed_origin(origin):
-                return Response(
-                    status_code=200,
-                    headers={
-                        "Access-Control-Allow-Origin": origin,
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, PATCH, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With, X-API-Key, Accept",
-                        "Access-Control-Allow-Credentials": "true",
-                        "Access-Control-Max-Age": "3600",
-                    }
-                )
-            else:
-                # Return 403 for disallowed origins on preflight
-                return Response(status_code=403, content="Origin not allowed")
-        
-        response = await call_next(request)
-        
-        # Add CORS headers to response
-        if origin and is_allowed_origin(origin):
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
-            response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With, X-API-Key, Accept"
-            response.headers["Access-Control-Expose-Headers"] = "Content-Type, Authorization"
-        
-        return response
-
-app.add_middleware(DynamicCORSMiddleware)
-# NEW: Enhanced rate limiting and account lockout
-app.add_middleware(NewRateLimitMiddleware)
-app.add_middleware(AccountLockoutMiddleware)
-app.add_middleware(ErrorHandlingMiddleware)
+# Edge middleware: CORS, rate limiting, login lockout and error mapping in one pass
+app.add_middleware(EdgeMiddleware)
 
 # Note: Database tables are managed by Alembic migrations
 # Run: alembic upgrade head
@@ -138,6 +104,20 @@ app.include_router(deployments_router, prefix="/api", tags=["deployments"])
 deploy_engine = DeployEngine()  # Legacy local Docker deployment
 k8s_deploy_engine = K8sDeployEngine()  # New Kubernetes deployment for production
 
+# Deploy jobs run on a worker pool: in this process ("embedded") or in
+# separate `python -m backend.worker` processes ("external")
+DEPLOY_WORKER_MODE = os.getenv("DEPLOY_WORKER_MODE", "embedded")
+deploy_worker = DeployWorker()
+
+# Upper bound on samples accepted by one POST /agents/metrics
+METRICS_INGEST_MAX_SAMPLES = int(os.getenv("METRICS_INGEST_MAX_SAMPLES", "5000"))
+
+# Seconds without live log lines before a log WebSocket re-polls storage
+DEPLOY_LOG_FOLLOW_IDLE_SECONDS = float(os.getenv("DEPLOY_LOG_FOLLOW_IDLE_SECONDS", "5"))
+
+# Default range for GET /metrics/series
+METRICS_SERIES_DEFAULT_RANGE = timedelta(hours=1)
+
 # ========================
 # Health Check
 # ========================
@@ -156,11 +136,15 @@ async def health_check():
 @app.post("/deploy")
 async def deploy_endpoint(
     payload: DeployCreate,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
+    try:
+        await job_queue.check_capacity(db, current_user.id)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
     deploy_id = str(uuid.uuid4())
     deploy = await crud.create_deploy(
         db,
@@ -170,13 +154,13 @@ async def deploy_endpoint(
         branch=payload.branch,
         environment=payload.environment,
     )
-    # Start deployment in background
-    background_tasks.add_task(
-        run_deployment,
-        str(deploy.id),
-        payload.repo,
-        payload.branch,
-        current_user.github_token
+    # Queue the deployment for a deploy worker
+    await job_queue.enqueue(
+        db,
+        "deploy",
+        {"deploy_id": str(deploy.id), "repo": payload.repo, "branch": payload.branch},
+        user_id=current_user.id,
+        priority=PRIORITY_DEPLOY,
     )
     
     # Audit log
@@ -195,12 +179,19 @@ async def deploy_endpoint(
 
 
 async def run_deployment(deploy_id: str, repo: str, branch: str, github_token: str = None):
-    """Background task to run actual deployment using Kubernetes deploy engine"""
+    """
+    Deploy job handler: run the actual deployment using Kubernetes deploy engine.
+    Returns the error message of a failed deployment so the job fails with it.
+    """
     async with AsyncSessionLocal() as session:
         deploy = await crud.get_deploy(session, deploy_id)
         if not deploy:
             return
 
+        timings = StageTimings("k8s")
+        if deploy.created_at:
+            timings.record("queue", (datetime.utcnow() - deploy.created_at).total_seconds())
+        
         try:
             # Update status to running
             deploy.status = "running"
@@ -208,18 +199,24 @@ async def run_deployment(deploy_id: str, repo: str, branch: str, github_token: s
             
             # Log: Starting deployment
             await crud.append_log(session, deploy, f"🚀 Starting deployment of {repo} ({branch})...")
-            await crud.append_log(session, deploy, "📦 Cloning repository...")
-            await crud.append_log(session, deploy, "🔨 Building Docker image...")
-            await crud.append_log(session, deploy, "☁️  Pushing to AWS ECR...")
-            await crud.append_log(session, deploy, "🚀 Deploying to Kubernetes...")
             
-            # Run Kubernetes deployment
+            async def engine_log(line: str):
+                await crud.append_log(session, deploy, line, log_type="build")
+            
+            async def image_lookup(fingerprint: str):
+                return await crud.find_reusable_image(session, deploy.user_id, fingerprint)
+            
+            # Run Kubernetes deployment; the engine reports each step as it starts
             success, deploy_info, message = await k8s_deploy_engine.build_and_deploy(
                 repo_url=repo,
                 branch=branch,
                 deploy_id=deploy_id,
-                user_id=str(deploy.user_id)
+                user_id=str(deploy.user_id),
+                log_callback=engine_log,
+                image_lookup=image_lookup,
+                timings=timings,
             )
+            deploy.build_fingerprint = deploy_info.get("build_fingerprint")
             
             if success:
                 # Update deployment with success info
@@ -227,6 +224,7 @@ async def run_deployment(deploy_id: str, repo: str, branch: str, github_token: s
                 deploy.url = deploy_info.get("url")
                 deploy.container_id = deploy_info.get("app_name")  # Store app name
                 deploy.port = 80  # LoadBalancer port
+                deploy.image_ref = deploy_info.get("image")
                 
                 await crud.append_log(session, deploy, f"✅ Deployment successful!")
                 await crud.append_log(session, deploy, f"🌐 Live URL: {deploy_info.get('url')}")
@@ -245,16 +243,40 @@ async def run_deployment(deploy_id: str, repo: str, branch: str, github_token: s
                 # Update deployment with failure info
                 deploy.status = "failed"
                 deploy.error_message = message
-                await crud.append_log(session, deploy, f"❌ Deployment failed: {message}")
+                await crud.append_log(session, deploy, f"❌ Deployment failed: {message}", log_type="error")
             
-            await session.commit()
+            record_stage_timings(deploy, timings)
+            # Flush buffered lines and snapshot them onto deploy.logs
+            await crud.finish_deploy_logs(session, deploy)
+            return None if success else message
             
         except Exception as e:
-            # Handle unexpected errors
+            # Handle unexpected errors, then let the job record the failure
             deploy.status = "failed"
             deploy.error_message = str(e)
-            await crud.append_log(session, deploy, f"❌ Unexpected error: {str(e)}")
-            await session.commit()
+            await crud.append_log(session, deploy, f"❌ Unexpected error: {str(e)}", log_type="error")
+            record_stage_timings(deploy, timings)
+            await crud.finish_deploy_logs(session, deploy)
+            raise
+
+
+def record_stage_timings(deploy: models.Deploy, timings: StageTimings):
+    """Store stage durations and the derived build/deploy/total times on the deploy"""
+    timings.finish(deploy.status)
+    deploy.stage_timings = timings.as_dict()
+    deploy.build_time_seconds = round(timings.sum("clone", "detect", "dockerfile", "fingerprint", "build", "push"))
+    deploy.deploy_time_seconds = round(timings.sum("apply", "lb_wait"))
+    deploy.total_time_seconds = round(timings.total)
+
+async def abandon_deployment(session: AsyncSession, error: str, deploy_id: str, **_):
+    """Fail a deploy whose job ran out of attempts on unresponsive workers"""
+    deploy = await crud.get_deploy(session, deploy_id)
+    if deploy and deploy.status not in ("success", "failed"):
+        deploy.status = "failed"
+        deploy.error_message = error
+
+job_queue.register("deploy", run_deployment, on_abandoned=abandon_deployment)
+
 
 @app.get("/deployments")
 async def list_deploys(
@@ -273,6 +295,7 @@ async def list_deploys(
                     status=d.status,
                     created_at=d.created_at,
                     logs=d.logs,
+                    stage_timings=d.stage_timings,
                 )
                 for d in deploys
             ]
@@ -340,12 +363,40 @@ async def get_deployment_logs(
             return {"logs": logs}
         
         # Fallback to stored logs
-        return {"logs": deploy.logs or "No logs available"}
+        return {"logs": await crud.get_deploy_log_text(db, deploy) or "No logs available"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/deployments/{deploy_id}/build-logs", response_model=DeployLogPage)
+async def get_deployment_build_logs(
+    deploy_id: str,
+    after: int = 0,
+    limit: int = 500,
+    tail: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Page through stored deploy logs by sequence, or fetch the last ``tail`` lines"""
+    deploy = await crud.get_deploy(db, deploy_id)
+    if not deploy:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    if deploy.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    limit = max(1, min(limit, 1000))
+    if tail is not None:
+        entries = await crud.tail_deploy_logs(db, deploy_id, lines=max(1, min(tail, 1000)))
+    else:
+        entries = await crud.list_deploy_logs(db, deploy_id, after_sequence=after, limit=limit)
+
+    return DeployLogPage(
+        entries=[DeployLogEntry(**e) for e in entries],
+        next_sequence=entries[-1]["sequence"] if entries else after,
+        complete=deploy.status in ("success", "failed"),
+    )
+
 @app.post("/deployments/trigger")
 async def trigger_cloud_deployment(
     request: Request,
@@ -522,7 +573,7 @@ async def get_deploy_status(
         "branch": deploy.branch,
         "environment": deploy.environment,
         "status": deploy.status,
-        "logs": deploy.logs or "",
+        "logs": await crud.get_deploy_log_text(db, deploy),
         "url": deploy.url,
         "port": deploy.port,
         "container_id": deploy.container_id,
@@ -541,7 +592,7 @@ async def register_agent(
     payload: AgentRegister,
     request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(get_current_user_or_api_key),
 ):
     """Register a new monitoring agent."""
     agent = await crud.create_agent(
@@ -558,6 +609,7 @@ async def register_agent(
         details=f"Registered agent {payload.name} on {payload.host}",
         ip_address=request.client.host if request.client else None,
     )
+    overview_cache.invalidate(current_user.id)
     
     return agent
 
@@ -566,7 +618,7 @@ async def register_agent(
 async def agent_heartbeat(
     payload: AgentHeartbeat,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(get_current_user_or_api_key),
 ):
     """Update agent heartbeat with system metrics."""
     agent = await crud.get_agent(db, payload.agent_id)
@@ -575,22 +627,40 @@ async def agent_heartbeat(
     if agent.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    agent = await crud.update_agent_heartbeat(
+    agent = await crud.record_agent_heartbeat(
         db, agent, payload.cpu_usage, payload.memory_usage
     )
-    
-    # Store metrics
-    await crud.create_metric(
-        db,
-        user=current_user,
-        agent_id=payload.agent_id,
-        cpu_usage=payload.cpu_usage,
-        memory_usage=payload.memory_usage,
-    )
-    
+    overview_cache.invalidate(current_user.id)
     return agent
 
 
+@app.post("/agents/metrics", response_model=MetricsIngestResponse)
+async def ingest_agent_metrics(
+    payload: MetricsIngest,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_or_api_key),
+):
+    """
+    Bulk-ingest timestamped samples from any of the caller's agents.
+    Responds 404 when none of the agents exist or belong to the caller.
+    """
+    if len(payload.samples) > METRICS_INGEST_MAX_SAMPLES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {METRICS_INGEST_MAX_SAMPLES} samples per request",
+        )
+
+    accepted, rejected, agents = await crud.ingest_metrics(
+        db, user=current_user, samples=[sample.model_dump() for sample in payload.samples]
+    )
+    if not accepted and not await crud.owned_agent_ids(db, current_user, (s.agent_id for s in payload.samples)):
+        # Tells an agent whose record was deleted to register again
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    if agents:
+        overview_cache.invalidate(current_user.id)
+    return MetricsIngestResponse(accepted=accepted, rejected=rejected, agents=agents)
+
+
 @app.get("/agents", response_model=list[AgentResponse])
 async def list_agents(
     db: AsyncSession = Depends(get_db),
@@ -776,14 +846,25 @@ async def test_webhook(
 # ========================
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Process metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/metrics/overview", response_model=MetricsOverview)
 async def get_metrics_overview(
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """Get metrics overview for the current user."""
+    overview = overview_cache.get(current_user.id)
+    if overview is not None:
+        return overview
     try:
+        computed_at = overview_cache.clock()
         overview = await crud.get_metrics_overview(db, current_user)
+        overview_cache.put(current_user.id, overview, computed_at)
         return overview
     except Exception as e:
         print(f"⚠️ Error fetching metrics overview: {e}")
@@ -797,6 +878,41 @@ async def get_metrics_overview(
         )
 
 
+@app.get("/metrics/series", response_model=MetricSeries)
+async def get_metrics_series(
+    agent_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: Literal["auto", "raw", "1m", "1h", "1d"] = "auto",
+    max_points: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Samples for one agent over [start, end), default the last hour. With
+    resolution=auto the finest resolution that covers the range in at most
+    max_points points is used; an explicit resolution needing more is rejected.
+    """
+    end = crud.to_utc_naive(end, datetime.utcnow())
+    start = crud.to_utc_naive(start, end - METRICS_SERIES_DEFAULT_RANGE)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    try:
+        resolution, points = await metrics_store.series(
+            db,
+            user_id=current_user.id,
+            agent_id=agent_id,
+            start=start,
+            end=end,
+            resolution=resolution,
+            max_points=max_points,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MetricSeries(agent_id=agent_id, resolution=resolution, points=points)
+
+
 # ========================
 # API Keys API
 # ========================
@@ -907,29 +1023,142 @@ async def list_audit_logs(
 
 
 @app.websocket("/ws/logs/{deploy_id}")
-async def websocket_logs(websocket: WebSocket, deploy_id: str):
-    """WebSocket endpoint for real-time deployment logs."""
+async def websocket_logs(websocket: WebSocket, deploy_id: str, offset: int = 0):
+    """
+    WebSocket endpoint for real-time deployment logs.
+
+    Stored lines after ``offset`` (a log sequence number) are sent first, then
+    new lines are pushed from the log bus as they are published. When the bus
+    stays quiet for DEPLOY_LOG_FOLLOW_IDLE_SECONDS (e.g. the deploy runs in
+    another process and the bus is in-process), storage is polled again.
+    """
     await websocket.accept()
-    
-    async with AsyncSessionLocal() as session:
-        deploy = await crud.get_deploy(session, deploy_id)
-        if not deploy:
-            await websocket.close(code=1008, reason="Deployment not found")
-            return
 
-        # Send existing logs
-        if deploy.logs:
-            await websocket.send_text(deploy.logs)
+    after = max(0, offset)
+    stream_ended = False
+    while True:
+        # Catch up from storage; status first so no completed lines are missed.
+        # The session is closed before following so no connection sits idle.
+        async with AsyncSessionLocal() as session:
+            deploy = await crud.get_deploy(session, deploy_id)
+            if not deploy:
+                await websocket.close(code=1008, reason="Deployment not found")
+                return
+            finished = deploy.status in ("success", "failed")
+            entries = await crud.list_deploy_logs(session, deploy_id, after_sequence=after)
+        if entries:
+            after = entries[-1]["sequence"]
+            await websocket.send_text(deploy_log_service.render(entries))
+            continue
+        if finished or stream_ended:
+            break
+
+        # Follow live; the bus replays anything published since the read above
+        try:
+            after, stream_ended = await _follow_deploy_logs(websocket, deploy_id, after)
+        except LogBusLagged:
+            continue
 
-        # Simulate new logs
-        for i in range(6):
-            log_line = f"[{datetime.now(timezone.utc).isoformat()}] Log line {i} for {deploy_id}\n"
-            await websocket.send_text(log_line)
-            await asyncio.sleep(1)
-    
     await websocket.close()
 
 
+async def _follow_deploy_logs(websocket: WebSocket, deploy_id: str, after: int) -> tuple[int, bool]:
+    """
+    Push live lines until the stream ends or goes idle. Returns the last
+    sequence sent and whether the stream ended.
+    """
+    stream = log_bus.subscribe(deploy_log_service.topic(deploy_id), after_sequence=after).__aiter__()
+    try:
+        while True:
+            try:
+                entry = await asyncio.wait_for(stream.__anext__(), DEPLOY_LOG_FOLLOW_IDLE_SECONDS)
+            except StopAsyncIteration:
+                return after, True
+            except asyncio.TimeoutError:
+                return after, False
+            after = entry["sequence"]
+            await websocket.send_text(f"{entry['message']}\n")
+    finally:
+        await stream.aclose()
+
+
+@app.on_event("shutdown")
+async def flush_deploy_logs():
+    """Write any buffered deploy log lines before exiting"""
+    await deploy_log_service.stop()
+
+
+@app.on_event("shutdown")
+async def flush_api_key_usage():
+    """Write buffered API key last_used timestamps before exiting"""
+    await api_key_usage.stop()
+
+
+@app.on_event("startup")
+async def start_budget_period_resets():
+    """Zero budget spend when a budget's period ends"""
+    await budget_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_budget_period_resets():
+    await budget_service.stop()
+
+
+@app.on_event("startup")
+async def start_agent_sweeper():
+    """Mark agents that stopped reporting offline"""
+    await agent_sweeper.start()
+
+
+@app.on_event("shutdown")
+async def stop_agent_sweeper():
+    await agent_sweeper.stop()
+
+
+@app.on_event("startup")
+async def start_metrics_maintenance():
+    """Create upcoming metrics partitions and apply retention periodically"""
+    await metrics_store.start()
+
+
+@app.on_event("shutdown")
+async def stop_metrics_maintenance():
+    await metrics_store.stop()
+
+
+@app.on_event("startup")
+async def reconcile_deploy_ports():
+    """Recover host port leases held by existing deployment containers"""
+    await deploy_engine.reconcile_ports()
+
+
+@app.on_event("startup")
+async def start_deploy_worker():
+    """Run a deploy worker in the API process unless workers run separately"""
+    if DEPLOY_WORKER_MODE == "embedded":
+        await deploy_worker.start()
+
+
+@app.on_event("shutdown")
+async def stop_deploy_worker():
+    """Hand in-flight deploy jobs back to the queue"""
+    if DEPLOY_WORKER_MODE == "embedded":
+        await deploy_worker.stop()
+
+
+@app.on_event("shutdown")
+async def close_k8s_engine():
+    """Close Kubernetes watch streams and pooled API connections"""
+    await k8s_deploy_engine.close()
+
+
+@app.on_event("shutdown")
+async def close_password_pool():
+    """Stop the password hashing threads"""
+    password_pool.shutdown()
+
+
 # ========================
 # Startup Event - Auto-fix Database Schema
 # ========================
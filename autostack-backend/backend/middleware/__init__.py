@@ -1,4 +1,4 @@
 """Middleware package"""
-from .rate_limit import RateLimitMiddleware, AccountLockoutMiddleware
+from .edge import EdgeMiddleware
 
-__all__ = ["RateLimitMiddleware", "AccountLockoutMiddleware"]
+__all__ = ["EdgeMiddleware"]
@@ -0,0 +1,278 @@
+"""
+Edge Middleware
+CORS, rate limiting, login lockout and error mapping in one pure-ASGI layer
+"""
+import json
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .limiter import create_rate_limiter, retry_after_header
+from .lockout import AccountLockout
+from .routes import RouteLimitMatcher, load_rate_limits, route_templates
+
+logger = logging.getLogger(__name__)
+
+# Allow localhost, 127.0.0.1, and frontend container on any port
+# Also allow http://frontend:3000 for Docker internal networking
+ALLOWED_ORIGIN = re.compile(r'^https?://(localhost|127\.0\.0\.1|frontend)(:\d+)?$')
+
+CORS_METHODS = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
+CORS_HEADERS = "Content-Type, Authorization, X-Requested-With, X-API-Key, Accept"
+
+LOGIN_PATH = "/login"
+
+# Cap on a gzip request body after decompression (guards against zip bombs)
+MAX_DECOMPRESSED_BYTES = int(os.getenv("REQUEST_MAX_DECOMPRESSED_BYTES", str(10 * 1024 * 1024)))
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+def gunzip(data: bytes, limit: int) -> bytes:
+    """Decompress a gzip body, refusing output larger than ``limit`` bytes"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = decompressor.decompress(data, limit + 1)
+    if len(body) > limit:
+        raise BodyTooLarge()
+    if not decompressor.eof:
+        raise zlib.error("truncated gzip body")
+    return body
+
+
+def is_allowed_origin(origin: Optional[str]) -> bool:
+    """Check if origin is allowed (localhost, 127.0.0.1, or frontend container on any port)"""
+    return bool(origin) and bool(ALLOWED_ORIGIN.match(origin))
+
+
+def client_ip(headers: Headers, scope: Scope) -> str:
+    """Get client IP from request, handling proxies"""
+    # Check X-Forwarded-For header (for proxies/load balancers)
+    forwarded = headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+
+    # Check X-Real-IP header
+    real_ip = headers.get("x-real-ip")
+    if real_ip:
+        return real_ip
+
+    # Fall back to direct client
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class EdgeMiddleware:
+    """
+    Everything the API does before and after routing, as a single pure-ASGI
+    middleware (no BaseHTTPMiddleware tasks or response stream copies):
+
+    1. CORS: answers preflights and adds headers for allowed origins
+    2. Rate limiting per (client IP, route template)
+    3. Request bodies sent with ``Content-Encoding: gzip`` are decompressed
+       (bounded) before routing, so handlers always see plain bodies
+    4. Account lockout on POST /login; the body is read and its email parsed
+       once, then the body is replayed to the handler and the email is kept
+       in request state (``request.state.login_email``) for the accounting
+    5. Error mapping: HTTPException and unhandled errors become JSON responses
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter=None,
+        limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        lockout: Optional[AccountLockout] = None,
+        max_body: int = MAX_DECOMPRESSED_BYTES,
+    ):
+        self.app = app
+        self.max_body = max_body
+        self.limiter = limiter or create_rate_limiter()
+        self.limits = limits or load_rate_limits()
+        self.lockout = lockout or AccountLockout()
+        self.matcher: Optional[RouteLimitMatcher] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        origin = headers.get("origin")
+        cors = self._cors_headers(origin)
+
+        # Handle preflight
+        if scope["method"] == "OPTIONS":
+            if cors:
+                preflight = {name.decode(): value.decode("latin-1") for name, value in cors}
+                preflight["access-control-max-age"] = "3600"
+                response = Response(status_code=200, headers=preflight)
+            else:
+                # Return 403 for disallowed origins on preflight
+                response = Response(status_code=403, content="Origin not allowed")
+            await response(scope, receive, send)
+            return
+
+        status_code = None
+
+        async def send_with_cors(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if cors:
+                    message["headers"] = list(message.get("headers", [])) + cors
+            await send(message)
+
+        # Check rate limit
+        route, limit, window = self._get_matcher(scope).match(scope["path"])
+        result = await self.limiter.hit(f"{client_ip(headers, scope)}:{route}", limit, window)
+        if not result.allowed:
+            retry_after = retry_after_header(result)
+            await self._error(scope, receive, send_with_cors, status.HTTP_429_TOO_MANY_REQUESTS, {
+                "error": "rate_limit_exceeded",
+                "message": f"Too many requests. Please wait {retry_after} seconds and try again.",
+                "retry_after": int(retry_after),
+                "limit": limit,
+                "window": window,
+            }, {"Retry-After": retry_after})
+            return
+
+        # Decompress gzip request bodies (batched agent uploads)
+        encoding = headers.get("content-encoding", "identity").strip().lower()
+        if encoding != "identity":
+            if encoding != "gzip":
+                await self._error(scope, receive, send_with_cors, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                                  f"Unsupported Content-Encoding: {encoding}")
+                return
+            try:
+                body = gunzip(await self._read_body(receive), self.max_body)
+            except BodyTooLarge:
+                await self._error(scope, receive, send_with_cors, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                  f"Decompressed body exceeds {self.max_body} bytes")
+                return
+            except zlib.error:
+                await self._error(scope, receive, send_with_cors, status.HTTP_400_BAD_REQUEST, "Invalid gzip body")
+                return
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, value) for name, value in scope["headers"]
+                if name not in (b"content-encoding", b"content-length")
+            ] + [(b"content-length", str(len(body)).encode())]
+            receive = self._replay(body, receive)
+
+        # Check account lockout before the login handler runs
+        email = None
+        if scope["path"] == LOGIN_PATH and scope["method"] == "POST":
+            body = await self._read_body(receive)
+            email = self._login_email(body)
+            receive = self._replay(body, receive)
+            scope.setdefault("state", {})["login_email"] = email
+
+            remaining = await self.lockout.locked_for(email) if email else None
+            if remaining is not None:
+                await self._error(scope, receive, send_with_cors, status.HTTP_429_TOO_MANY_REQUESTS, {
+                    "error": "account_locked",
+                    "message": f"Account temporarily locked due to too many failed login attempts. Try again in {remaining} seconds or reset your password.",
+                    "retry_after": remaining,
+                    "action": "reset_password",
+                }, {"Retry-After": str(max(1, remaining))})
+                return
+
+        try:
+            await self.app(scope, receive, send_with_cors)
+        except HTTPException as e:
+            if status_code is not None:
+                raise
+            await self._error(scope, receive, send_with_cors, e.status_code, e.detail, e.headers)
+            return
+        except Exception as e:
+            if status_code is not None:
+                raise
+            logger.error(f"Unhandled error on {scope['method']} {scope['path']}: {e}", exc_info=True)
+            response = JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={
+                    "detail": "Internal server error",
+                    "status_code": 500,
+                    "error": str(e) if __debug__ else None,
+                },
+            )
+            await response(scope, receive, send_with_cors)
+            return
+
+        # Track failed login attempts with the email parsed before the handler ran
+        if email:
+            if status_code == 401:  # Unauthorized
+                await self.lockout.record_failure(email)
+            elif status_code == 200:  # Success
+                await self.lockout.clear(email)
+
+    def _cors_headers(self, origin: Optional[str]) -> List[Tuple[bytes, bytes]]:
+        if not is_allowed_origin(origin):
+            return []
+        return [
+            (b"access-control-allow-origin", origin.encode("latin-1")),
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-allow-methods", CORS_METHODS.encode()),
+            (b"access-control-allow-headers", CORS_HEADERS.encode()),
+            (b"access-control-expose-headers", b"Content-Type, Authorization"),
+        ]
+
+    def _get_matcher(self, scope: Scope) -> RouteLimitMatcher:
+        """Compile limits and the app's route templates on first use"""
+        if self.matcher is None:
+            app = scope.get("app")
+            self.matcher = RouteLimitMatcher(self.limits, route_templates(getattr(app, "routes", [])))
+        return self.matcher
+
+    @staticmethod
+    async def _error(scope: Scope, receive: Receive, send: Send, status_code: int, detail, headers=None):
+        response = JSONResponse(
+            status_code=status_code,
+            content={"detail": detail, "status_code": status_code},
+            headers=headers,
+        )
+        await response(scope, receive, send)
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _replay(body: bytes, receive: Receive) -> Receive:
+        """A receive that yields the buffered body once, then defers to the server"""
+        consumed = False
+
+        async def replay() -> Message:
+            nonlocal consumed
+            if consumed:
+                return await receive()
+            consumed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return replay
+
+    @staticmethod
+    def _login_email(body: bytes) -> Optional[str]:
+        try:
+            data = json.loads(body)
+        except (ValueError, UnicodeDecodeError):
+            return None  # Invalid JSON, let it fail downstream
+        email = data.get("email") if isinstance(data, dict) else None
+        return email.lower() if isinstance(email, str) else None
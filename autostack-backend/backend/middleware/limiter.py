@@ -0,0 +1,143 @@
+"""
+Rate limiter backends
+GCRA (generic cell rate algorithm) with O(1) state per key, in-process or in Redis
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+import logging
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float  # seconds until the next request would be allowed
+    remaining: int  # requests still allowed right now
+
+
+def gcra(tat: Optional[float], now: float, limit: int, window: float):
+    """
+    One GCRA step for ``limit`` requests per ``window`` seconds.
+
+    ``tat`` is the key's theoretical arrival time (None for a new key).
+    Returns ``(result, new_tat)``; ``new_tat`` is None when the request is
+    rejected and the stored state must not change.
+    """
+    emission = window / limit
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + emission
+    allow_at = new_tat - window
+    if now < allow_at:
+        return RateLimitResult(False, allow_at - now, 0), None
+    remaining = int((window - (new_tat - now)) / emission + 1e-9)
+    return RateLimitResult(True, 0.0, remaining), new_tat
+
+
+class InMemoryRateLimiter:
+    """
+    GCRA limiter for a single process: one float per key.
+
+    Keys are kept in update order, so expired keys are dropped from the
+    front as new requests arrive and no periodic full sweep is needed.
+    ``max_keys`` caps memory under key floods by evicting the oldest keys.
+    """
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = self.clock()
+        result, new_tat = gcra(self._tats.get(key), now, limit, window)
+        if new_tat is not None:
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+        self._expire(now)
+        return result
+
+    def _expire(self, now: float):
+        # A key whose TAT has passed is indistinguishable from a new key
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_keys:
+                break
+            del self._tats[key]
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+# KEYS[1] = limiter key; ARGV = limit, window (seconds)
+# Uses the Redis server clock so every API process agrees on "now".
+GCRA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local emission = window / limit
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + emission
+local allow_at = new_tat - window
+if now < allow_at then
+    return {0, tostring(allow_at - now), 0}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0', math.floor((window - (new_tat - now)) / emission + 1e-9)}
+"""
+
+
+class RedisRateLimiter:
+    """
+    GCRA limiter shared by every API worker and pod through Redis.
+
+    Each check is one atomic Lua script call; a key is a single string that
+    expires as soon as it is back to a full burst. Any client exposing
+    ``register_script`` (``redis.asyncio``, ``fakeredis``) can be injected.
+    When Redis is unreachable requests are allowed rather than failing the API.
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None, prefix: str = "ratelimit:"):
+        if client is None:
+            if not aioredis:
+                raise RuntimeError("redis not installed. Install with: pip install redis")
+            client = aioredis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        try:
+            allowed, retry_after, remaining = await self._script(
+                keys=[self.prefix + key], args=[limit, window]
+            )
+        except Exception as e:
+            logger.error(f"Rate limiter unavailable, allowing request: {e}")
+            return RateLimitResult(True, 0.0, limit)
+        return RateLimitResult(bool(int(allowed)), float(retry_after), int(remaining))
+
+
+def create_rate_limiter():
+    """Use Redis when RATE_LIMIT_REDIS_URL is set, otherwise limit per process"""
+    url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if url:
+        try:
+            return RedisRateLimiter(url=url)
+        except RuntimeError as e:
+            logger.error(f"{e}; falling back to in-process rate limiter")
+    return InMemoryRateLimiter(max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000")))
+
+
+def retry_after_header(result: RateLimitResult) -> str:
+    return str(max(1, math.ceil(result.retry_after)))
@@ -0,0 +1,60 @@
+"""
+Account Lockout
+Locks an account after repeated failed logins to slow down brute forcing
+"""
+import math
+from typing import Optional
+import logging
+
+from ..utils.ttl_store import create_ttl_store
+
+logger = logging.getLogger(__name__)
+
+
+class AccountLockout:
+    """
+    Counts failed logins per email and locks the account for
+    ``lockout_duration`` seconds after ``max_attempts`` failures within
+    ``attempt_window`` seconds.
+
+    State lives in a TTL store (Redis when configured), so every API worker
+    sees the same counters and expired entries disappear on their own.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        lockout_duration: int = 300,
+        attempt_window: Optional[int] = None,
+        store=None,
+    ):
+        self.max_attempts = max_attempts
+        self.lockout_duration = lockout_duration  # 5 minutes in seconds
+        self.attempt_window = attempt_window or lockout_duration
+        self.store = store or create_ttl_store(prefix="lockout:")
+
+    async def locked_for(self, email: str) -> Optional[int]:
+        """Seconds until ``email`` unlocks, or None if it is not locked"""
+        try:
+            remaining = await self.store.ttl(f"locked:{email}")
+        except Exception as e:
+            logger.error(f"Lockout store unavailable, skipping check: {e}")
+            return None
+        return math.ceil(remaining) if remaining else None
+
+    async def record_failure(self, email: str):
+        """Record a failed login attempt, locking the account at the limit"""
+        try:
+            attempts = await self.store.incr(f"attempts:{email}", self.attempt_window)
+            if attempts >= self.max_attempts:
+                await self.store.set(f"locked:{email}", 1, self.lockout_duration)
+                await self.store.delete(f"attempts:{email}")
+        except Exception as e:
+            logger.error(f"Lockout store unavailable, failure not recorded: {e}")
+
+    async def clear(self, email: str):
+        """Clear failed attempts for email"""
+        try:
+            await self.store.delete(f"attempts:{email}", f"locked:{email}")
+        except Exception as e:
+            logger.error(f"Lockout store unavailable, attempts not cleared: {e}")
@@ -0,0 +1,162 @@
+"""
+Route matching for rate limits
+Compiles limit rules and app route templates into one segment trie
+"""
+import json
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pattern -> (requests, window seconds). A pattern covers its whole subtree,
+# so "/auth/github" also limits "/auth/github/callback"; segments written as
+# "{name}" match any value. "default" applies where no other pattern does.
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "/signup": (10, 60),
+    "/login": (10, 60),
+    "/refresh": (20, 60),
+    "/auth/github": (5, 60),
+    "/auth/google": (5, 60),
+    "/reset-password": (3, 60),
+    "default": (100, 60),
+}
+
+# Bucket key for paths that match no route and no explicit rule
+UNMATCHED_ROUTE = "*"
+
+
+def _parse_limit(value) -> Tuple[int, float]:
+    """Accept [limit, window] or "limit/window" """
+    if isinstance(value, str):
+        limit, _, window = value.partition("/")
+        return int(limit), float(window or 60)
+    limit, window = value
+    return int(limit), float(window)
+
+
+def load_rate_limits() -> Dict[str, Tuple[int, float]]:
+    """
+    Read limit rules from RATE_LIMITS (inline JSON) or RATE_LIMITS_FILE (a
+    JSON file), e.g. ``{"/login": "10/60", "/api/projects/{id}": [60, 60]}``.
+    Falls back to DEFAULT_RATE_LIMITS; "default" is always present.
+    """
+    raw = os.getenv("RATE_LIMITS")
+    path = os.getenv("RATE_LIMITS_FILE")
+    try:
+        if not raw and path:
+            with open(path) as f:
+                raw = f.read()
+        if not raw:
+            return dict(DEFAULT_RATE_LIMITS)
+        limits = {pattern: _parse_limit(value) for pattern, value in json.loads(raw).items()}
+    except (OSError, ValueError, TypeError) as e:
+        logger.error(f"Invalid rate limit config, using defaults: {e}")
+        return dict(DEFAULT_RATE_LIMITS)
+
+    limits.setdefault("default", DEFAULT_RATE_LIMITS["default"])
+    return limits
+
+
+class RouteMatch(NamedTuple):
+    key: str  # normalized route, e.g. "/api/projects/{project_id}"
+    limit: int
+    window: float
+
+
+class _Node:
+    __slots__ = ("static", "param", "catch_all", "route", "rule")
+
+    def __init__(self):
+        self.static: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.catch_all: Optional[str] = None  # template ending in {name:path}
+        self.route: Optional[str] = None
+        self.rule: Optional[Tuple[str, int, float]] = None
+
+
+def _segments(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+class RouteLimitMatcher:
+    """
+    Maps a request path to its route template and rate limit in one walk
+    down a segment trie, so cost depends on path depth rather than on the
+    number of routes or rules.
+
+    The template is used as the bucket key, so ``/api/projects/1`` and
+    ``/api/projects/2`` share a bucket and the number of keys per client is
+    bounded by the number of routes.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]], routes: Iterable[str] = ()):
+        self.root = _Node()
+        self.default = limits.get("default", DEFAULT_RATE_LIMITS["default"])
+        self.root.rule = ("default",) + tuple(self.default)
+        for pattern, (limit, window) in limits.items():
+            if pattern != "default":
+                self._insert(pattern).rule = (pattern, limit, window)
+        for template in routes:
+            self.add_route(template)
+
+    def add_route(self, template: str):
+        segments = _segments(template)
+        if segments and segments[-1].startswith("{") and segments[-1].endswith(":path}"):
+            self._insert("/".join(segments[:-1])).catch_all = template
+        else:
+            self._insert(template).route = template
+
+    def _insert(self, pattern: str) -> _Node:
+        node = self.root
+        for segment in _segments(pattern):
+            if segment.startswith("{") and segment.endswith("}"):
+                node.param = node.param or _Node()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _Node())
+        return node
+
+    def match(self, path: str) -> RouteMatch:
+        route, rule = self._walk(self.root, _segments(path), 0, self.root.rule)
+        pattern, limit, window = rule
+        if route is None:
+            route = UNMATCHED_ROUTE if pattern == "default" else pattern
+        return RouteMatch(route, limit, window)
+
+    def _walk(self, node: _Node, segments: List[str], i: int, rule):
+        # Returns (route template or None, most specific rule on the path);
+        # static segments win over parameters, with backtracking on dead ends
+        rule = node.rule or rule
+        if i == len(segments):
+            return node.route, rule
+
+        best = None
+        child = node.static.get(segments[i])
+        if child is not None:
+            best = self._walk(child, segments, i + 1, rule)
+            if best[0] is not None:
+                return best
+        if node.param is not None:
+            found = self._walk(node.param, segments, i + 1, rule)
+            if found[0] is not None:
+                return found
+            best = best or found
+        if node.catch_all is not None:
+            return node.catch_all, rule
+        return best or (None, rule)
+
+
+def route_templates(routes) -> List[str]:
+    """Collect path templates from Starlette/FastAPI routes, including mounts"""
+    templates = []
+    for route in routes:
+        path = getattr(route, "path", None)
+        if path is None:
+            continue
+        children = getattr(route, "routes", None)
+        if children:
+            templates.extend(path.rstrip("/") + child for child in route_templates(children))
+        else:
+            templates.append(path)
+    return templates
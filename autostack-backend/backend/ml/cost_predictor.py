@@ -8,7 +8,7 @@ from typing import Dict, List, Optional, Tuple
 import uuid
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select
 
 try:
     from prophet import Prophet
@@ -296,6 +296,33 @@ class CostPredictorService:
             logger.error(f"Error getting latest prediction: {e}")
             return None
     
+    async def get_latest_predictions(
+        self,
+        session: AsyncSession,
+        project_ids: List[str]
+    ) -> Dict[str, CostPrediction]:
+        """Get the most recent prediction for each of many projects in one query"""
+        if not project_ids:
+            return {}
+        try:
+            ranked = select(
+                CostPrediction.id,
+                func.row_number().over(
+                    partition_by=CostPrediction.project_id,
+                    order_by=CostPrediction.created_at.desc()
+                ).label('position')
+            ).where(CostPrediction.project_id.in_(project_ids)).subquery()
+            
+            query = select(CostPrediction).join(ranked, ranked.c.id == CostPrediction.id).where(
+                ranked.c.position == 1
+            )
+            result = await session.execute(query)
+            return {prediction.project_id: prediction for prediction in result.scalars()}
+            
+        except Exception as e:
+            logger.error(f"Error getting latest predictions: {e}")
+            return {}
+    
     async def update_prediction_if_needed(
         self,
         session: AsyncSession,
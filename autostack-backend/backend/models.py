@@ -3,10 +3,10 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text, JSON, BigInteger
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text, JSON, BigInteger, UniqueConstraint, Index, PrimaryKeyConstraint, DDL, event
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.orm import declared_attr, relationship
+from sqlalchemy.sql import func, text
 
 from .db import Base
 
@@ -27,6 +27,8 @@ class User(Base):
     name = Column(String, nullable=True)
     avatar_url = Column(String, nullable=True)
     email_verified = Column(Boolean, default=False, nullable=False)
+    # Carried in access tokens as "tv"; bumping it revokes them all
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     deployments = relationship("Deploy", back_populates="user", cascade="all, delete-orphan")
     agents = relationship("Agent", back_populates="user", cascade="all, delete-orphan")
@@ -71,6 +73,9 @@ class Deploy(Base):
     is_production = Column(Boolean, default=False, nullable=False)
     creator_type = Column(String(50), nullable=True)  # manual, webhook, api
     app_name = Column(String(255), nullable=True)  # K8s app name
+    build_fingerprint = Column(String(64), nullable=True, index=True)  # hash of tracked files + Dockerfile
+    image_ref = Column(String(500), nullable=True)  # image this deploy ran, reusable by matching fingerprints
+    stage_timings = Column(JSON, nullable=True)  # seconds per pipeline stage, e.g. {"clone": 1.2, "build": 84.0}
 
     user = relationship("User", back_populates="deployments")
     project = relationship("Project", back_populates="deployments")
@@ -80,6 +85,16 @@ class Deploy(Base):
 
 class Agent(Base):
     __tablename__ = "agents"
+    __table_args__ = (
+        Index("ix_agents_user_status", "user_id", "status"),
+        # Only online agents can go stale, so the sweeper scans just those
+        Index(
+            "ix_agents_online_heartbeat",
+            "last_heartbeat",
+            postgresql_where=text("status = 'online'"),
+            sqlite_where=text("status = 'online'"),
+        ),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String, nullable=False)
@@ -111,7 +126,17 @@ class Alert(Base):
 
 
 class Metrics(Base):
+    """
+    Raw agent samples. On Postgres the table is range-partitioned by day on
+    ``timestamp`` (partitions are managed by services/metrics_store.py), so
+    the partition key is part of the primary key.
+    """
     __tablename__ = "metrics"
+    __table_args__ = (
+        Index("ix_metrics_agent_time", "agent_id", "timestamp"),
+        Index("ix_metrics_user_time", "user_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     agent_id = Column(String, ForeignKey("agents.id", ondelete="CASCADE"), nullable=True)
@@ -120,8 +145,78 @@ class Metrics(Base):
     disk_usage = Column(Float, nullable=True)
     network_in = Column(Float, nullable=True)
     network_out = Column(Float, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Spread of the readings behind the sample, when the agent sends it
+    readings = Column(Integer, nullable=True)
+    cpu_min = Column(Float, nullable=True)
+    cpu_max = Column(Float, nullable=True)
+    cpu_p95 = Column(Float, nullable=True)
+    memory_min = Column(Float, nullable=True)
+    memory_max = Column(Float, nullable=True)
+    memory_p95 = Column(Float, nullable=True)
+    network_interfaces = Column(JSON, nullable=True)  # {"eth0": {"in_bytes_per_sec": ..., "out_bytes_per_sec": ...}}
+    process_count = Column(Integer, nullable=True)
+
+
+# Rows outside every daily partition land here until their day is created
+event.listen(
+    Metrics.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS metrics_default PARTITION OF metrics DEFAULT").execute_if(dialect="postgresql"),
+)
+
+
+class _MetricsRollup:
+    """
+    Per-agent aggregates of ``metrics`` over a fixed bucket. Sums and counts
+    (rather than averages) are stored so concurrent ingests can merge into a
+    bucket with a single upsert.
+    """
+
+    @declared_attr
+    def agent_id(cls):
+        return Column(String, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False)
+
+    @declared_attr
+    def user_id(cls):
+        return Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    bucket = Column(DateTime, nullable=False)  # start of the bucket, UTC
+    samples = Column(Integer, nullable=False)
+    cpu_sum = Column(Float, nullable=False)
+    cpu_min = Column(Float, nullable=False)
+    cpu_max = Column(Float, nullable=False)
+    memory_sum = Column(Float, nullable=False)
+    memory_min = Column(Float, nullable=False)
+    memory_max = Column(Float, nullable=False)
+    disk_max = Column(Float, nullable=True)
+    network_in_sum = Column(Float, nullable=False, default=0.0)
+    network_out_sum = Column(Float, nullable=False, default=0.0)
+
+
+class MetricsRollup1m(_MetricsRollup, Base):
+    __tablename__ = "metrics_rollup_1m"
+    __table_args__ = (
+        PrimaryKeyConstraint("agent_id", "bucket"),
+        Index("ix_metrics_rollup_1m_user_bucket", "user_id", "bucket"),
+    )
+
+
+class MetricsRollup1h(_MetricsRollup, Base):
+    __tablename__ = "metrics_rollup_1h"
+    __table_args__ = (
+        PrimaryKeyConstraint("agent_id", "bucket"),
+        Index("ix_metrics_rollup_1h_user_bucket", "user_id", "bucket"),
+    )
+
+
+class MetricsRollup1d(_MetricsRollup, Base):
+    __tablename__ = "metrics_rollup_1d"
+    __table_args__ = (
+        PrimaryKeyConstraint("agent_id", "bucket"),
+        Index("ix_metrics_rollup_1d_user_bucket", "user_id", "bucket"),
+    )
 
 
 class AuditLog(Base):
@@ -329,11 +424,15 @@ class AnalyticsEvent(Base):
 
 
 class DeploymentLog(Base):
-    """Logs for deployments"""
+    """Append-only log lines for a deployment, ordered by sequence"""
     __tablename__ = "deployment_logs"
+    __table_args__ = (
+        UniqueConstraint("deployment_id", "sequence", name="uq_deployment_logs_deployment_sequence"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     deployment_id = Column(String, ForeignKey("deployments.id", ondelete="CASCADE"), nullable=False)
+    sequence = Column(Integer, nullable=False)  # 1-based, monotonic per deployment
     log_type = Column(String(50), nullable=False)
     message = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -342,7 +441,34 @@ class DeploymentLog(Base):
     deployment = relationship("Deploy", back_populates="deployment_logs")
 
     def __repr__(self):
-        return f"<DeploymentLog {self.log_type} at {self.timestamp}>"
+        return f"<DeploymentLog #{self.sequence} {self.log_type} at {self.timestamp}>"
+
+
+class DeployJob(Base):
+    """Durable queue entry for deploy work, claimed by workers with SKIP LOCKED"""
+    __tablename__ = "deploy_jobs"
+    __table_args__ = (
+        Index("ix_deploy_jobs_claim", "status", "priority", "created_at"),
+        Index("ix_deploy_jobs_user_status", "user_id", "status"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String(50), nullable=False)  # handler name, e.g. deploy, deployment
+    payload = Column(JSON, nullable=False)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    priority = Column(Integer, nullable=False, default=10)  # lower runs first
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    worker_id = Column(String(255), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<DeployJob {self.kind} {self.id} - {self.status}>"
 
 
 # ===== COST TRACKING MODELS =====
@@ -428,7 +554,8 @@ class BudgetAlert(Base):
     alert_threshold = Column(Float, nullable=False, default=0.80)
     
     # Current status
-    current_spend = Column(Float, nullable=False, default=0.0)
+    current_spend = Column(Float, nullable=False, default=0.0)  # since period_start
+    period_start = Column(DateTime, nullable=True)  # start of the period current_spend covers
     is_exceeded = Column(Boolean, nullable=False, default=False)
     last_alert_sent = Column(DateTime, nullable=True)
     
@@ -0,0 +1,117 @@
+"""
+Host port leases for local Docker deployments
+Constant-time allocation from a free list, recovered from container labels
+"""
+
+import logging
+import socket
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Container labels that record a lease so it survives backend restarts
+PORT_LABEL = "autostack.port"
+DEPLOY_LABEL = "autostack.deploy_id"
+
+
+def _port_in_use(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(("", port))
+            return False
+        except OSError:
+            return True
+
+
+class PortAllocator:
+    """
+    Leases host ports in ``[base_port, max_port)`` to deployments.
+
+    Free ports sit in a FIFO queue, so allocation and release are O(1) and
+    a released port goes to the back of the line instead of being handed
+    straight to the next deploy. Every operation holds one lock, so
+    concurrent deploys never receive the same port.
+
+    The allocator only knows about its own leases. Ports held by other
+    processes are caught by a single bind probe per candidate; those ports
+    are moved to the back of the queue and skipped.
+    """
+
+    def __init__(self, base_port: int, max_port: int, probe: bool = True, max_probes: int = 32):
+        self.base_port = base_port
+        self.max_port = max_port
+        self.probe = probe
+        self.max_probes = max_probes
+        self._lock = threading.Lock()
+        self._free = deque(range(base_port, max_port))
+        self._leases: Dict[int, str] = {}
+
+    def allocate(self, owner: str) -> Optional[int]:
+        """Lease a free port to ``owner``; returns None when the range is exhausted"""
+        with self._lock:
+            for _ in range(min(len(self._free), self.max_probes)):
+                port = self._free.popleft()
+                if self.probe and _port_in_use(port):
+                    logger.warning(f"Port {port} is bound outside AutoStack, skipping it")
+                    self._free.append(port)
+                    continue
+                self._leases[port] = owner
+                return port
+
+        logger.error("No available ports in range")
+        return None
+
+    def release(self, port: Optional[int]):
+        """Return a leased port to the free list; unknown ports are ignored"""
+        with self._lock:
+            if port in self._leases:
+                del self._leases[port]
+                self._free.append(port)
+
+    def reconcile(self, leases: Dict[int, str]):
+        """Replace all leases with ``leases`` (port -> owner), e.g. from running containers"""
+        leases = {port: owner for port, owner in leases.items() if self.base_port <= port < self.max_port}
+        with self._lock:
+            self._leases = leases
+            self._free = deque(port for port in range(self.base_port, self.max_port) if port not in leases)
+        logger.info(f"Port allocator reconciled: {len(leases)} leased, {len(self._free)} free")
+
+    def owner(self, port: int) -> Optional[str]:
+        return self._leases.get(port)
+
+    @property
+    def leased(self) -> int:
+        return len(self._leases)
+
+    @property
+    def available(self) -> int:
+        return len(self._free)
+
+
+def container_port_leases(containers: Iterable) -> Dict[int, str]:
+    """
+    Collect port leases from Docker containers.
+
+    Uses the ``autostack.port`` label where present and falls back to the
+    host port bindings of ``deploy-*`` containers created before labels.
+    """
+    leases: Dict[int, str] = {}
+    for container in containers:
+        labels = container.labels or {}
+        owner = labels.get(DEPLOY_LABEL) or container.name
+        if PORT_LABEL in labels:
+            try:
+                leases[int(labels[PORT_LABEL])] = owner
+            except ValueError:
+                logger.warning(f"Ignoring bad {PORT_LABEL} label on {container.name}")
+            continue
+        if not container.name.startswith("deploy-"):
+            continue
+        bindings = (container.attrs.get("HostConfig") or {}).get("PortBindings") or {}
+        for binds in bindings.values():
+            for bind in binds or []:
+                if bind.get("HostPort"):
+                    leases[int(bind["HostPort"])] = owner
+    return leases
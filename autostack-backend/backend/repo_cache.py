@@ -0,0 +1,209 @@
+"""
+Repository clone cache for AutoStack deploy engines
+Bare mirrors keyed by repo URL, incremental fetch, per-deploy worktrees
+"""
+
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import git
+
+logger = logging.getLogger(__name__)
+
+LAST_USED_MARKER = "autostack-last-used"
+
+
+def cache_key(repo_url: str) -> str:
+    """Stable key for a repo URL, ignoring credentials and a trailing .git/slash"""
+    parts = urlsplit(repo_url.strip())
+    netloc = parts.netloc.rsplit("@", 1)[-1].lower()
+    path = parts.path.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    normalized = urlunsplit((parts.scheme.lower(), netloc, path, "", ""))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class RepoCache:
+    """
+    Keeps one bare mirror per repository and checks deploys out as detached
+    worktrees sharing its object store.
+
+    A redeploy only fetches objects the mirror lacks. Mirrors are evicted
+    least-recently-used first once their total size exceeds ``max_bytes``;
+    mirrors with live worktrees are never evicted. Blocking git work is done
+    by the sync methods, which callers run in a worker thread.
+
+    The cache directory is shared by every worker process on the host, so
+    each mirror is guarded by an flock on ``<key>.lock`` and whether it is in
+    use is read from ``git worktree list`` rather than process memory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        fetch_depth: Optional[int] = None,
+    ):
+        workspace = os.getenv("DEPLOY_WORKSPACE", "/tmp/autostack-deploys")
+        self.cache_dir = Path(cache_dir or os.getenv("REPO_CACHE_DIR", os.path.join(workspace, ".repo-cache")))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.getenv("REPO_CACHE_MAX_GB", "10")) * 1024 ** 3
+        )
+        # 0 fetches full history; the default matches the old shallow clones
+        self.fetch_depth = fetch_depth if fetch_depth is not None else int(
+            os.getenv("REPO_CACHE_FETCH_DEPTH", "1")
+        )
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, int] = {}
+
+    def mirror_path(self, repo_url: str) -> Path:
+        return self.cache_dir / f"{cache_key(repo_url)}.git"
+
+    def checkout(self, repo_url: str, branch: str, dest: str) -> str:
+        """
+        Materialize ``branch`` of ``repo_url`` at ``dest`` and return the
+        commit SHA. ``dest`` must not exist or be empty.
+        """
+        key = cache_key(repo_url)
+        mirror = self.mirror_path(repo_url)
+
+        with self._repo_lock(key):
+            repo = self._sync_mirror(mirror, repo_url, branch)
+            sha = repo.git.rev_parse(f"refs/heads/{branch}")
+            repo.git.worktree("add", "--detach", dest, sha)
+            (mirror / LAST_USED_MARKER).touch()
+            size = _dir_size(mirror)
+            with self._lock:
+                self._sizes[key] = size
+
+        self.evict()
+        return sha
+
+    def release(self, dest: str):
+        """Remove a worktree created by ``checkout``"""
+        key = self._worktree_key(dest)
+        shutil.rmtree(dest, ignore_errors=True)
+        if key:
+            try:
+                with self._repo_lock(key):
+                    git.Repo(self.cache_dir / f"{key}.git").git.worktree("prune")
+            except Exception as e:
+                logger.warning(f"Failed to prune worktrees for {key}: {e}")
+
+    def evict(self):
+        """Drop least-recently-used mirrors until the cache fits its budget"""
+        self._scan()
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            candidates = sorted(self._sizes, key=self._last_used)
+
+        for key in candidates:
+            if total <= self.max_bytes:
+                break
+            mirror = self.cache_dir / f"{key}.git"
+            with self._repo_lock(key):
+                # Another process may have evicted or checked it out meanwhile
+                if mirror.exists() and self._has_worktrees(mirror):
+                    continue
+                with self._lock:
+                    size = self._sizes.pop(key, 0)
+                shutil.rmtree(mirror, ignore_errors=True)
+            total -= size
+            logger.info(f"Evicted repo mirror {key} ({size} bytes)")
+
+    # ========================
+    # Internals
+    # ========================
+
+    def _sync_mirror(self, mirror: Path, repo_url: str, branch: str) -> git.Repo:
+        if mirror.exists():
+            repo = git.Repo(mirror)
+            repo.git.worktree("prune")
+        else:
+            repo = git.Repo.init(mirror, bare=True)
+
+        # Fetch by URL so credentials embedded in it are never stored in config
+        args = ["--no-tags", repo_url, f"+refs/heads/{branch}:refs/heads/{branch}"]
+        if self.fetch_depth > 0:
+            args.insert(0, f"--depth={self.fetch_depth}")
+        repo.git.fetch(*args)
+        return repo
+
+    @contextmanager
+    def _repo_lock(self, key: str):
+        """Exclusive lock on one mirror, across threads and processes"""
+        # Lock files are left in place: unlinking one another process is
+        # waiting on would let two holders in at once
+        with open(self.cache_dir / f"{key}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _has_worktrees(self, mirror: Path) -> bool:
+        """Whether any process still has a worktree checked out from ``mirror``"""
+        repo = git.Repo(mirror)
+        repo.git.worktree("prune")
+        listing = repo.git.worktree("list", "--porcelain")
+        # The first entry is the bare mirror itself
+        return sum(1 for line in listing.splitlines() if line.startswith("worktree ")) > 1
+
+    def _worktree_key(self, dest: str) -> Optional[str]:
+        """Cache key of the mirror ``dest`` was checked out from, if any"""
+        try:
+            with open(os.path.join(dest, ".git")) as f:
+                gitdir = f.read().strip()
+        except OSError:
+            return None
+        # "gitdir: <cache_dir>/<key>.git/worktrees/<name>"
+        mirror = Path(gitdir.partition("gitdir:")[2].strip()).parent.parent
+        if mirror.parent.resolve() != self.cache_dir.resolve() or mirror.suffix != ".git":
+            return None
+        return mirror.name[:-4]
+
+    def _last_used(self, key: str) -> float:
+        try:
+            return (self.cache_dir / f"{key}.git" / LAST_USED_MARKER).stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _scan(self):
+        """Sync sizes with mirrors added or evicted by other processes"""
+        on_disk = {mirror.name[:-4]: mirror for mirror in self.cache_dir.glob("*.git")}
+        with self._lock:
+            for key in set(self._sizes) - set(on_disk):
+                del self._sizes[key]
+            missing = [key for key in on_disk if key not in self._sizes]
+        for key in missing:
+            size = _dir_size(on_disk[key])
+            with self._lock:
+                self._sizes.setdefault(key, size)
+
+
+# Shared by DeployEngine and K8sDeployEngine
+repo_cache = RepoCache()
@@ -367,12 +367,20 @@ async def get_cost_dashboard(
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get comprehensive cost dashboard data"""
-    # Get all user's projects
+    """
+    Get comprehensive cost dashboard data. Summaries, latest predictions
+    and budget statuses for all projects come from one grouped query each,
+    so the number of queries does not grow with the number of projects.
+    """
     from sqlalchemy import select
-    query = select(models.Project).where(models.Project.user_id == current_user.id)
+    query = select(models.Project.id, models.Project.name).where(models.Project.user_id == current_user.id)
     result = await db.execute(query)
-    projects = list(result.scalars().all())
+    projects = result.all()
+    project_ids = [project_id for project_id, _ in projects]
+    
+    summaries = await cost_service.calculate_cost_summaries(db, project_ids, 'month') or {}
+    predictions = await cost_predictor.get_latest_predictions(db, project_ids)
+    budget_statuses = await budget_service.get_budget_statuses(db, project_ids)
     
     dashboard_data = {
         'total_monthly_cost': 0.0,
@@ -382,19 +390,14 @@ async def get_cost_dashboard(
         'active_alerts': 0
     }
     
-    for project in projects:
-        # Get latest costs
-        summary = await cost_service.calculate_cost_summary(db, project.id, 'month')
-        
-        # Get prediction
-        prediction = await cost_predictor.get_latest_prediction(db, project.id)
-        
-        # Get budget status
-        budget_status = await budget_service.get_budget_status(db, project.id)
+    for project_id, project_name in projects:
+        summary = summaries.get(project_id, {})
+        prediction = predictions.get(project_id)
+        budget_status = budget_statuses.get(project_id)
         
         project_data = {
-            'project_id': project.id,
-            'project_name': project.name,
+            'project_id': project_id,
+            'project_name': project_name,
             'current_monthly_cost': summary.get('total_cost', 0.0),
             'predicted_monthly_cost': prediction.predicted_monthly_cost if prediction else 0.0,
             'trend': summary.get('trend', 'stable'),
@@ -2,6 +2,7 @@
 Deployment Management Router
 Handles deployment creation, rollback, and smoke tests
 """
+import uuid
 from datetime import datetime, timezone
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
@@ -12,6 +13,7 @@ from pydantic import BaseModel
 from ..db import get_db
 from ..auth import get_current_user
 from ..models import User, Deployment, Project
+from ..services.job_queue import PRIORITY_DEPLOY, PRIORITY_ROLLBACK, QueueFull, job_queue
 
 router = APIRouter()
 
@@ -66,7 +68,6 @@ class SmokeTestResult(BaseModel):
 @router.post("/deployments", response_model=DeploymentResponse)
 async def create_deployment(
     deployment: DeploymentCreate,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -107,8 +108,12 @@ async def create_deployment(
     )
     previous_deployment = prev_deployment_result.scalar_one_or_none()
     
+    try:
+        await job_queue.check_capacity(db, current_user.id)
+    except QueueFull as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    
     # Create new deployment record
-    import uuid
     new_deployment = Deployment(
         id=str(uuid.uuid4()),
         project_id=deployment.project_id,
@@ -126,12 +131,13 @@ async def create_deployment(
     await db.commit()
     await db.refresh(new_deployment)
     
-    # Start deployment in background
-    background_tasks.add_task(
-        execute_deployment,
-        new_deployment.id,
-        project.id,
-        deployment.strategy
+    # Queue deployment for a deploy worker
+    await job_queue.enqueue(
+        db,
+        "deployment",
+        {"deployment_id": new_deployment.id, "project_id": project.id, "strategy": deployment.strategy},
+        user_id=current_user.id,
+        priority=PRIORITY_DEPLOY,
     )
     
     return new_deployment
@@ -141,7 +147,6 @@ async def create_deployment(
 async def rollback_deployment(
     deployment_id: str,
     rollback: RollbackRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -189,7 +194,7 @@ async def rollback_deployment(
             detail="No previous version available for rollback"
         )
     
-    # Create rollback deployment
+    # Create rollback deployment (rollbacks are never refused for a full queue)
     rollback_deployment = Deployment(
         id=str(uuid.uuid4()),
         project_id=deployment.project_id,
@@ -213,12 +218,13 @@ async def rollback_deployment(
     await db.commit()
     await db.refresh(rollback_deployment)
     
-    # Execute rollback in background
-    background_tasks.add_task(
-        execute_deployment,
-        rollback_deployment.id,
-        project.id,
-        "rolling"
+    # Queue rollback ahead of fresh deploys
+    await job_queue.enqueue(
+        db,
+        "deployment",
+        {"deployment_id": rollback_deployment.id, "project_id": project.id, "strategy": "rolling"},
+        user_id=current_user.id,
+        priority=PRIORITY_ROLLBACK,
     )
     
     return {
@@ -341,7 +347,7 @@ async def run_smoke_tests(
 
 async def execute_deployment(deployment_id: str, project_id: str, strategy: str):
     """
-    Execute deployment in background
+    Execute deployment (deploy job handler)
     
     Steps:
     1. Build Docker image
@@ -393,7 +399,7 @@ async def execute_deployment(deployment_id: str, project_id: str, strategy: str)
                     await db.commit()
                     
                     # TODO: Trigger rollback
-                    return
+                    return deployment.error_message
             
             # Success!
             deployment.status = "success"
@@ -405,6 +411,19 @@ async def execute_deployment(deployment_id: str, project_id: str, strategy: str)
             deployment.error_message = str(e)
             deployment.completed_at = datetime.now(timezone.utc)
             await db.commit()
+            raise
+
+
+async def abandon_deployment(db: AsyncSession, error: str, deployment_id: str, **_):
+    """Fail a deployment whose job ran out of attempts on unresponsive workers"""
+    deployment = await db.get(Deployment, deployment_id)
+    if deployment and deployment.status not in ("success", "failed", "rolled_back"):
+        deployment.status = "failed"
+        deployment.error_message = error
+        deployment.completed_at = datetime.now(timezone.utc)
+
+
+job_queue.register("deployment", execute_deployment, on_abandoned=abandon_deployment)
 
 
 async def execute_smoke_tests(deployment_id: str) -> bool:
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
@@ -66,10 +66,24 @@ class DeployResponse(DeployCreate):
     status: str
     logs: str
     created_at: datetime
+    stage_timings: Optional[Dict[str, float]] = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class DeployLogEntry(BaseModel):
+    sequence: int
+    log_type: str
+    message: str
+    timestamp: datetime
+
+
+class DeployLogPage(BaseModel):
+    entries: list[DeployLogEntry]
+    next_sequence: int  # pass back as ?after= to continue
+    complete: bool  # deployment finished; no further lines will arrive
+
+
 # ========================
 # Agent schemas
 # ========================
@@ -87,6 +101,45 @@ class AgentHeartbeat(BaseModel):
     memory_usage: float = Field(ge=0, le=100)
 
 
+class MetricWindow(BaseModel):
+    """Spread of the readings an agent aggregated into one sample"""
+    min: float = Field(ge=0, le=100)
+    max: float = Field(ge=0, le=100)
+    avg: float = Field(ge=0, le=100)
+    p95: float = Field(ge=0, le=100)
+
+
+class InterfaceRates(BaseModel):
+    in_bytes_per_sec: float = Field(ge=0)
+    out_bytes_per_sec: float = Field(ge=0)
+
+
+class MetricSample(BaseModel):
+    agent_id: str
+    timestamp: Optional[datetime] = None  # collection time; defaults to receipt time
+    cpu_usage: float = Field(ge=0, le=100)
+    memory_usage: float = Field(ge=0, le=100)
+    disk_usage: Optional[float] = None
+    network_in: Optional[float] = None
+    network_out: Optional[float] = None
+    # Sent by agents that sample several times per upload window
+    readings: Optional[int] = Field(None, ge=1)
+    cpu: Optional[MetricWindow] = None
+    memory: Optional[MetricWindow] = None
+    network: Optional[Dict[str, InterfaceRates]] = None  # per interface
+    process_count: Optional[int] = Field(None, ge=0)
+
+
+class MetricsIngest(BaseModel):
+    samples: List[MetricSample] = Field(min_length=1)
+
+
+class MetricsIngestResponse(BaseModel):
+    accepted: int
+    rejected: int  # unknown or foreign agents, or timestamps outside raw retention
+    agents: int
+
+
 class AgentResponse(BaseModel):
     id: str
     name: str
@@ -170,6 +223,29 @@ class MetricsResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MetricPoint(BaseModel):
+    timestamp: datetime  # sample time, or bucket start for rollups
+    samples: int
+    cpu_avg: float
+    cpu_min: float
+    cpu_max: float
+    memory_avg: float
+    memory_min: float
+    memory_max: float
+    disk_max: Optional[float]
+    network_in: Optional[float]
+    network_out: Optional[float]
+    # Raw samples only, when the agent reported its window spread
+    cpu_p95: Optional[float] = None
+    memory_p95: Optional[float] = None
+
+
+class MetricSeries(BaseModel):
+    agent_id: str
+    resolution: Literal["raw", "1m", "1h", "1d"]
+    points: List[MetricPoint]
+
+
 # ========================
 # API Key schemas
 # ========================
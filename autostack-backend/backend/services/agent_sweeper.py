@@ -0,0 +1,84 @@
+"""
+Agent Sweeper
+Periodically marks agents that stopped reporting offline
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import logging
+
+from .. import crud
+from ..db import AsyncSessionLocal
+from ..metrics import registry
+from ..utils.overview_cache import overview_cache
+
+logger = logging.getLogger(__name__)
+
+AGENTS_OFFLINE = registry.counter(
+    "autostack_agents_marked_offline_total",
+    "Agents moved from online to offline by the liveness sweeper",
+)
+
+
+class AgentSweeper:
+    """
+    Every ``interval`` seconds, moves online agents whose last heartbeat is
+    older than ``offline_after`` seconds to offline with one bulk UPDATE on
+    the partial ix_agents_online_heartbeat index, and raises an alert per
+    transition.
+
+    Agents upload buffered samples every few minutes (AUTOSTACK_FLUSH_INTERVAL,
+    300s by default, plus jitter), so ``offline_after`` must comfortably
+    exceed the upload interval or healthy agents will flap.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        interval: Optional[float] = None,
+        offline_after: Optional[float] = None,
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.interval = interval if interval is not None else float(os.getenv("AGENT_SWEEP_INTERVAL", "30"))
+        self.offline_after = timedelta(
+            seconds=offline_after if offline_after is not None else float(os.getenv("AGENT_OFFLINE_AFTER_SECONDS", "900"))
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self, now: Optional[datetime] = None) -> List[Tuple[str, str, str]]:
+        """Mark stale agents offline; returns (agent id, user id, name) per transition"""
+        async with self.session_factory() as session:
+            stale = await crud.mark_stale_agents_offline(
+                session, cutoff=(now or datetime.utcnow()) - self.offline_after
+            )
+        for agent_id, user_id, name in stale:
+            overview_cache.invalidate(user_id)
+            logger.info(f"Agent {name} ({agent_id}) marked offline")
+        AGENTS_OFFLINE.inc(len(stale))
+        return stale
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Agent sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Global sweeper instance
+agent_sweeper = AgentSweeper()
@@ -0,0 +1,101 @@
+"""
+API Key Usage
+Write-behind buffer that coalesces ``api_keys.last_used`` updates
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+from sqlalchemy import update
+
+from ..db import AsyncSessionLocal
+from ..metrics import registry
+from ..models import APIKey
+
+logger = logging.getLogger(__name__)
+
+USAGE_FLUSHED = registry.counter(
+    "autostack_api_key_usage_flushed_total",
+    "API key last_used rows written by the usage buffer",
+)
+
+
+class ApiKeyUsageBuffer:
+    """
+    Records when each API key was last used and writes the latest timestamp
+    per key every ``flush_interval`` seconds in one bulk UPDATE.
+
+    An agent heartbeating every 30s costs one row update per flush instead
+    of an UPDATE and a commit per request. ``last_used`` is informational,
+    so up to one interval of usage can be lost if the process dies.
+    """
+
+    def __init__(self, session_factory=None, flush_interval: Optional[float] = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("API_KEY_USAGE_FLUSH_INTERVAL", "10")
+        )
+        self._pending: Dict[str, datetime] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, api_key_id: str, used_at: Optional[datetime] = None):
+        """Note a use of the key; repeated uses before a flush coalesce"""
+        self._pending[api_key_id] = used_at or datetime.utcnow()
+        self._ensure_flush_loop()
+
+    async def flush(self) -> int:
+        """Write all pending timestamps in a single executemany UPDATE"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(
+                        update(APIKey),
+                        [{"id": key_id, "last_used": used_at} for key_id, used_at in batch.items()],
+                    )
+                    await session.commit()
+                USAGE_FLUSHED.inc(len(batch))
+                return len(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush last_used for {len(batch)} API keys: {e}")
+                # Keep them for the next flush unless a newer use was recorded
+                for key_id, used_at in batch.items():
+                    self._pending.setdefault(key_id, used_at)
+                return 0
+
+    async def start(self):
+        """Start the periodic flush loop"""
+        self._ensure_flush_loop()
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def _ensure_flush_loop(self):
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                pass  # No running loop (sync caller); the next async record starts it
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._pending:
+                await self.flush()
+
+
+# Global buffer instance
+api_key_usage = ApiKeyUsageBuffer()
@@ -3,21 +3,36 @@ Budget Alert Service
 Monitor budgets and send alerts when thresholds are exceeded
 """
 import asyncio
+import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import uuid
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, update, and_, or_, case, desc, func
 
+from ..db import AsyncSessionLocal
 from ..models import BudgetAlert, CostSnapshot, Project, User
 
 logger = logging.getLogger(__name__)
 
 
 class BudgetAlertService:
-    """Service for managing budget alerts"""
+    """
+    Service for managing budget alerts.
+    
+    ``current_spend`` is maintained incrementally: every new cost snapshot
+    adds its cost to the project's active budgets (``record_spend``) and a
+    background loop zeroes budgets whose calendar period has ended, so
+    status reads are a single-row lookup.
+    """
+    
+    def __init__(self, reset_interval: Optional[float] = None):
+        self.reset_interval = reset_interval if reset_interval is not None else float(
+            os.getenv("BUDGET_PERIOD_RESET_INTERVAL", "60")
+        )
+        self._reset_task: Optional[asyncio.Task] = None
     
     async def create_budget_alert(
         self,
@@ -33,6 +48,8 @@ class BudgetAlertService:
     ) -> Optional[BudgetAlert]:
         """Create a new budget alert"""
         try:
+            period_start = self._period_start(budget_period, datetime.utcnow())
+            current_spend = await self._period_spend(session, project_id, period_start)
             alert = BudgetAlert(
                 id=str(uuid.uuid4()),
                 project_id=project_id,
@@ -40,8 +57,9 @@ class BudgetAlertService:
                 budget_limit=budget_limit,
                 budget_period=budget_period,
                 alert_threshold=alert_threshold,
-                current_spend=0.0,
-                is_exceeded=False,
+                current_spend=current_spend,
+                period_start=period_start,
+                is_exceeded=current_spend >= budget_limit,
                 auto_scale_down=auto_scale_down,
                 auto_pause=auto_pause,
                 notification_channels=notification_channels or {
@@ -69,7 +87,10 @@ class BudgetAlertService:
         session: AsyncSession,
         project_id: str
     ) -> Optional[BudgetAlert]:
-        """Update current spend for a budget alert"""
+        """
+        Recompute current spend from the period's snapshots. Spend is kept
+        up to date by ``record_spend``; this is only needed to reconcile.
+        """
         try:
             # Get active budget alert
             query = select(BudgetAlert).where(
@@ -85,43 +106,19 @@ class BudgetAlertService:
             if not alert:
                 return None
             
-            # Calculate current spend based on period
-            now = datetime.utcnow()
-            
-            if alert.budget_period == 'daily':
-                start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            elif alert.budget_period == 'weekly':
-                start_date = now - timedelta(days=7)
-            elif alert.budget_period == 'monthly':
-                start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            else:
-                start_date = now - timedelta(days=30)
-            
-            # Get cost snapshots for period
-            cost_query = select(CostSnapshot).where(
-                and_(
-                    CostSnapshot.project_id == project_id,
-                    CostSnapshot.timestamp >= start_date
-                )
-            )
-            
-            cost_result = await session.execute(cost_query)
-            snapshots = list(cost_result.scalars().all())
-            
-            # Calculate total spend
-            current_spend = sum(s.total_cost for s in snapshots)
+            period_start = self._period_start(alert.budget_period, datetime.utcnow())
+            current_spend = await self._period_spend(session, project_id, period_start)
             
             # Update alert
             alert.current_spend = current_spend
+            alert.period_start = period_start
             alert.is_exceeded = current_spend >= alert.budget_limit
             alert.updated_at = datetime.utcnow()
             
             await session.commit()
             await session.refresh(alert)
             
-            # Check if alert threshold is reached
-            if current_spend >= (alert.budget_limit * alert.alert_threshold):
-                await self._send_alert_notification(session, alert)
+            await self.notify_thresholds(session, [alert])
             
             return alert
             
@@ -129,6 +126,143 @@ class BudgetAlertService:
             logger.error(f"Error updating budget spend: {e}")
             return None
     
+    async def record_spend(
+        self,
+        session: AsyncSession,
+        project_id: str,
+        amount: float
+    ) -> List[BudgetAlert]:
+        """
+        Add a new snapshot's cost to the project's active budgets with one
+        UPDATE, in the caller's transaction (the caller commits).
+        
+        A budget whose period has ended since its last reset starts the
+        new period with this amount, so spend is right even before the
+        reset scheduler gets to it. Returns the updated budgets.
+        """
+        now = datetime.utcnow()
+        current_start = self._current_period_start(now)
+        new_spend = case(
+            (BudgetAlert.period_start >= current_start, BudgetAlert.current_spend + amount),
+            else_=amount
+        )
+        result = await session.execute(
+            update(BudgetAlert)
+            .where(
+                and_(
+                    BudgetAlert.project_id == project_id,
+                    BudgetAlert.is_active == True
+                )
+            )
+            .values(
+                current_spend=new_spend,
+                period_start=current_start,
+                is_exceeded=new_spend >= BudgetAlert.budget_limit,
+                updated_at=now
+            )
+            .returning(BudgetAlert)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        return list(result.scalars().all())
+    
+    async def notify_thresholds(
+        self,
+        session: AsyncSession,
+        alerts: List[BudgetAlert]
+    ):
+        """Send notifications for budgets at or over their alert threshold"""
+        for alert in alerts:
+            if alert.current_spend >= (alert.budget_limit * alert.alert_threshold):
+                await self._send_alert_notification(session, alert)
+    
+    async def reset_budget_periods(
+        self,
+        session: AsyncSession,
+        now: Optional[datetime] = None
+    ) -> int:
+        """Start a new period for every active budget whose period has ended"""
+        current_start = self._current_period_start(now or datetime.utcnow())
+        result = await session.execute(
+            update(BudgetAlert)
+            .where(
+                and_(
+                    BudgetAlert.is_active == True,
+                    or_(BudgetAlert.period_start.is_(None), BudgetAlert.period_start < current_start)
+                )
+            )
+            .values(
+                current_spend=0.0,
+                is_exceeded=False,
+                period_start=current_start,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount
+    
+    async def _period_spend(
+        self,
+        session: AsyncSession,
+        project_id: str,
+        period_start: datetime
+    ) -> float:
+        spend = await session.scalar(
+            select(func.coalesce(func.sum(CostSnapshot.total_cost), 0.0)).where(
+                and_(
+                    CostSnapshot.project_id == project_id,
+                    CostSnapshot.timestamp >= period_start
+                )
+            )
+        )
+        return float(spend)
+    
+    @staticmethod
+    def _period_start(budget_period: str, now: datetime) -> datetime:
+        """
+        Start of the calendar period that contains ``now``: midnight, Monday
+        or the 1st (UTC). Unknown periods are treated as monthly.
+        """
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if budget_period == 'daily':
+            return midnight
+        elif budget_period == 'weekly':
+            return midnight - timedelta(days=now.weekday())
+        return midnight.replace(day=1)
+    
+    def _current_period_start(self, now: datetime):
+        """SQL expression for the start of each budget's current period"""
+        return case(
+            *[
+                (BudgetAlert.budget_period == period, self._period_start(period, now))
+                for period in ('daily', 'weekly')
+            ],
+            else_=self._period_start('monthly', now)
+        )
+    
+    def _current_spend(self, alert: BudgetAlert, now: datetime) -> float:
+        """Recorded spend, or 0 if the period ended and has not been reset yet"""
+        if alert.period_start is None or alert.period_start < self._period_start(alert.budget_period, now):
+            return 0.0
+        return alert.current_spend
+    
+    @staticmethod
+    def _status(alert: BudgetAlert, current_spend: float) -> Dict:
+        percentage_used = (current_spend / alert.budget_limit) * 100 if alert.budget_limit > 0 else 0
+        remaining = max(0, alert.budget_limit - current_spend)
+        is_exceeded = current_spend >= alert.budget_limit
+        
+        return {
+            'budget_limit': alert.budget_limit,
+            'current_spend': current_spend,
+            'remaining': remaining,
+            'percentage_used': percentage_used,
+            'is_exceeded': is_exceeded,
+            'alert_threshold': alert.alert_threshold,
+            'budget_period': alert.budget_period,
+            'status': 'exceeded' if is_exceeded else 'warning' if percentage_used >= (alert.alert_threshold * 100) else 'ok'
+        }
+    
     async def _send_alert_notification(
         self,
         session: AsyncSession,
@@ -271,29 +405,39 @@ class BudgetAlertService:
             if not alert:
                 return None
             
-            # Update spend before returning status
-            await self.update_budget_spend(session, project_id)
+            return self._status(alert, self._current_spend(alert, datetime.utcnow()))
             
-            # Refresh alert
-            await session.refresh(alert)
-            
-            percentage_used = (alert.current_spend / alert.budget_limit) * 100 if alert.budget_limit > 0 else 0
-            remaining = max(0, alert.budget_limit - alert.current_spend)
+        except Exception as e:
+            logger.error(f"Error getting budget status: {e}")
+            return None
+    
+    async def get_budget_statuses(
+        self,
+        session: AsyncSession,
+        project_ids: List[str]
+    ) -> Dict[str, Dict]:
+        """Budget status for many projects in one query, without writing"""
+        if not project_ids:
+            return {}
+        try:
+            query = select(BudgetAlert).where(
+                and_(
+                    BudgetAlert.project_id.in_(project_ids),
+                    BudgetAlert.is_active == True
+                )
+            ).order_by(BudgetAlert.created_at)
             
+            result = await session.execute(query)
+            now = datetime.utcnow()
+            # Newest active budget wins if a project has several
             return {
-                'budget_limit': alert.budget_limit,
-                'current_spend': alert.current_spend,
-                'remaining': remaining,
-                'percentage_used': percentage_used,
-                'is_exceeded': alert.is_exceeded,
-                'alert_threshold': alert.alert_threshold,
-                'budget_period': alert.budget_period,
-                'status': 'exceeded' if alert.is_exceeded else 'warning' if percentage_used >= (alert.alert_threshold * 100) else 'ok'
+                alert.project_id: self._status(alert, self._current_spend(alert, now))
+                for alert in result.scalars()
             }
             
         except Exception as e:
-            logger.error(f"Error getting budget status: {e}")
-            return None
+            logger.error(f"Error getting budget statuses: {e}")
+            return {}
     
     async def list_budget_alerts(
         self,
@@ -314,5 +458,31 @@ class BudgetAlertService:
             return []
 
 
+    async def start(self):
+        """Reset ended budget periods now and then every ``reset_interval`` seconds"""
+        if self._reset_task is None or self._reset_task.done():
+            self._reset_task = asyncio.create_task(self._reset_loop())
+    
+    async def stop(self):
+        if self._reset_task:
+            self._reset_task.cancel()
+            try:
+                await self._reset_task
+            except asyncio.CancelledError:
+                pass
+            self._reset_task = None
+    
+    async def _reset_loop(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    reset = await self.reset_budget_periods(session)
+                if reset:
+                    logger.info(f"Started a new period for {reset} budgets")
+            except Exception as e:
+                logger.error(f"Budget period reset failed: {e}")
+            await asyncio.sleep(self.reset_interval)
+
+
 # Global instance
 budget_service = BudgetAlertService()
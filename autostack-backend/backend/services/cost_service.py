@@ -9,7 +9,7 @@ import uuid
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_, desc, func
 
 try:
     import boto3
@@ -21,6 +21,7 @@ from ..models import (
     CostSnapshot, Project, User, CloudCredential,
     CostAnomaly, CostRecommendation
 )
+from .budget_service import budget_service
 
 logger = logging.getLogger(__name__)
 
@@ -163,8 +164,11 @@ class CostAggregationService:
             )
             
             session.add(snapshot)
+            # Budget spend moves in the same transaction as the snapshot
+            budgets = await budget_service.record_spend(session, project_id, snapshot.total_cost)
             await session.commit()
             await session.refresh(snapshot)
+            await budget_service.notify_thresholds(session, budgets)
             
             logger.info(f"Created cost snapshot for project {project_id}: ${snapshot.total_cost}")
             return snapshot
@@ -206,6 +210,32 @@ class CostAggregationService:
         period: str = 'today'
     ) -> Dict:
         """Calculate cost summary for different periods"""
+        summaries = await self.calculate_cost_summaries(session, [project_id], period)
+        if summaries is None:
+            return {}
+        return summaries.get(project_id) or {
+            'total_cost': 0.0,
+            'average_cost': 0.0,
+            'min_cost': 0.0,
+            'max_cost': 0.0,
+            'trend': 'stable'
+        }
+    
+    async def calculate_cost_summaries(
+        self,
+        session: AsyncSession,
+        project_ids: List[str],
+        period: str = 'today'
+    ) -> Optional[Dict[str, Dict]]:
+        """
+        Cost summaries for many projects in one grouped query. Projects
+        without snapshots in the period are absent from the result.
+        
+        The trend compares the newer half of each project's snapshots with
+        the older half, numbered by a window over the project.
+        """
+        if not project_ids:
+            return {}
         try:
             now = datetime.utcnow()
             
@@ -218,47 +248,61 @@ class CostAggregationService:
             else:
                 start_date = now - timedelta(days=1)
             
-            snapshots = await self.get_project_costs(session, project_id, start_date, now)
-            
-            if not snapshots:
-                return {
-                    'total_cost': 0.0,
-                    'average_cost': 0.0,
-                    'min_cost': 0.0,
-                    'max_cost': 0.0,
-                    'trend': 'stable'
-                }
-            
-            costs = [s.total_cost for s in snapshots]
-            total_cost = sum(costs)
-            average_cost = total_cost / len(costs) if costs else 0.0
-            
-            # Calculate trend
-            if len(costs) >= 2:
-                recent_avg = sum(costs[:len(costs)//2]) / (len(costs)//2)
-                older_avg = sum(costs[len(costs)//2:]) / (len(costs) - len(costs)//2)
-                
-                if recent_avg > older_avg * 1.1:
-                    trend = 'increasing'
-                elif recent_avg < older_avg * 0.9:
-                    trend = 'decreasing'
+            ranked = select(
+                CostSnapshot.project_id,
+                CostSnapshot.total_cost,
+                func.row_number().over(
+                    partition_by=CostSnapshot.project_id,
+                    order_by=desc(CostSnapshot.timestamp)
+                ).label('position'),
+                func.count().over(partition_by=CostSnapshot.project_id).label('points'),
+            ).where(
+                and_(
+                    CostSnapshot.project_id.in_(project_ids),
+                    CostSnapshot.timestamp >= start_date,
+                    CostSnapshot.timestamp <= now
+                )
+            ).subquery()
+            
+            # Floor division, as in the per-project split
+            newer = ranked.c.position <= ranked.c.points // 2
+            query = select(
+                ranked.c.project_id,
+                func.count(),
+                func.sum(ranked.c.total_cost),
+                func.min(ranked.c.total_cost),
+                func.max(ranked.c.total_cost),
+                func.coalesce(func.sum(ranked.c.total_cost).filter(newer), 0.0),
+            ).group_by(ranked.c.project_id)
+            
+            summaries = {}
+            for project_id, points, total_cost, min_cost, max_cost, newer_cost in await session.execute(query):
+                if points >= 2:
+                    recent_avg = newer_cost / (points // 2)
+                    older_avg = (total_cost - newer_cost) / (points - points // 2)
+                    
+                    if recent_avg > older_avg * 1.1:
+                        trend = 'increasing'
+                    elif recent_avg < older_avg * 0.9:
+                        trend = 'decreasing'
+                    else:
+                        trend = 'stable'
                 else:
                     trend = 'stable'
-            else:
-                trend = 'stable'
-            
-            return {
-                'total_cost': total_cost,
-                'average_cost': average_cost,
-                'min_cost': min(costs) if costs else 0.0,
-                'max_cost': max(costs) if costs else 0.0,
-                'trend': trend,
-                'data_points': len(snapshots)
-            }
+                
+                summaries[project_id] = {
+                    'total_cost': total_cost,
+                    'average_cost': total_cost / points,
+                    'min_cost': min_cost,
+                    'max_cost': max_cost,
+                    'trend': trend,
+                    'data_points': points
+                }
+            return summaries
             
         except Exception as e:
-            logger.error(f"Error calculating cost summary: {e}")
-            return {}
+            logger.error(f"Error calculating cost summaries: {e}")
+            return None
     
     async def detect_cost_anomalies(
         self,
@@ -0,0 +1,289 @@
+"""
+Deploy Log Service
+Append-only, sequence-numbered deployment logs with batched writes
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, func, desc
+from sqlalchemy.exc import DataError, IntegrityError
+
+from ..db import AsyncSessionLocal
+from ..models import DeploymentLog
+from .log_bus import log_bus
+
+logger = logging.getLogger(__name__)
+
+
+class DeployLogService:
+    """
+    Buffers deploy log lines in memory and writes them to ``deployment_logs``
+    as multi-row inserts, flushed every ``flush_interval`` seconds or as soon
+    as ``flush_size`` lines are pending.
+
+    Sequence numbers are assigned at append time, so readers can page with
+    ``after_sequence`` and see lines that are still buffered. A deployment is
+    logged by the single process running it, which owns its sequence counter.
+
+    Every line is also published to the log bus on ``topic(deployment_id)``
+    for live subscribers.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        flush_interval: Optional[float] = None,
+        flush_size: Optional[int] = None,
+        bus=None,
+        max_pending: Optional[int] = None,
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.bus = bus or log_bus
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("DEPLOY_LOG_FLUSH_INTERVAL", "0.5")
+        )
+        self.flush_size = flush_size if flush_size is not None else int(
+            os.getenv("DEPLOY_LOG_FLUSH_SIZE", "200")
+        )
+        self.max_pending = max_pending if max_pending is not None else int(
+            os.getenv("DEPLOY_LOG_MAX_PENDING", "50000")
+        )
+        self._pending: List[Dict] = []
+        self._inflight: List[Dict] = []  # batch being written by ``flush``
+        self._next_sequence: Dict[str, int] = {}
+        self._seed_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def topic(deployment_id: str) -> str:
+        return f"deploy:{deployment_id}"
+
+    # ========================
+    # Writes
+    # ========================
+
+    async def append(self, deployment_id: str, message: str, log_type: str = "deploy") -> Dict:
+        """Queue a log line and return the entry with its assigned sequence"""
+        sequence = await self._allocate_sequence(deployment_id)
+        entry = {
+            "id": str(uuid.uuid4()),
+            "deployment_id": deployment_id,
+            "sequence": sequence,
+            "log_type": log_type,
+            "message": message,
+            "timestamp": datetime.utcnow(),
+        }
+        self._pending.append(entry)
+        await self.bus.publish(self.topic(deployment_id), entry)
+
+        if len(self._pending) >= self.flush_size:
+            await self.flush()
+        else:
+            self._ensure_flush_loop()
+        return entry
+
+    async def flush(self) -> int:
+        """Write all pending lines in a single multi-row insert"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            # Readers still see the batch until it is committed
+            self._inflight = batch
+            try:
+                return await self._write(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} deploy log lines: {e}")
+                # Keep them for the next flush; sequences stay unique, so lines
+                # a partial bisect already wrote are dropped as duplicates then
+                self._pending = batch + self._pending
+                overflow = len(self._pending) - self.max_pending
+                if overflow > 0:
+                    logger.error(f"Deploy log buffer full, dropping {overflow} oldest lines")
+                    del self._pending[:overflow]
+                return 0
+            finally:
+                self._inflight = []
+
+    async def _write(self, batch: List[Dict]) -> int:
+        """
+        Insert a batch. Rows rejected by a constraint (e.g. their deployment
+        was deleted) are isolated by bisecting and dropped, so one bad line
+        cannot block every later flush.
+        """
+        try:
+            async with self.session_factory() as session:
+                await session.execute(insert(DeploymentLog), batch)
+                await session.commit()
+            return len(batch)
+        except (IntegrityError, DataError) as e:
+            if len(batch) == 1:
+                entry = batch[0]
+                logger.error(
+                    f"Dropping deploy log line {entry['sequence']} of {entry['deployment_id']}: {e.orig}"
+                )
+                return 0
+            middle = len(batch) // 2
+            return await self._write(batch[:middle]) + await self._write(batch[middle:])
+
+    async def finish(self, deployment_id: str) -> str:
+        """
+        Flush a finished deployment and return its full log text, suitable
+        for the ``Deploy.logs`` snapshot.
+        """
+        await self.flush()
+        next_sequence = self._next_sequence.pop(deployment_id, None)
+        last_sequence = next_sequence - 1 if next_sequence else await self._last_sequence(deployment_id)
+        await self.bus.close(self.topic(deployment_id), last_sequence=last_sequence)
+        try:
+            async with self.session_factory() as session:
+                entries = await self._query(session, deployment_id, after_sequence=0, limit=None)
+            return self.render(entries)
+        except Exception as e:
+            logger.error(f"Failed to read logs for deployment {deployment_id}: {e}")
+            return ""
+
+    async def start(self):
+        """Start the periodic flush loop"""
+        self._ensure_flush_loop()
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    # ========================
+    # Reads
+    # ========================
+
+    async def read(
+        self,
+        db: AsyncSession,
+        deployment_id: str,
+        after_sequence: int = 0,
+        limit: int = 500,
+    ) -> List[Dict]:
+        """Return up to ``limit`` lines with sequence greater than ``after_sequence``"""
+        buffered = self._buffered(deployment_id, after_sequence)
+        stored = await self._query(db, deployment_id, after_sequence=after_sequence, limit=limit)
+        return self._merge(stored, buffered)[:limit]
+
+    async def tail(self, db: AsyncSession, deployment_id: str, lines: int = 100) -> List[Dict]:
+        """Return the last ``lines`` lines of a deployment in ascending order"""
+        buffered = self._buffered(deployment_id)
+        result = await db.execute(
+            select(DeploymentLog)
+            .where(DeploymentLog.deployment_id == deployment_id)
+            .order_by(desc(DeploymentLog.sequence))
+            .limit(lines)
+        )
+        stored = [self._to_entry(row) for row in reversed(result.scalars().all())]
+        merged = self._merge(stored, buffered)
+        return merged[-lines:] if lines else []
+
+    @staticmethod
+    def render(entries: List[Dict]) -> str:
+        """Join entries into the newline-terminated text format of ``Deploy.logs``"""
+        return "".join(f"{e['message']}\n" for e in entries)
+
+    # ========================
+    # Internals
+    # ========================
+
+    async def _allocate_sequence(self, deployment_id: str) -> int:
+        if deployment_id not in self._next_sequence:
+            async with self._seed_lock:
+                if deployment_id not in self._next_sequence:
+                    self._next_sequence[deployment_id] = await self._last_sequence(deployment_id) + 1
+        sequence = self._next_sequence[deployment_id]
+        self._next_sequence[deployment_id] = sequence + 1
+        return sequence
+
+    async def _last_sequence(self, deployment_id: str) -> int:
+        """Continue numbering after lines written by an earlier run"""
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(func.max(DeploymentLog.sequence))
+                    .where(DeploymentLog.deployment_id == deployment_id)
+                )
+                return result.scalar() or 0
+        except Exception as e:
+            logger.error(f"Failed to read last log sequence for {deployment_id}: {e}")
+            return 0
+
+    def _buffered(self, deployment_id: str, after_sequence: int = 0) -> List[Dict]:
+        """
+        Lines not yet committed: the batch being flushed and those pending.
+        Taken before querying the table, so a flush committing during the
+        query leaves its lines in at least one of the two.
+        """
+        return [
+            e for e in self._inflight + self._pending
+            if e["deployment_id"] == deployment_id and e["sequence"] > after_sequence
+        ]
+
+    async def _query(
+        self,
+        db: AsyncSession,
+        deployment_id: str,
+        after_sequence: int,
+        limit: Optional[int],
+    ) -> List[Dict]:
+        query = (
+            select(DeploymentLog)
+            .where(
+                DeploymentLog.deployment_id == deployment_id,
+                DeploymentLog.sequence > after_sequence,
+            )
+            .order_by(DeploymentLog.sequence)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        result = await db.execute(query)
+        return [self._to_entry(row) for row in result.scalars().all()]
+
+    @staticmethod
+    def _to_entry(row: DeploymentLog) -> Dict:
+        return {
+            "id": row.id,
+            "deployment_id": row.deployment_id,
+            "sequence": row.sequence,
+            "log_type": row.log_type,
+            "message": row.message,
+            "timestamp": row.timestamp,
+        }
+
+    @staticmethod
+    def _merge(stored: List[Dict], buffered: List[Dict]) -> List[Dict]:
+        # A flush can commit between the buffer snapshot and the query, so dedupe
+        by_sequence = {e["sequence"]: e for e in stored}
+        for e in buffered:
+            by_sequence.setdefault(e["sequence"], e)
+        return [by_sequence[s] for s in sorted(by_sequence)]
+
+    def _ensure_flush_loop(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._pending:
+                await self.flush()
+
+
+# Global service instance
+deploy_log_service = DeployLogService()
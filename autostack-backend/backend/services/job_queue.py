@@ -0,0 +1,285 @@
+"""
+Deploy Job Queue
+Durable, Postgres-backed queue for deploy work with priorities and per-user caps
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+import logging
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from ..db import AsyncSessionLocal
+from ..metrics import registry
+from ..models import DeployJob
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: rollbacks jump ahead of fresh deploys
+PRIORITY_ROLLBACK = 0
+PRIORITY_DEPLOY = 10
+
+# Claims take this transaction-level advisory lock so per-user caps are exact
+CLAIM_LOCK_KEY = 0x6A6F6273
+
+JobHandler = Callable[..., Awaitable[Optional[str]]]
+AbandonHook = Callable[..., Awaitable[None]]
+
+ABANDONED_ERROR = "Worker stopped responding"
+
+JOB_WAIT_SECONDS = registry.histogram(
+    "autostack_deploy_job_wait_seconds",
+    "Time deploy jobs spent queued before a worker claimed them",
+    ["kind"],
+)
+JOBS_FINISHED = registry.counter(
+    "autostack_deploy_jobs_total",
+    "Deploy jobs finished by kind and result",
+    ["kind", "result"],
+)
+
+
+class QueueFull(Exception):
+    """Raised when a user already has the maximum number of queued jobs"""
+
+
+class JobQueue:
+    """
+    Deploy jobs stored in ``deploy_jobs`` and claimed with
+    ``SELECT ... FOR UPDATE SKIP LOCKED``.
+
+    A worker claims the oldest queued job in the best priority lane whose
+    owner has fewer than ``per_user_limit`` jobs running. Running jobs are
+    heartbeated; jobs whose worker stopped heartbeating for ``stale_after``
+    seconds are queued again (or failed after ``max_attempts`` claims), so
+    work survives process restarts.
+
+    Handlers are registered by kind and called with the job payload as
+    keyword arguments. A handler fails its job by raising or by returning
+    an error message. An optional ``on_abandoned`` hook is called as
+    ``hook(session, error, **payload)`` in the transaction that fails a job
+    whose worker died, so the handler's own records can be finished too.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        per_user_limit: Optional[int] = None,
+        max_queued_per_user: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        stale_after: Optional[float] = None,
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.per_user_limit = per_user_limit if per_user_limit is not None else int(
+            os.getenv("DEPLOY_JOBS_PER_USER", "2")
+        )
+        self.max_queued_per_user = max_queued_per_user if max_queued_per_user is not None else int(
+            os.getenv("DEPLOY_QUEUE_MAX_PER_USER", "20")
+        )
+        self.max_attempts = max_attempts if max_attempts is not None else int(
+            os.getenv("DEPLOY_JOB_MAX_ATTEMPTS", "3")
+        )
+        self.stale_after = stale_after if stale_after is not None else float(
+            os.getenv("DEPLOY_JOB_STALE_SECONDS", "300")
+        )
+        self.handlers: Dict[str, JobHandler] = {}
+        self.abandon_hooks: Dict[str, AbandonHook] = {}
+        self._wakeup = asyncio.Event()
+
+    def register(self, kind: str, handler: JobHandler, on_abandoned: Optional[AbandonHook] = None):
+        self.handlers[kind] = handler
+        if on_abandoned is not None:
+            self.abandon_hooks[kind] = on_abandoned
+
+    # ========================
+    # Producers
+    # ========================
+
+    async def check_capacity(self, db: AsyncSession, user_id: str):
+        """Raise QueueFull if ``user_id`` cannot queue another job"""
+        queued = await db.scalar(
+            select(func.count()).select_from(DeployJob).where(
+                DeployJob.user_id == user_id,
+                DeployJob.status == "queued",
+            )
+        )
+        if queued >= self.max_queued_per_user:
+            raise QueueFull(f"{queued} deploy jobs already queued (limit {self.max_queued_per_user})")
+
+    async def enqueue(
+        self,
+        db: AsyncSession,
+        kind: str,
+        payload: Dict,
+        user_id: str,
+        priority: int = PRIORITY_DEPLOY,
+    ) -> DeployJob:
+        """Persist a job and wake any local worker"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+
+        job = DeployJob(
+            kind=kind,
+            payload=payload,
+            user_id=user_id,
+            priority=priority,
+            status="queued",
+            attempts=0,
+            max_attempts=self.max_attempts,
+            created_at=datetime.utcnow(),
+        )
+        db.add(job)
+        await db.commit()
+        self._wakeup.set()
+        logger.info(f"Queued {kind} job {job.id} for user {user_id} (priority {priority})")
+        return job
+
+    # ========================
+    # Workers
+    # ========================
+
+    async def wait_for_work(self, timeout: float):
+        """Sleep until a job is enqueued in this process or ``timeout`` passes"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def claim(self, worker_id: str) -> Optional[DeployJob]:
+        """Mark the next eligible job running for ``worker_id`` and return it"""
+        running = aliased(DeployJob)
+        running_for_owner = (
+            select(func.count())
+            .select_from(running)
+            .where(running.user_id == DeployJob.user_id, running.status == "running")
+            .scalar_subquery()
+        )
+        stmt = (
+            select(DeployJob)
+            .where(DeployJob.status == "queued", running_for_owner < self.per_user_limit)
+            .order_by(DeployJob.priority, DeployJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=DeployJob)
+        )
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                if session.bind.dialect.name == "postgresql":
+                    await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CLAIM_LOCK_KEY})
+                job = (await session.execute(stmt)).scalar_one_or_none()
+                if job is None:
+                    return None
+
+                now = datetime.utcnow()
+                job.status = "running"
+                job.attempts += 1
+                job.worker_id = worker_id
+                job.started_at = now
+                job.heartbeat_at = now
+
+        JOB_WAIT_SECONDS.observe((job.started_at - job.created_at).total_seconds(), kind=job.kind)
+        return job
+
+    async def run(self, job: DeployJob):
+        """Run a claimed job's handler and record the outcome"""
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            await self.complete(job, error=f"No handler registered for job kind {job.kind!r}")
+            return
+
+        try:
+            error = await handler(**job.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        if error:
+            logger.error(f"Deploy job {job.id} ({job.kind}) failed: {error}")
+        await self.complete(job, error=error)
+
+    async def complete(self, job: DeployJob, error: Optional[str] = None):
+        async with self.session_factory() as session:
+            await session.execute(
+                update(DeployJob)
+                .where(DeployJob.id == job.id)
+                .values(
+                    status="failed" if error else "succeeded",
+                    last_error=error,
+                    finished_at=datetime.utcnow(),
+                )
+            )
+            await session.commit()
+        JOBS_FINISHED.inc(kind=job.kind, result="failed" if error else "succeeded")
+
+    async def heartbeat(self, worker_id: str, job_ids: Iterable[str]):
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        async with self.session_factory() as session:
+            await session.execute(
+                update(DeployJob)
+                .where(DeployJob.id.in_(job_ids), DeployJob.worker_id == worker_id)
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    async def release(self, worker_id: str, job_ids: Iterable[str]):
+        """Queue a stopping worker's jobs again without spending an attempt"""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        async with self.session_factory() as session:
+            await session.execute(
+                update(DeployJob)
+                .where(
+                    DeployJob.id.in_(job_ids),
+                    DeployJob.worker_id == worker_id,
+                    DeployJob.status == "running",
+                )
+                .values(status="queued", worker_id=None, attempts=DeployJob.attempts - 1)
+            )
+            await session.commit()
+
+    async def requeue_stale(self) -> int:
+        """Queue again (or fail) running jobs whose worker stopped heartbeating"""
+        now = datetime.utcnow()
+        stale = (DeployJob.status == "running", DeployJob.heartbeat_at < now - timedelta(seconds=self.stale_after))
+        async with self.session_factory() as session:
+            abandoned: List[DeployJob] = (await session.execute(
+                select(DeployJob)
+                .where(*stale, DeployJob.attempts >= DeployJob.max_attempts)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+            for job in abandoned:
+                job.status = "failed"
+                job.worker_id = None
+                job.last_error = ABANDONED_ERROR
+                job.finished_at = now
+                hook = self.abandon_hooks.get(job.kind)
+                if hook is not None:
+                    await hook(session, ABANDONED_ERROR, **job.payload)
+
+            result = await session.execute(
+                update(DeployJob)
+                .where(*stale, DeployJob.attempts < DeployJob.max_attempts)
+                .values(status="queued", worker_id=None)
+            )
+            await session.commit()
+
+        for job in abandoned:
+            JOBS_FINISHED.inc(kind=job.kind, result="failed")
+        recovered = len(abandoned) + result.rowcount
+        if recovered:
+            logger.warning(
+                f"Recovered {recovered} deploy jobs from unresponsive workers ({len(abandoned)} out of attempts)"
+            )
+            self._wakeup.set()
+        return recovered
+
+
+# Global job queue instance
+job_queue = JobQueue()
@@ -0,0 +1,224 @@
+"""
+Log Bus
+In-process pub/sub for live log lines, with an optional Redis Streams backend
+"""
+import asyncio
+import os
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set
+import logging
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class LogBusLagged(Exception):
+    """The subscriber fell behind further than the bus retains; catch up from storage"""
+
+
+class _Subscriber:
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+
+
+class _Topic:
+    def __init__(self, history: int):
+        self.history: Deque[Dict] = deque(maxlen=history)
+        self.subscribers: Set[_Subscriber] = set()
+        self.closed = False
+
+
+_CLOSED = object()
+
+
+class InMemoryLogBus:
+    """
+    Fan-out of log entries to subscribers in this process.
+
+    Each topic keeps the last ``history`` entries so subscribers can resume
+    from a sequence offset. Subscriber queues are bounded: publishing never
+    waits on a slow client; a subscriber whose queue overflows is resynced
+    from the history, or gets ``LogBusLagged`` if it fell out of it.
+
+    Entries are dicts carrying a monotonically increasing ``sequence``.
+    """
+
+    def __init__(self, history: int = 1000, queue_size: int = 256, max_topics: int = 1000):
+        self.history = history
+        self.queue_size = queue_size
+        self.max_topics = max_topics
+        self._topics: "OrderedDict[str, _Topic]" = OrderedDict()
+
+    async def publish(self, topic: str, entry: Dict):
+        state = self._topic(topic)
+        state.closed = False
+        state.history.append(entry)
+        for sub in state.subscribers:
+            if sub.lagged:
+                continue
+            try:
+                sub.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                sub.lagged = True
+
+    async def close(self, topic: str, last_sequence: Optional[int] = None):
+        """Mark the end of a topic's stream; subscribers finish iterating"""
+        state = self._topic(topic)
+        state.closed = True
+        for sub in state.subscribers:
+            try:
+                sub.queue.put_nowait(_CLOSED)
+            except asyncio.QueueFull:
+                sub.lagged = True
+        self._evict()
+
+    async def subscribe(self, topic: str, after_sequence: int = 0) -> AsyncIterator[Dict]:
+        """Yield entries with sequence greater than ``after_sequence``, live"""
+        state = self._topic(topic)
+        sub = _Subscriber(self.queue_size)
+        state.subscribers.add(sub)
+        last = after_sequence
+        try:
+            backlog = self._replay(state, last)
+            while True:
+                for entry in backlog:
+                    last = entry["sequence"]
+                    yield entry
+                if state.closed and sub.queue.empty():
+                    return
+
+                item = await sub.queue.get()
+                if sub.lagged:
+                    # Drop what is queued and resync from history
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    sub.lagged = False
+                    backlog = self._replay(state, last)
+                    continue
+                if item is _CLOSED:
+                    return
+                backlog = [item] if item["sequence"] > last else []
+        finally:
+            state.subscribers.discard(sub)
+
+    def _replay(self, state: _Topic, after_sequence: int) -> List[Dict]:
+        if state.history and after_sequence < state.history[0]["sequence"] - 1:
+            raise LogBusLagged(f"offset {after_sequence} is older than retained history")
+        return [e for e in state.history if e["sequence"] > after_sequence]
+
+    def _topic(self, topic: str) -> _Topic:
+        state = self._topics.get(topic)
+        if state is None:
+            state = self._topics[topic] = _Topic(self.history)
+        else:
+            self._topics.move_to_end(topic)
+        return state
+
+    def _evict(self):
+        # Forget the least recently used closed topics nobody is watching
+        for name in list(self._topics):
+            if len(self._topics) <= self.max_topics:
+                break
+            state = self._topics[name]
+            if state.closed and not state.subscribers:
+                del self._topics[name]
+
+
+class RedisLogBus:
+    """
+    Log bus backed by Redis Streams, for when deploys and WebSocket clients
+    run in different processes.
+
+    Entries are added with stream ID ``<sequence>-0`` so offsets map directly
+    onto XREAD positions; the end marker uses ``<last_sequence>-1``. Any
+    client exposing the ``redis.asyncio`` stream commands can be injected.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        url: Optional[str] = None,
+        history: int = 1000,
+        block_ms: int = 500,
+        ttl_seconds: int = 86400,
+    ):
+        if client is None:
+            if not aioredis:
+                raise RuntimeError("redis not installed. Install with: pip install redis")
+            client = aioredis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.history = history
+        self.block_ms = block_ms
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(topic: str) -> str:
+        return f"logbus:{topic}"
+
+    async def publish(self, topic: str, entry: Dict):
+        key = self._key(topic)
+        fields = {k: "" if v is None else str(v) for k, v in entry.items()}
+        try:
+            await self.client.xadd(
+                key, fields, id=f"{entry['sequence']}-0", maxlen=self.history, approximate=True
+            )
+            await self.client.expire(key, self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Failed to publish to {key}: {e}")
+
+    async def close(self, topic: str, last_sequence: Optional[int] = None):
+        key = self._key(topic)
+        try:
+            await self.client.xadd(key, {"end": "1"}, id=f"{last_sequence or 0}-1")
+            await self.client.expire(key, self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Failed to close {key}: {e}")
+
+    async def subscribe(self, topic: str, after_sequence: int = 0) -> AsyncIterator[Dict]:
+        key = self._key(topic)
+
+        # Trimmed past the requested offset: the caller must catch up elsewhere
+        first = await self.client.xrange(key, count=1)
+        if first:
+            first_sequence = int(_text(first[0][0]).split("-")[0])
+            if after_sequence < first_sequence - 1:
+                raise LogBusLagged(f"offset {after_sequence} is older than retained history")
+
+        last_id = f"{after_sequence}-0"
+        while True:
+            response = await self.client.xread({key: last_id}, count=100, block=self.block_ms)
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = _text(entry_id)
+                    fields = {_text(k): _text(v) for k, v in fields.items()}
+                    if fields.get("end"):
+                        return
+                    fields["sequence"] = int(fields["sequence"])
+                    yield fields
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def create_log_bus():
+    """Use Redis when LOG_BUS_REDIS_URL is set, otherwise stay in-process"""
+    url = os.getenv("LOG_BUS_REDIS_URL")
+    if url:
+        try:
+            return RedisLogBus(url=url)
+        except RuntimeError as e:
+            logger.error(f"{e}; falling back to in-process log bus")
+    return InMemoryLogBus(
+        history=int(os.getenv("LOG_BUS_HISTORY", "1000")),
+        queue_size=int(os.getenv("LOG_BUS_QUEUE_SIZE", "256")),
+    )
+
+
+# Global log bus instance
+log_bus = create_log_bus()
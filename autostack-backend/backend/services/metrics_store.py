@@ -0,0 +1,371 @@
+"""
+Metrics Store
+Daily-partitioned raw samples, incrementally maintained rollups and retention
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import AsyncSessionLocal
+from ..models import Metrics, MetricsRollup1d, MetricsRollup1h, MetricsRollup1m
+
+logger = logging.getLogger(__name__)
+
+# Resolution -> (rollup model or None for raw samples, bucket width)
+RESOLUTIONS = {
+    "raw": (None, timedelta(seconds=30)),  # nominal agent reporting interval
+    "1m": (MetricsRollup1m, timedelta(minutes=1)),
+    "1h": (MetricsRollup1h, timedelta(hours=1)),
+    "1d": (MetricsRollup1d, timedelta(days=1)),
+}
+
+PARTITION_NAME = re.compile(r"^metrics_p(\d{8})$")
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    if resolution == "1m":
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _first(value, default):
+    return default if value is None else value
+
+
+def _retention(name: str, default: str) -> Optional[timedelta]:
+    days = float(os.getenv(name, default))
+    return timedelta(days=days) if days > 0 else None  # 0 keeps forever
+
+
+class MetricsStore:
+    """
+    Storage layout for agent samples:
+
+    - ``metrics`` holds raw samples. On Postgres it is range-partitioned by
+      day (``metrics_pYYYYMMDD``, plus ``metrics_default``); retention drops
+      whole partitions instead of running DELETEs over the table.
+    - ``metrics_rollup_{1m,1h,1d}`` hold per-agent sums, counts and min/max
+      per bucket. Every ingest merges into them with one multi-row upsert per
+      resolution in the same transaction, so they are always current.
+
+    ``series`` answers range queries from the finest table that still has
+    data for the whole range in at most ``max_points`` points.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        raw_retention: Optional[timedelta] = None,
+        rollup_retention: Optional[Dict[str, Optional[timedelta]]] = None,
+        partitions_ahead: Optional[int] = None,
+        maintenance_interval: Optional[float] = None,
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.raw_retention = raw_retention or _retention("METRICS_RAW_RETENTION_DAYS", "7") or timedelta(days=7)
+        self.retention: Dict[str, Optional[timedelta]] = rollup_retention or {
+            "1m": _retention("METRICS_1M_RETENTION_DAYS", "30"),
+            "1h": _retention("METRICS_1H_RETENTION_DAYS", "365"),
+            "1d": _retention("METRICS_1D_RETENTION_DAYS", "0"),
+        }
+        self.retention["raw"] = self.raw_retention
+        self.partitions_ahead = partitions_ahead if partitions_ahead is not None else int(
+            os.getenv("METRICS_PARTITIONS_AHEAD", "3")
+        )
+        self.maintenance_interval = maintenance_interval if maintenance_interval is not None else float(
+            os.getenv("METRICS_MAINTENANCE_INTERVAL", "3600")
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    # ========================
+    # Writes
+    # ========================
+
+    def accepts(self, timestamp: datetime, now: datetime) -> bool:
+        """Samples older than raw retention or more than a day ahead are refused"""
+        return now - self.raw_retention <= timestamp <= now + timedelta(days=1)
+
+    async def write_rollups(self, db: AsyncSession, rows: Iterable[Dict]):
+        """Merge raw sample rows into every rollup table (caller commits)"""
+        rows = [row for row in rows if row.get("agent_id")]
+        if not rows:
+            return
+        dialect = db.bind.dialect.name
+        for resolution in ("1m", "1h", "1d"):
+            model = RESOLUTIONS[resolution][0]
+            buckets = self._aggregate(rows, resolution)
+            # Sorted so concurrent ingests lock rows in the same order
+            values = [buckets[key] for key in sorted(buckets)]
+            await db.execute(self._upsert(model, dialect), values)
+
+    @staticmethod
+    def _aggregate(rows: List[Dict], resolution: str) -> Dict[Tuple[str, datetime], Dict]:
+        buckets: Dict[Tuple[str, datetime], Dict] = {}
+        for row in rows:
+            key = (row["agent_id"], bucket_start(row["timestamp"], resolution))
+            cpu, memory, disk = row["cpu_usage"], row["memory_usage"], row.get("disk_usage")
+            # Extremes of the readings behind the sample, when the agent sent them
+            cpu_min, cpu_max = _first(row.get("cpu_min"), cpu), _first(row.get("cpu_max"), cpu)
+            memory_min, memory_max = _first(row.get("memory_min"), memory), _first(row.get("memory_max"), memory)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {
+                    "agent_id": key[0],
+                    "bucket": key[1],
+                    "user_id": row["user_id"],
+                    "samples": 1,
+                    "cpu_sum": cpu, "cpu_min": cpu_min, "cpu_max": cpu_max,
+                    "memory_sum": memory, "memory_min": memory_min, "memory_max": memory_max,
+                    "disk_max": disk,
+                    "network_in_sum": row.get("network_in") or 0.0,
+                    "network_out_sum": row.get("network_out") or 0.0,
+                }
+                continue
+            bucket["samples"] += 1
+            bucket["cpu_sum"] += cpu
+            bucket["cpu_min"] = min(bucket["cpu_min"], cpu_min)
+            bucket["cpu_max"] = max(bucket["cpu_max"], cpu_max)
+            bucket["memory_sum"] += memory
+            bucket["memory_min"] = min(bucket["memory_min"], memory_min)
+            bucket["memory_max"] = max(bucket["memory_max"], memory_max)
+            if disk is not None:
+                bucket["disk_max"] = disk if bucket["disk_max"] is None else max(bucket["disk_max"], disk)
+            bucket["network_in_sum"] += row.get("network_in") or 0.0
+            bucket["network_out_sum"] += row.get("network_out") or 0.0
+        return buckets
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _upsert(model, dialect: str):
+        """Merge statement for one rollup table, built once and run as an executemany"""
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        least, greatest = (func.least, func.greatest) if dialect == "postgresql" else (func.min, func.max)
+        stmt = insert(model.__table__)
+        current, new = model.__table__.c, stmt.excluded
+        return stmt.on_conflict_do_update(
+            index_elements=["agent_id", "bucket"],
+            set_={
+                "samples": current.samples + new.samples,
+                "cpu_sum": current.cpu_sum + new.cpu_sum,
+                "cpu_min": least(current.cpu_min, new.cpu_min),
+                "cpu_max": greatest(current.cpu_max, new.cpu_max),
+                "memory_sum": current.memory_sum + new.memory_sum,
+                "memory_min": least(current.memory_min, new.memory_min),
+                "memory_max": greatest(current.memory_max, new.memory_max),
+                "disk_max": greatest(
+                    func.coalesce(current.disk_max, new.disk_max), func.coalesce(new.disk_max, current.disk_max)
+                ),
+                "network_in_sum": current.network_in_sum + new.network_in_sum,
+                "network_out_sum": current.network_out_sum + new.network_out_sum,
+            },
+        )
+
+    # ========================
+    # Reads
+    # ========================
+
+    def choose_resolution(self, start: datetime, end: datetime, now: datetime, max_points: int) -> str:
+        """Finest resolution that still covers ``start`` and fits in ``max_points``"""
+        for resolution, (_, step) in RESOLUTIONS.items():
+            retention = self.retention.get(resolution)
+            if retention is not None and start < now - retention:
+                continue
+            if (end - start) / step <= max_points:
+                return resolution
+        return "1d"
+
+    async def series(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: str,
+        agent_id: str,
+        start: datetime,
+        end: datetime,
+        resolution: str = "auto",
+        max_points: int = 1000,
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Points for one agent in [start, end), from raw samples or a rollup.
+        An explicit ``resolution`` that would return more than ``max_points``
+        points raises ValueError.
+        """
+        explicit = resolution != "auto"
+        if explicit:
+            model, step = RESOLUTIONS[resolution]
+            if (end - start) / step > max_points:
+                raise ValueError(
+                    f"Range needs more than {max_points} points at resolution {resolution}; "
+                    f"use a coarser resolution or a shorter range"
+                )
+        else:
+            resolution = self.choose_resolution(start, end, datetime.utcnow(), max_points)
+            model = RESOLUTIONS[resolution][0]
+
+        if model is None:
+            result = await db.execute(
+                select(Metrics)
+                .where(
+                    Metrics.agent_id == agent_id,
+                    Metrics.user_id == user_id,
+                    Metrics.timestamp >= start,
+                    Metrics.timestamp < end,
+                )
+                .order_by(Metrics.timestamp)
+                # Agents may report faster than the nominal interval
+                .limit(max_points + 1 if explicit else None)
+            )
+            samples = result.scalars().all()
+            if explicit and len(samples) > max_points:
+                raise ValueError(
+                    f"Range has more than {max_points} raw samples; "
+                    f"use a coarser resolution or a shorter range"
+                )
+            return resolution, [
+                {
+                    "timestamp": m.timestamp,
+                    "samples": 1,
+                    "cpu_avg": m.cpu_usage,
+                    "cpu_min": _first(m.cpu_min, m.cpu_usage),
+                    "cpu_max": _first(m.cpu_max, m.cpu_usage),
+                    "cpu_p95": m.cpu_p95,
+                    "memory_avg": m.memory_usage,
+                    "memory_min": _first(m.memory_min, m.memory_usage),
+                    "memory_max": _first(m.memory_max, m.memory_usage),
+                    "memory_p95": m.memory_p95,
+                    "disk_max": m.disk_usage,
+                    "network_in": m.network_in,
+                    "network_out": m.network_out,
+                }
+                for m in samples
+            ]
+
+        result = await db.execute(
+            select(model)
+            .where(
+                model.agent_id == agent_id,
+                model.user_id == user_id,
+                model.bucket >= bucket_start(start, resolution),
+                model.bucket < end,
+            )
+            .order_by(model.bucket)
+        )
+        return resolution, [
+            {
+                "timestamp": r.bucket,
+                "samples": r.samples,
+                "cpu_avg": r.cpu_sum / r.samples, "cpu_min": r.cpu_min, "cpu_max": r.cpu_max,
+                "memory_avg": r.memory_sum / r.samples, "memory_min": r.memory_min, "memory_max": r.memory_max,
+                "disk_max": r.disk_max,
+                "network_in": r.network_in_sum / r.samples,
+                "network_out": r.network_out_sum / r.samples,
+            }
+            for r in result.scalars()
+        ]
+
+    # ========================
+    # Partitions and retention
+    # ========================
+
+    async def ensure_partitions(self, db: AsyncSession, now: Optional[datetime] = None) -> List[str]:
+        """Create the daily partitions covering raw retention through ``partitions_ahead`` days"""
+        if db.bind.dialect.name != "postgresql":
+            return []
+        today = bucket_start(now or datetime.utcnow(), "1d")
+        first = today - timedelta(days=self.raw_retention.days)
+        created = []
+        for offset in range((today - first).days + self.partitions_ahead + 1):
+            day = first + timedelta(days=offset)
+            name = f"metrics_p{day:%Y%m%d}"
+            exists = await db.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+            if exists:
+                continue
+            lower, upper = f"{day:%Y-%m-%d}", f"{day + timedelta(days=1):%Y-%m-%d}"
+            # Rows for this day may already sit in the default partition; move
+            # them over, as attaching a range the default still holds fails
+            await db.execute(text(f"CREATE TABLE {name} (LIKE metrics INCLUDING DEFAULTS)"))
+            await db.execute(text(
+                f"WITH moved AS (DELETE FROM metrics_default WHERE timestamp >= '{lower}' AND timestamp < '{upper}' RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ))
+            await db.execute(text(
+                f"ALTER TABLE metrics ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            ))
+            await db.commit()
+            created.append(name)
+        return created
+
+    async def apply_retention(self, db: AsyncSession, now: Optional[datetime] = None) -> List[str]:
+        """Drop raw partitions past retention and trim rollups; returns dropped partitions"""
+        now = now or datetime.utcnow()
+        cutoff = now - self.raw_retention
+        dropped = []
+
+        if db.bind.dialect.name == "postgresql":
+            partitions = (await db.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'metrics'"
+            ))).scalars().all()
+            for name in partitions:
+                match = PARTITION_NAME.match(name)
+                if match and datetime.strptime(match.group(1), "%Y%m%d") + timedelta(days=1) <= cutoff:
+                    await db.execute(text(f"DROP TABLE {name}"))
+                    dropped.append(name)
+            # Stragglers in the default partition are few; delete them
+            await db.execute(text("DELETE FROM metrics_default WHERE timestamp < :cutoff"), {"cutoff": cutoff})
+        else:
+            await db.execute(delete(Metrics).where(Metrics.timestamp < cutoff))
+
+        for resolution in ("1m", "1h", "1d"):
+            retention = self.retention.get(resolution)
+            if retention is not None:
+                model = RESOLUTIONS[resolution][0]
+                await db.execute(delete(model).where(model.bucket < now - retention))
+        await db.commit()
+        return dropped
+
+    async def maintain(self):
+        """One maintenance pass: create upcoming partitions, then apply retention"""
+        async with self.session_factory() as session:
+            created = await self.ensure_partitions(session)
+            dropped = await self.apply_retention(session)
+        if created or dropped:
+            logger.info(f"Metrics partitions created {created}, dropped {dropped}")
+
+    async def start(self):
+        """Run maintenance now and then every ``maintenance_interval`` seconds"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"Metrics maintenance failed: {e}")
+            await asyncio.sleep(self.maintenance_interval)
+
+
+# Global store instance
+metrics_store = MetricsStore()
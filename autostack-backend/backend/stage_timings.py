@@ -0,0 +1,72 @@
+"""
+Deploy pipeline stage timings for AutoStack
+Per-deploy stage durations, exported as Prometheus histograms
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .metrics import registry
+
+# Deploys span seconds to tens of minutes (Kaniko builds, LB provisioning)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+DEPLOY_STAGE_SECONDS = registry.histogram(
+    "autostack_deploy_stage_duration_seconds",
+    "Time spent in each deploy pipeline stage",
+    ["engine", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+DEPLOY_DURATION_SECONDS = registry.histogram(
+    "autostack_deploy_duration_seconds",
+    "End-to-end deploy duration by result, excluding time queued",
+    ["engine", "result"],
+    buckets=STAGE_BUCKETS,
+)
+
+
+class StageTimings:
+    """
+    Collects stage durations for one deploy.
+
+    Each finished stage is observed in ``DEPLOY_STAGE_SECONDS`` immediately,
+    so slow stages show up in /metrics while the deploy is still running.
+    ``as_dict()`` is what gets persisted on the Deploy row.
+    """
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self.stages: Dict[str, float] = {}
+        self.total: Optional[float] = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage ``name``, even if it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        seconds = max(0.0, seconds)
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        DEPLOY_STAGE_SECONDS.observe(seconds, engine=self.engine, stage=name)
+
+    def sum(self, *names: str) -> float:
+        return sum(self.stages.get(name, 0.0) for name in names)
+
+    def finish(self, result: str) -> float:
+        """Close the timer and record the end-to-end duration"""
+        if self.total is None:
+            self.total = time.perf_counter() - self._started
+            DEPLOY_DURATION_SECONDS.observe(self.total, engine=self.engine, result=result)
+        return self.total
+
+    def as_dict(self) -> Dict[str, float]:
+        timings = {name: round(seconds, 3) for name, seconds in self.stages.items()}
+        if self.total is not None:
+            timings["total"] = round(self.total, 3)
+        return timings
@@ -0,0 +1,62 @@
+"""
+Overview Cache
+Short-lived per-user cache of the /metrics/overview response
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from ..metrics import registry
+from .ttl_cache import TTLCache
+
+OVERVIEW_CACHE = registry.counter(
+    "autostack_metrics_overview_cache_total",
+    "Metrics overview lookups by cache result",
+    ["result"],
+)
+
+
+class OverviewCache(TTLCache):
+    """
+    Keeps each user's metrics overview for ``ttl`` seconds. Dashboards poll
+    the overview far more often than it meaningfully changes, so most polls
+    need no aggregate query.
+
+    Heartbeats and metric ingests in this process call ``invalidate``. An
+    overview computed from a snapshot taken before the invalidation is
+    refused by ``put`` (pass the ``clock()`` reading taken before the query),
+    so a slow query cannot cache a result older than the latest heartbeat.
+    Ingests handled by other processes show up once the entry expires.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None, clock=time.monotonic):
+        super().__init__(
+            ttl=ttl if ttl is not None else float(os.getenv("METRICS_OVERVIEW_CACHE_TTL", "5")),
+            max_entries=max_entries or int(os.getenv("METRICS_OVERVIEW_CACHE_MAX_ENTRIES", "10000")),
+            counter=OVERVIEW_CACHE,
+            clock=clock,
+        )
+        self._invalidated: "OrderedDict[str, float]" = OrderedDict()
+
+    def put(self, user_id: str, overview, computed_at: float):
+        invalidated_at = self._invalidated.get(user_id)
+        if invalidated_at is not None and invalidated_at >= computed_at:
+            return
+        super().put(user_id, overview)
+
+    def invalidate(self, user_id: str):
+        super().invalidate(user_id)
+        # Only needed while an older query could still be running
+        self._invalidated[user_id] = self.clock()
+        self._invalidated.move_to_end(user_id)
+        while len(self._invalidated) > self.max_entries:
+            self._invalidated.popitem(last=False)
+
+    def clear(self):
+        super().clear()
+        self._invalidated.clear()
+
+
+# Global cache instance
+overview_cache = OverviewCache()
@@ -0,0 +1,114 @@
+"""
+Password Hashing Pool
+Runs argon2 hashing off the event loop on a bounded thread pool
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+import logging
+
+from passlib.context import CryptContext
+
+from ..metrics import registry
+
+logger = logging.getLogger(__name__)
+
+HASH_PENDING = registry.gauge(
+    "autostack_password_hash_pending",
+    "Password hash/verify calls queued or running on the hashing pool",
+)
+HASH_WAIT = registry.histogram(
+    "autostack_password_hash_wait_seconds",
+    "Time a password hash/verify call waited for a pool thread",
+    ["op"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+HASH_DURATION = registry.histogram(
+    "autostack_password_hash_duration_seconds",
+    "Time spent hashing or verifying a password on a pool thread",
+    ["op"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+HASH_REJECTED = registry.counter(
+    "autostack_password_hash_rejected_total",
+    "Password hash/verify calls refused because the pool queue was full",
+    ["op"],
+)
+
+
+class PasswordPoolBusy(Exception):
+    """The hashing pool already has ``max_pending`` calls queued or running"""
+
+
+class PasswordHasherPool:
+    """
+    Argon2 is deliberately CPU- and memory-heavy (tens of milliseconds per
+    call), so running it inline blocks the event loop for every other
+    request. Calls run here on ``max_workers`` threads instead; argon2-cffi
+    releases the GIL while hashing, so the loop keeps serving.
+
+    Admission control: at most ``max_pending`` calls may be queued or
+    running. Beyond that ``PasswordPoolBusy`` is raised immediately, so a
+    login storm is shed quickly instead of piling up unbounded latency.
+    """
+
+    def __init__(
+        self,
+        context: Optional[CryptContext] = None,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.context = context or CryptContext(schemes=["argon2"], deprecated="auto")
+        self.max_workers = max_workers or int(
+            os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        self.max_pending = max_pending or int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run("verify", self.context.verify, password, hashed)
+
+    async def _run(self, op: str, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            HASH_REJECTED.inc(op=op)
+            raise PasswordPoolBusy(f"{self.pending} password operations pending")
+
+        self.pending += 1
+        HASH_PENDING.set(self.pending)
+        queued_at = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            HASH_WAIT.observe(started - queued_at, op=op)
+            try:
+                return fn(*args)
+            finally:
+                HASH_DURATION.observe(time.perf_counter() - started, op=op)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), timed)
+        finally:
+            self.pending -= 1
+            HASH_PENDING.set(self.pending)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Global pool instance
+password_pool = PasswordHasherPool()
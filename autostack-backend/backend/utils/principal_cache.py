@@ -0,0 +1,54 @@
+"""
+Principal Cache
+Short-lived, size-bounded cache of authenticated users keyed by id and token version
+"""
+import os
+import time
+from typing import Optional
+
+from ..metrics import registry
+from .ttl_cache import TTLCache
+
+PRINCIPAL_CACHE = registry.counter(
+    "autostack_auth_principal_cache_total",
+    "JWT principal lookups by cache result",
+    ["result"],
+)
+
+
+class PrincipalCache(TTLCache):
+    """
+    Maps a user id to the user loaded for it and the ``token_version`` it
+    had, so an authenticated request whose token carries that version needs
+    no database query.
+
+    Entries live for ``ttl`` seconds, which bounds how long another API
+    process can serve a principal after it changed; changes made in this
+    process call ``invalidate`` and take effect immediately. At most
+    ``max_entries`` users are kept, least recently used evicted first.
+
+    Cached users are detached from any session and shared between
+    requests, so callers must treat them as read-only.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None, clock=time.monotonic):
+        super().__init__(
+            ttl=ttl if ttl is not None else float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30")),
+            max_entries=max_entries or int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+            counter=PRINCIPAL_CACHE,
+            clock=clock,
+        )
+
+    def get(self, user_id: str, token_version: int):
+        entry = super().get(user_id, is_current=lambda entry: entry[0] == token_version)
+        return entry[1] if entry else None
+
+    def put(self, user, token_version: int):
+        super().put(user.id, (token_version, user))
+
+    def invalidate(self, user_id: str):
+        super().invalidate(str(user_id))
+
+
+# Global cache instance
+principal_cache = PrincipalCache()
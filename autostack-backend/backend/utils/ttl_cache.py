@@ -0,0 +1,59 @@
+"""
+TTL Cache
+Size-bounded in-process cache whose entries expire after a fixed TTL
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Keeps each value for ``ttl`` seconds and at most ``max_entries`` values,
+    least recently used evicted first. A ``ttl`` of 0 or less disables it.
+
+    When given a ``counter`` with a ``result`` label, every ``get`` counts
+    one of hit, miss or stale (expired or rejected by ``is_current``).
+    """
+
+    def __init__(self, ttl: float, max_entries: int, counter=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.counter = counter
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: Hashable, is_current: Optional[Callable[[Any], bool]] = None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self._count("miss")
+            return None
+        value, expires_at = entry
+        if expires_at <= self.clock() or (is_current is not None and not is_current(value)):
+            del self._entries[key]
+            self._count("stale")
+            return None
+        self._entries.move_to_end(key)
+        self._count("hit")
+        return value
+
+    def put(self, key: Hashable, value):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (value, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _count(self, result: str):
+        if self.counter is not None:
+            self.counter.inc(result=result)
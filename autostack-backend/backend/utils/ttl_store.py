@@ -0,0 +1,144 @@
+"""
+TTL Store
+Small expiring key/counter store, in-process or shared through Redis
+"""
+import heapq
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryTTLStore:
+    """
+    Integer counters that expire, for a single process.
+
+    ``incr`` starts a key's TTL on its first increment and later increments
+    keep it, so a counter covers a fixed window. Expired keys are dropped on
+    access and, in expiry order, from a heap as other keys are written.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._data: Dict[str, Tuple[int, float]] = {}  # key -> (value, expires_at)
+        self._expiry: List[Tuple[float, str]] = []
+
+    async def incr(self, key: str, ttl: float) -> int:
+        now = self.clock()
+        entry = self._live(key, now)
+        if entry is None:
+            entry = (1, now + ttl)
+            heapq.heappush(self._expiry, (entry[1], key))
+        else:
+            entry = (entry[0] + 1, entry[1])
+        self._data[key] = entry
+        self._expire(now)
+        return entry[0]
+
+    async def set(self, key: str, value: int, ttl: float):
+        now = self.clock()
+        self._data[key] = (value, now + ttl)
+        heapq.heappush(self._expiry, (now + ttl, key))
+        self._expire(now)
+
+    async def get(self, key: str) -> Optional[int]:
+        entry = self._live(key, self.clock())
+        return entry[0] if entry else None
+
+    async def ttl(self, key: str) -> Optional[float]:
+        """Seconds until ``key`` expires, or None if it does not exist"""
+        now = self.clock()
+        entry = self._live(key, now)
+        return entry[1] - now if entry else None
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+    def _live(self, key: str, now: float) -> Optional[Tuple[int, float]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _expire(self, now: float):
+        # Heap entries can be stale (key re-set or deleted); only drop keys
+        # whose current expiry has actually passed
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._data[key]
+        if len(self._expiry) > 2 * len(self._data) + 64:
+            self._expiry = [(entry[1], key) for key, entry in self._data.items()]
+            heapq.heapify(self._expiry)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# KEYS[1] = counter key; ARGV[1] = TTL in milliseconds, set on first increment
+INCR_SCRIPT = """
+local value = redis.call('INCR', KEYS[1])
+if value == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[1])
+end
+return value
+"""
+
+
+class RedisTTLStore:
+    """
+    The same store shared by every API worker and pod through Redis, so
+    counters agree across processes. ``incr`` is one atomic script call.
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None, prefix: str = "ttl:"):
+        if client is None:
+            if not aioredis:
+                raise RuntimeError("redis not installed. Install with: pip install redis")
+            client = aioredis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+        self._incr = client.register_script(INCR_SCRIPT)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        return int(await self._incr(keys=[self.prefix + key], args=[math.ceil(ttl * 1000)]))
+
+    async def set(self, key: str, value: int, ttl: float):
+        await self.client.set(self.prefix + key, value, px=math.ceil(ttl * 1000))
+
+    async def get(self, key: str) -> Optional[int]:
+        value = await self.client.get(self.prefix + key)
+        return int(value) if value is not None else None
+
+    async def ttl(self, key: str) -> Optional[float]:
+        remaining = await self.client.pttl(self.prefix + key)
+        return remaining / 1000 if remaining is not None and remaining >= 0 else None
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+
+def create_ttl_store(prefix: str = "ttl:"):
+    """
+    Use Redis when TTL_STORE_REDIS_URL (or RATE_LIMIT_REDIS_URL) is set,
+    otherwise keep state in this process
+    """
+    url = os.getenv("TTL_STORE_REDIS_URL") or os.getenv("RATE_LIMIT_REDIS_URL")
+    if url:
+        try:
+            return RedisTTLStore(url=url, prefix=prefix)
+        except RuntimeError as e:
+            logger.error(f"{e}; falling back to in-process TTL store")
+    return InMemoryTTLStore()
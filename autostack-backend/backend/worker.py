@@ -0,0 +1,130 @@
+"""
+Deploy worker pool for AutoStack
+Claims jobs from the deploy job queue and runs them with bounded concurrency
+
+Runs inside the API process when DEPLOY_WORKER_MODE=embedded (the default),
+or on its own with:
+
+    python -m backend.worker
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Dict, Optional
+
+from .services.job_queue import JobQueue, job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class DeployWorker:
+    """
+    Pulls deploy jobs with at most ``concurrency`` running at once.
+
+    Running jobs are heartbeated every ``stale_after / 3`` seconds; the same
+    tick recovers jobs abandoned by workers that died. On stop, in-flight
+    jobs are cancelled and handed back to the queue.
+    """
+
+    def __init__(
+        self,
+        queue: Optional[JobQueue] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue or job_queue
+        self.concurrency = max(1, concurrency if concurrency is not None else int(
+            os.getenv("DEPLOY_WORKER_CONCURRENCY", "4")
+        ))
+        self.poll_interval = poll_interval if poll_interval is not None else float(
+            os.getenv("DEPLOY_JOB_POLL_INTERVAL", "2")
+        )
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._running: Dict[str, asyncio.Task] = {}
+        self._tasks = []
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._claim_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+        logger.info(f"Deploy worker {self.worker_id} started (concurrency {self.concurrency})")
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        in_flight = dict(self._running)
+        for task in in_flight.values():
+            task.cancel()
+        await asyncio.gather(*in_flight.values(), return_exceptions=True)
+        try:
+            await self.queue.release(self.worker_id, in_flight.keys())
+        except Exception as e:
+            logger.error(f"Failed to release deploy jobs on shutdown: {e}")
+        logger.info(f"Deploy worker {self.worker_id} stopped, released {len(in_flight)} jobs")
+
+    async def _claim_loop(self):
+        while not self._stopping:
+            await self._slots.acquire()
+            try:
+                job = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Failed to claim deploy job: {e}")
+                job = None
+
+            if job is None:
+                self._slots.release()
+                await self.queue.wait_for_work(self.poll_interval)
+                continue
+
+            logger.info(f"Worker {self.worker_id} running {job.kind} job {job.id} (attempt {job.attempts})")
+            task = asyncio.create_task(self.queue.run(job))
+            self._running[job.id] = task
+            task.add_done_callback(lambda _, job_id=job.id: self._finished(job_id))
+
+    def _finished(self, job_id: str):
+        self._running.pop(job_id, None)
+        self._slots.release()
+
+    async def _heartbeat_loop(self):
+        interval = max(1.0, self.queue.stale_after / 3)
+        while not self._stopping:
+            try:
+                await self.queue.heartbeat(self.worker_id, list(self._running))
+                await self.queue.requeue_stale()
+            except Exception as e:
+                logger.error(f"Deploy worker heartbeat failed: {e}")
+            await asyncio.sleep(interval)
+
+
+async def main():
+    # Importing the app registers every job handler
+    from . import main as _app  # noqa: F401
+
+    worker = DeployWorker()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await worker.start()
+    await stop.wait()
+    await worker.stop()
+    await _app.flush_deploy_logs()
+    await _app.close_k8s_engine()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
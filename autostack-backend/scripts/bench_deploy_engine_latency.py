@@ -0,0 +1,158 @@
+"""Benchmark API latency while DeployEngine builds are in flight.
+
+Runs a small FastAPI app in-process and measures /health p50/p99 latency
+in three phases:
+
+1. idle            - no builds running
+2. blocking builds - builds iterate the Docker SDK on the event loop
+                     (how build_and_deploy used to behave)
+3. engine builds   - builds go through DeployEngine's executor pipeline
+
+Docker is replaced with a fake client whose build emits output lines with a
+blocking sleep between them, so the numbers isolate event-loop behaviour.
+
+Usage:
+    python scripts/bench_deploy_engine_latency.py --builds 8 --requests 400
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI
+
+from backend.deploy_engine import DeployEngine
+
+
+class FakeDockerAPI:
+    """Low-level API stand-in: a build that blocks its thread between lines."""
+
+    def __init__(self, lines: int, line_delay: float):
+        self.lines = lines
+        self.line_delay = line_delay
+
+    def build(self, path, tag, **kwargs):
+        for i in range(self.lines):
+            time.sleep(self.line_delay)
+            yield {"stream": f"Step {i + 1}/{self.lines} : RUN something\n"}
+        yield {"aux": {"ID": f"sha256:{tag}"}}
+
+
+class FakeDockerClient:
+    def __init__(self, lines: int, line_delay: float):
+        self.api = FakeDockerAPI(lines, line_delay)
+        self.images = SimpleNamespace(get=lambda tag: SimpleNamespace(id=f"sha256:{tag}"))
+        self.containers = SimpleNamespace(
+            run=lambda **kwargs: SimpleNamespace(id=f"container-{kwargs['name']}")
+        )
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+async def measure_latency(client: httpx.AsyncClient, requests: int, interval: float = 0.005) -> list[float]:
+    """
+    Fire /health requests on a fixed schedule and return latencies in ms.
+
+    Latency is measured from the time each request was *due*, so a stalled
+    event loop shows up as latency instead of silently delaying the probe.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for i in range(requests):
+        due = start + i * interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        response = await client.get("/health")
+        latencies.append((time.perf_counter() - due) * 1000)
+        assert response.status_code == 200
+    return latencies
+
+
+def summarize(name: str, latencies: list[float]):
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<16} p50={p50:8.2f} ms   p99={p99:8.2f} ms   max={ordered[-1]:8.2f} ms")
+
+
+async def blocking_build(fake: FakeDockerClient, tag: str):
+    """Legacy behaviour: the SDK generator is consumed on the event loop."""
+    for _ in fake.api.build(path=".", tag=tag):
+        pass
+    await asyncio.sleep(0)
+
+
+async def run(args):
+    app = make_app()
+    transport = httpx.ASGITransport(app=app)
+    fake = FakeDockerClient(args.lines, args.line_delay)
+
+    engine = DeployEngine()
+    engine.docker_client = fake
+
+    workdir = Path(engine.workspace_base) / "bench-context"
+    workdir.mkdir(parents=True, exist_ok=True)
+    (workdir / "index.html").write_text("<h1>bench</h1>")
+
+    print("=" * 60)
+    print("DeployEngine API latency benchmark")
+    print(f"builds={args.builds} concurrency_cap={engine.build_concurrency} "
+          f"requests={args.requests}")
+    print("=" * 60)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        summarize("idle", await measure_latency(client, args.requests))
+
+        builds = [
+            asyncio.create_task(blocking_build(fake, f"blocking-{i}"))
+            for i in range(args.builds)
+        ]
+        summarize("blocking builds", await measure_latency(client, args.requests))
+        await asyncio.gather(*builds)
+
+        lines_seen = 0
+
+        async def on_line(line: str):
+            nonlocal lines_seen
+            lines_seen += 1
+
+        builds = [
+            asyncio.create_task(
+                engine.build_and_deploy(str(workdir), f"bench-{i}", "static", log_callback=on_line)
+            )
+            for i in range(args.builds)
+        ]
+        summarize("engine builds", await measure_latency(client, args.requests))
+        results = await asyncio.gather(*builds)
+
+    ok = sum(1 for success, _, _ in results if success)
+    print(f"\nengine builds succeeded: {ok}/{args.builds}, streamed lines: {lines_seen}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--builds", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--line-delay", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
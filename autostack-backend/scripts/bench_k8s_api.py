@@ -0,0 +1,157 @@
+"""Benchmark Kubernetes orchestration overhead against a mock API server.
+
+Starts a minimal HTTP/1.1 API server on localhost that charges a fixed cost
+per new connection (standing in for TLS + auth handshakes) and per request,
+then applies the manifests from K8sDeployEngine._create_k8s_manifests for a
+number of deploys in three ways:
+
+1. fresh connection - a new client per call, as each kubectl invocation did
+2. pooled           - one KubernetesAPI client, manifests applied one by one
+3. pooled batch     - one KubernetesAPI client, KubernetesAPI.apply_many
+
+With --kubectl, also times bare ``kubectl version --client`` process spawns
+when kubectl is installed, as a lower bound for the old per-call fork cost.
+
+Usage:
+    python scripts/bench_k8s_api.py --deploys 50 --connect-cost 30
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+from backend.k8s_api import KubernetesAPI
+from backend.k8s_deploy_engine import K8sDeployEngine
+
+
+class MockAPIServer:
+    """Echoes server-side apply PATCHes; keeps connections alive"""
+
+    def __init__(self, connect_cost: float, request_cost: float):
+        self.connect_cost = connect_cost
+        self.request_cost = request_cost
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.connect_cost)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = await reader.readexactly(length) if length else b"{}"
+                self.requests += 1
+                await asyncio.sleep(self.request_cost)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+def summarize(name: str, per_deploy_ms: list[float], server: MockAPIServer):
+    print(
+        f"{name:<17} mean={statistics.mean(per_deploy_ms):8.2f} ms   "
+        f"p50={statistics.median(per_deploy_ms):8.2f} ms   "
+        f"connections={server.connections:<5} requests={server.requests}"
+    )
+    server.connections = server.requests = 0
+
+
+async def run(args):
+    server = MockAPIServer(args.connect_cost / 1000, args.request_cost / 1000)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    base_url = f"http://127.0.0.1:{listener.sockets[0].getsockname()[1]}"
+
+    engine = K8sDeployEngine()
+    manifests = [
+        engine._create_k8s_manifests(f"app-{i}", f"registry/app-{i}:1", "user-1", "https://github.com/x/app", "static")
+        for i in range(args.deploys)
+    ]
+
+    print("=" * 72)
+    print("Kubernetes API orchestration benchmark")
+    print(f"deploys={args.deploys} manifests/deploy={len(manifests[0])} "
+          f"connect_cost={args.connect_cost}ms request_cost={args.request_cost}ms")
+    print("=" * 72)
+
+    # 1. New client (connection + handshake) for every call
+    timings = []
+    for objs in manifests:
+        start = time.perf_counter()
+        for obj in objs:
+            async with httpx.AsyncClient(base_url=base_url) as client:
+                await KubernetesAPI(client).apply(obj)
+        timings.append((time.perf_counter() - start) * 1000)
+    summarize("fresh connection", timings, server)
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        api = KubernetesAPI(client)
+
+        # 2. Pooled client, one object at a time
+        timings = []
+        for objs in manifests:
+            start = time.perf_counter()
+            for obj in objs:
+                await api.apply(obj)
+            timings.append((time.perf_counter() - start) * 1000)
+        summarize("pooled", timings, server)
+
+        # 3. Pooled client, batched apply
+        timings = []
+        for objs in manifests:
+            start = time.perf_counter()
+            await api.apply_many(objs)
+            timings.append((time.perf_counter() - start) * 1000)
+        summarize("pooled batch", timings, server)
+
+    listener.close()
+    await listener.wait_closed()
+
+    if args.kubectl:
+        kubectl = shutil.which("kubectl")
+        if not kubectl:
+            print("\nkubectl not found; skipping process spawn timing")
+            return
+        timings = []
+        for _ in range(min(args.deploys, 20)):
+            start = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(
+                kubectl, "version", "--client", "-o", "json",
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+            )
+            await proc.wait()
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"\nkubectl spawn     mean={statistics.mean(timings):8.2f} ms per call "
+              f"(x{len(manifests[0])} calls per deploy, before any network I/O)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deploys", type=int, default=50)
+    parser.add_argument("--connect-cost", type=float, default=30.0, help="ms per new connection")
+    parser.add_argument("--request-cost", type=float, default=2.0, help="ms per request")
+    parser.add_argument("--kubectl", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Benchmark /health throughput through the API middleware stack.
+
+Compares, on an app with only a /health route:
+
+1. none    - no middleware, the ceiling
+2. legacy  - the four stacked BaseHTTPMiddleware layers main.py used to add
+             (CORS, rate limit, account lockout, error handling)
+3. edge    - the single pure-ASGI EdgeMiddleware
+
+Requests are driven straight through the ASGI interface (no sockets), with
+``--concurrency`` requests in flight, so the numbers isolate middleware cost.
+Rate limits are set high enough that nothing is rejected.
+
+Usage:
+    python scripts/bench_middleware.py --requests 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from backend.middleware.edge import EdgeMiddleware
+from backend.middleware.limiter import InMemoryRateLimiter
+
+LIMITS = {"default": (10 ** 9, 60)}
+
+
+# ---- legacy stack, condensed from the removed middleware modules ----
+
+def is_allowed_origin(origin: str) -> bool:
+    return bool(origin) and bool(re.match(r'^https?://(localhost|127\.0\.0\.1|frontend)(:\d+)?$', origin))
+
+
+class LegacyCORS(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        origin = request.headers.get("origin")
+        response = await call_next(request)
+        if origin and is_allowed_origin(origin):
+            response.headers["Access-Control-Allow-Origin"] = origin
+            response.headers["Access-Control-Allow-Credentials"] = "true"
+        return response
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.requests = {}
+
+    async def dispatch(self, request: Request, call_next):
+        ip = request.client.host if request.client else "unknown"
+        key = f"{ip}:{request.url.path}"
+        now = time.time()
+        self.requests[key] = [t for t in self.requests.get(key, []) if now - t < 60]
+        self.requests[key].append(now)
+        # Keep the list short so only middleware overhead is measured
+        del self.requests[key][:-10]
+        return await call_next(request)
+
+
+class LegacyLockout(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        return await call_next(request)
+
+
+class LegacyErrors(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+
+
+def make_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "autostack-api"}
+
+    if stack == "legacy":
+        app.add_middleware(LegacyCORS)
+        app.add_middleware(LegacyRateLimit)
+        app.add_middleware(LegacyLockout)
+        app.add_middleware(LegacyErrors)
+    elif stack == "edge":
+        app.add_middleware(EdgeMiddleware, limiter=InMemoryRateLimiter(), limits=LIMITS)
+    return app
+
+
+async def call(app, scope: dict):
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(dict(scope), receive, send)
+    assert status == 200, status
+
+
+async def measure(stack: str, requests: int, concurrency: int) -> float:
+    app = make_app(stack)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/health", "raw_path": b"/health",
+        "query_string": b"", "root_path": "", "client": ("10.0.0.1", 5000), "server": ("bench", 80),
+        "headers": [(b"host", b"bench"), (b"origin", b"http://localhost:3000")],
+    }
+    await call(app, scope)  # build the middleware stack outside the timing
+
+    remaining = requests
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await call(app, scope)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run(args):
+    print("=" * 60)
+    print("Middleware stack throughput on /health")
+    print(f"requests={args.requests} concurrency={args.concurrency}")
+    print("=" * 60)
+
+    results = {}
+    for stack in ("none", "legacy", "edge"):
+        results[stack] = await measure(stack, args.requests, args.concurrency)
+        print(f"{stack:<8} {results[stack]:10.0f} req/s")
+    print(f"edge vs legacy: {results['edge'] / results['legacy']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
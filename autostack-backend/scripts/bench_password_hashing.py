@@ -0,0 +1,97 @@
+"""Benchmark event-loop lag during a login burst.
+
+Fires ``--logins`` concurrent argon2 password verifications (what /login does
+for each request) while a probe task measures how late the event loop wakes
+it up every ``--probe-ms``. Compares:
+
+1. inline - pwd_context.verify called directly in the coroutine (before)
+2. pool   - PasswordHasherPool with admission control (after)
+
+Loop lag is what every other endpoint experiences while the burst runs.
+
+Usage:
+    python scripts/bench_password_hashing.py --logins 50 --workers 4 --max-pending 32
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from passlib.context import CryptContext
+
+from backend.utils.password_pool import PasswordHasherPool, PasswordPoolBusy
+
+
+async def probe(stop: asyncio.Event, interval: float, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def burst(name: str, verify, logins: int, interval: float):
+    lags: list = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(stop, interval, lags))
+    await asyncio.sleep(interval * 2)
+
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        try:
+            assert await verify()
+        except PasswordPoolBusy:
+            rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+
+    served = logins - rejected
+    print(
+        f"{name:<7} lag p50 {statistics.median(lags) * 1000:7.1f}ms  "
+        f"p99 {percentile(lags, 99) * 1000:7.1f}ms  max {max(lags) * 1000:7.1f}ms  "
+        f"| {served / elapsed:6.1f} logins/s  rejected {rejected}"
+    )
+
+
+async def run(args):
+    context = CryptContext(schemes=["argon2"], deprecated="auto")
+    hashed = context.hash("correct horse battery staple")
+    interval = args.probe_ms / 1000
+
+    print("=" * 72)
+    print("Event-loop lag during a login burst (argon2 verify)")
+    print(f"logins={args.logins} workers={args.workers} max_pending={args.max_pending} probe={args.probe_ms}ms")
+    print("=" * 72)
+
+    async def inline():
+        return context.verify("correct horse battery staple", hashed)
+
+    await burst("inline", inline, args.logins, interval)
+
+    pool = PasswordHasherPool(context, max_workers=args.workers, max_pending=args.max_pending)
+    await burst("pool", lambda: pool.verify("correct horse battery staple", hashed), args.logins, interval)
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=32)
+    parser.add_argument("--probe-ms", type=float, default=5)
+    asyncio.run(run(parser.parse_args()))
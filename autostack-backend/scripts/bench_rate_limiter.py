@@ -0,0 +1,150 @@
+"""Benchmark per-request rate limiter cost at many distinct client IPs.
+
+Compares three implementations on the same traffic: ``--ips`` distinct
+keys, each already holding ``--fill`` requests inside the window, then one
+timed request per key per round:
+
+1. legacy sliding window - list of timestamps per key, rebuilt every request
+                           (how RateLimitMiddleware used to behave)
+2. GCRA in-memory        - InMemoryRateLimiter, one float per key
+3. GCRA redis            - RedisRateLimiter against fakeredis (needs lupa);
+                           shows script overhead only, no network round trip
+
+Reported: mean microseconds per check and memory per key. Legacy cost and
+memory grow with requests in the window (up to the limit); GCRA stays flat.
+
+It first times route-to-limit matching against the number of configured
+rules: the old prefix scan versus RouteLimitMatcher's trie.
+
+Usage:
+    python scripts/bench_rate_limiter.py --ips 10000 --fill 10 100 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.middleware.limiter import InMemoryRateLimiter, RedisRateLimiter
+from backend.middleware.routes import RouteLimitMatcher
+
+
+class LegacySlidingWindow:
+    """The old per-process algorithm: keep every timestamp inside the window."""
+
+    def __init__(self):
+        self.requests = {}
+
+    def warm(self, keys: list, fill: int):
+        # Same state ``fill`` hits would leave, without O(fill^2) setup time
+        now = time.time()
+        for key in keys:
+            self.requests[key] = [now - i * 0.001 for i in range(fill)]
+
+    async def hit(self, key: str, limit: int, window: float) -> bool:
+        now = time.time()
+        timestamps = [t for t in self.requests.get(key, []) if now - t < window]
+        if len(timestamps) >= limit:
+            self.requests[key] = timestamps
+            return False
+        timestamps.append(now)
+        self.requests[key] = timestamps
+        return True
+
+
+def make_keys(ips: int) -> list:
+    return [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:/api/projects" for i in range(ips)]
+
+
+async def measure(name: str, limiter, keys: list, fill: int, limit: int = 1000, rounds: int = 3):
+    """
+    Warm every key with ``fill`` requests inside the window (untimed), then
+    time further rounds of one request per key.
+    """
+    tracemalloc.start()
+    if hasattr(limiter, "warm"):
+        limiter.warm(keys, fill)
+    else:
+        for _ in range(fill):
+            for key in keys:
+                await limiter.hit(key, limit, 60)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            await limiter.hit(key, limit, 60)
+    micros = (time.perf_counter() - start) / (len(keys) * rounds) * 1e6
+    print(f"{name:<22} in-window={fill:<5} {micros:8.2f} us/check   {current / len(keys):8.0f} B/key")
+
+
+def legacy_get_limit(limits: dict, path: str):
+    """The old matcher: exact lookup, then a startswith scan over every rule."""
+    if path in limits:
+        return limits[path]
+    for limit_path, value in limits.items():
+        if limit_path != "default" and path.startswith(limit_path):
+            return value
+    return limits["default"]
+
+
+def bench_route_matching(counts=(10, 100, 1000), lookups: int = 20000):
+    print("-" * 60)
+    print("Route -> limit matching")
+    for count in counts:
+        limits = {f"/api/service-{i}/items": (100, 60) for i in range(count)}
+        limits["default"] = (100, 60)
+        routes = [f"/api/service-{i}/items/{{item_id}}" for i in range(count)]
+        matcher = RouteLimitMatcher(limits, routes)
+        # Worst case for the scan: a path only the default rule covers
+        paths = [f"/api/projects/{i}" for i in range(lookups)]
+
+        start = time.perf_counter()
+        for path in paths:
+            legacy_get_limit(limits, path)
+        legacy = (time.perf_counter() - start) / lookups * 1e6
+
+        start = time.perf_counter()
+        for path in paths:
+            matcher.match(path)
+        trie = (time.perf_counter() - start) / lookups * 1e6
+        print(f"rules={count:<5} legacy scan {legacy:8.2f} us   trie {trie:6.2f} us")
+
+
+async def run(args):
+    print("=" * 60)
+    print("Rate limiter benchmark")
+    print("=" * 60)
+    bench_route_matching()
+    keys = make_keys(args.ips)
+    print("-" * 60)
+    print(f"Limiter checks, ips={args.ips} limit=1000/60s")
+
+    for fill in args.fill:
+        await measure("legacy sliding window", LegacySlidingWindow(), keys, fill)
+        await measure("gcra in-memory", InMemoryRateLimiter(max_keys=args.ips * 2), keys, fill)
+
+    try:
+        import fakeredis
+        import lupa  # noqa: F401
+    except ImportError:
+        print("gcra redis             skipped (pip install fakeredis lupa)")
+        return
+
+    # fakeredis is slow per call; a hundredth of the keys is enough to show the trend
+    for fill in args.fill:
+        store = fakeredis.FakeAsyncRedis()
+        await measure("gcra redis (fake)", RedisRateLimiter(client=store), keys[: max(1, args.ips // 100)], fill)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ips", type=int, default=10000)
+    parser.add_argument("--fill", type=int, nargs="+", default=[10, 100, 500],
+                        help="requests already in the window per key before timing")
+    asyncio.run(run(parser.parse_args()))
@@ -32,6 +32,22 @@ def event_loop():
     loop.close()
 
 
+class FakeClock:
+    """Monotonic clock for tests; advance it by adding to ``now``."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    """Create a clock that only moves when the test moves it."""
+    return FakeClock()
+
+
 @pytest.fixture(scope="function")
 async def db_session() -> AsyncGenerator[AsyncSession, None]:
     """Create a fresh database session for each test."""
@@ -0,0 +1,42 @@
+"""
+Tests for the agent liveness sweeper
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from backend import crud
+from backend.models import Agent, Alert, User
+
+
+@pytest.mark.asyncio
+async def test_stale_agents_go_offline_once_with_an_alert(db_session):
+    """Test only stale online agents move, each raising a single alert"""
+    user = User(email="sweeper@example.com", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+    now = datetime.utcnow()
+    db_session.add_all([
+        Agent(name="fresh", host="a", ip="10.0.0.1", user_id=user.id, status="online", last_heartbeat=now),
+        Agent(name="stale", host="b", ip="10.0.0.2", user_id=user.id, status="online",
+              last_heartbeat=now - timedelta(hours=1)),
+        Agent(name="gone", host="c", ip="10.0.0.3", user_id=user.id, status="offline",
+              last_heartbeat=now - timedelta(days=1)),
+    ])
+    await db_session.commit()
+
+    cutoff = now - timedelta(minutes=15)
+    stale = await crud.mark_stale_agents_offline(db_session, cutoff=cutoff)
+    assert [name for _, _, name in stale] == ["stale"]
+    assert await crud.mark_stale_agents_offline(db_session, cutoff=cutoff) == []
+
+    statuses = {
+        a.name: a.status
+        for a in (await db_session.execute(select(Agent).execution_options(populate_existing=True))).scalars()
+    }
+    assert statuses == {"fresh": "online", "stale": "offline", "gone": "offline"}
+    alerts = (await db_session.execute(select(Alert))).scalars().all()
+    assert [(a.user_id, a.source, a.resolved) for a in alerts] == [(user.id, f"agent:{stale[0][0]}", False)]
+    assert (await crud.get_metrics_overview(db_session, user))["active_agents"] == 1
@@ -0,0 +1,56 @@
+"""
+Tests for API key resolution and write-behind last_used tracking
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud
+from backend.models import APIKey, User
+from backend.services.api_key_usage import ApiKeyUsageBuffer
+
+
+async def _keys(db_session, *names):
+    user = User(email="apikeys@example.com", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+    keys = [APIKey(user_id=user.id, name=name, key_hash=f"hash-{name}") for name in names]
+    db_session.add_all(keys)
+    await db_session.commit()
+    return user, keys
+
+
+@pytest.mark.asyncio
+async def test_api_key_resolves_to_user_in_one_query(db_session):
+    """Test a key hash maps to its id and owner, and unknown hashes to None"""
+    user, (key,) = await _keys(db_session, "agent")
+
+    key_id, owner = await crud.get_api_key_user(db_session, "hash-agent")
+    assert key_id == key.id
+    assert owner.id == user.id
+    assert await crud.get_api_key_user(db_session, "hash-missing") is None
+
+
+@pytest.mark.asyncio
+async def test_usage_is_coalesced_into_one_write_per_key(db_session):
+    """Test many uses between flushes write only the latest timestamp per key"""
+    _, (agent, ci) = await _keys(db_session, "agent", "ci")
+    factory = sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    usage = ApiKeyUsageBuffer(session_factory=factory, flush_interval=3600)
+
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(100):
+        usage.record(agent.id, start + timedelta(seconds=i))
+    usage.record(ci.id, start)
+
+    assert await usage.flush() == 2
+    assert await usage.flush() == 0
+    await usage.stop()
+
+    async with factory() as session:
+        rows = dict((await session.execute(select(APIKey.name, APIKey.last_used))).all())
+    assert rows == {"agent": start + timedelta(seconds=99), "ci": start}
@@ -0,0 +1,51 @@
+"""
+Tests for incrementally maintained budget spend
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from backend.models import BudgetAlert, CostSnapshot, Project, User
+from backend.services.budget_service import budget_service
+from backend.services.cost_service import cost_service
+
+
+@pytest.mark.asyncio
+async def test_snapshots_add_to_spend_and_status_is_a_single_read(db_session):
+    """Test spend follows new snapshots, reads do not write, and period ends reset it"""
+    user = User(email="budget@example.com", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+    project = Project(user_id=user.id, name="api", slug="api", github_repo="https://github.com/acme/api")
+    db_session.add(project)
+    await db_session.commit()
+
+    # Spend already recorded this month counts from the start
+    db_session.add(CostSnapshot(project_id=project.id, user_id=user.id, total_cost=4.0, cloud_provider="aws"))
+    await db_session.commit()
+    budget = await budget_service.create_budget_alert(db_session, project.id, user.id, budget_limit=10.0)
+    assert budget.current_spend == 4.0
+
+    for cost in (3.0, 5.0):
+        await cost_service.create_cost_snapshot(db_session, project.id, user.id, {"total_cost": cost})
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        status = await budget_service.get_budget_status(db_session, project.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1 and statements[0].lstrip().upper().startswith("SELECT")
+    assert (status["current_spend"], status["is_exceeded"], status["status"]) == (12.0, True, "exceeded")
+
+    # Nothing happens mid-period; next month the budget starts over
+    assert await budget_service.reset_budget_periods(db_session) == 0
+    next_month = (datetime.utcnow().replace(day=1) + timedelta(days=32)).replace(day=2)
+    assert await budget_service.reset_budget_periods(db_session, now=next_month) == 1
+    await db_session.refresh(budget)
+    assert (budget.current_spend, budget.is_exceeded) == (0.0, False)
+    assert budget.period_start == next_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
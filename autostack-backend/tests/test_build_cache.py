@@ -0,0 +1,58 @@
+"""
+Tests for build-context fingerprints and image reuse
+"""
+
+import git
+import pytest
+
+from backend.build_cache import BUILD_CACHE_LOOKUPS, compute_fingerprint, lookup_image
+
+DOCKERFILE = "FROM nginx:alpine\nCOPY . /usr/share/nginx/html\n"
+
+
+def _repo(path, content: str) -> str:
+    repo = git.Repo.init(path, initial_branch="main")
+    (path / "index.html").write_text(content)
+    repo.index.add(["index.html"])
+    repo.index.commit("init", author=git.Actor("t", "t@example.com"))
+    return str(path)
+
+
+def test_fingerprint_tracks_content_and_dockerfile(tmp_path):
+    """Test identical trees match and any content or Dockerfile change does not"""
+    a = _repo(tmp_path / "a", "<h1>hi</h1>")
+    b = _repo(tmp_path / "b", "<h1>hi</h1>")
+    c = _repo(tmp_path / "c", "<h1>bye</h1>")
+
+    assert compute_fingerprint(a, DOCKERFILE) == compute_fingerprint(b, DOCKERFILE)
+    assert compute_fingerprint(a, DOCKERFILE) != compute_fingerprint(c, DOCKERFILE)
+    assert compute_fingerprint(a, DOCKERFILE) != compute_fingerprint(a, DOCKERFILE + "EXPOSE 80\n")
+
+
+def test_fingerprint_without_git(tmp_path):
+    """Test plain directories fall back to hashing file contents"""
+    (tmp_path / "app.py").write_text("print('v1')")
+    first = compute_fingerprint(str(tmp_path), DOCKERFILE)
+    (tmp_path / "app.py").write_text("print('v2')")
+    assert compute_fingerprint(str(tmp_path), DOCKERFILE) != first
+
+
+@pytest.mark.asyncio
+async def test_lookup_records_hits_misses_and_stale_images():
+    """Test lookups return reusable refs and count each outcome"""
+    images = {"fp-known": "registry/app:abc", "fp-gone": "registry/app:old"}
+
+    async def image_lookup(fingerprint):
+        return images.get(fingerprint)
+
+    async def verify(image_ref):
+        return image_ref != "registry/app:old"
+
+    before = {r: BUILD_CACHE_LOOKUPS.value(engine="test", result=r) for r in ("hit", "miss", "stale")}
+
+    assert await lookup_image(image_lookup, "fp-known", "test", verify) == "registry/app:abc"
+    assert await lookup_image(image_lookup, "fp-new", "test", verify) is None
+    assert await lookup_image(image_lookup, "fp-gone", "test", verify) is None
+
+    for result in ("hit", "miss", "stale"):
+        assert BUILD_CACHE_LOOKUPS.value(engine="test", result=result) == before[result] + 1
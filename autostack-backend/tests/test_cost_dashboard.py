@@ -0,0 +1,88 @@
+"""
+Tests for the set-based cost dashboard queries
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+from backend.ml.cost_predictor import cost_predictor
+from backend.models import BudgetAlert, CostPrediction, CostSnapshot, Project, User
+from backend.routers.costs import get_cost_dashboard
+from backend.services.budget_service import budget_service
+from backend.services.cost_service import cost_service
+
+
+async def _projects(db_session):
+    user = User(email="costs@example.com", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+    projects = [
+        Project(user_id=user.id, name=name, slug=name, github_repo=f"https://github.com/acme/{name}")
+        for name in ("api", "web", "docs")
+    ]
+    db_session.add_all(projects)
+    await db_session.commit()
+    return user, projects
+
+
+@pytest.mark.asyncio
+async def test_dashboard_matches_per_project_results_in_constant_queries(db_session):
+    """Test grouped summaries, predictions and budgets match the per-project path without writing"""
+    user, (api, web, docs) = await _projects(db_session)
+    now = datetime.utcnow()
+    snapshot = lambda project, cost, days: CostSnapshot(
+        project_id=project.id, user_id=user.id, total_cost=cost, cloud_provider="aws",
+        timestamp=now - timedelta(days=days, minutes=1),
+    )
+    # Newest first: 10, 10, then older 1, 1, 1
+    db_session.add_all([snapshot(api, cost, days) for cost, days in ((10, 1), (10, 2), (1, 3), (1, 4), (1, 5))])
+    db_session.add_all([snapshot(web, 5.0, 1), snapshot(web, 99.0, 60)])
+    prediction = lambda project, cost, age: CostPrediction(
+        project_id=project.id, user_id=user.id, predicted_daily_cost=cost / 30, predicted_monthly_cost=cost,
+        predicted_yearly_cost=cost * 12, confidence_score=0.9, model_version="test",
+        prediction_date=now, days_of_data_used=30, created_at=now - timedelta(hours=age),
+    )
+    db_session.add_all([prediction(api, 300.0, 1), prediction(api, 100.0, 5), prediction(web, 50.0, 1)])
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    db_session.add_all([
+        BudgetAlert(project_id=api.id, user_id=user.id, budget_limit=20.0, budget_period="weekly",
+                    current_spend=23.0, period_start=today - timedelta(days=today.weekday())),
+        BudgetAlert(project_id=web.id, user_id=user.id, budget_limit=100.0, budget_period="daily",
+                    current_spend=5.0, period_start=today - timedelta(days=1)),
+    ])
+    await db_session.commit()
+    ids = [api.id, web.id, docs.id]
+
+    summaries = await cost_service.calculate_cost_summaries(db_session, ids, "month")
+    for project_id in ids:
+        single = await cost_service.calculate_cost_summary(db_session, project_id, "month")
+        assert summaries.get(project_id, single) == single
+    assert (summaries[api.id]["total_cost"], summaries[api.id]["trend"]) == (23.0, "increasing")
+    assert docs.id not in summaries
+
+    predictions = await cost_predictor.get_latest_predictions(db_session, ids)
+    assert {p: pred.predicted_monthly_cost for p, pred in predictions.items()} == {api.id: 300.0, web.id: 50.0}
+
+    statuses = await budget_service.get_budget_statuses(db_session, ids)
+    assert (statuses[api.id]["status"], statuses[api.id]["current_spend"]) == ("exceeded", 23.0)
+    # Yesterday's spend does not count once the day is over, even before the reset
+    assert (statuses[web.id]["status"], statuses[web.id]["current_spend"]) == ("ok", 0.0)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        dashboard = await get_cost_dashboard(db=db_session, current_user=user)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 4
+    assert not any(s.lstrip().upper().startswith(("UPDATE", "INSERT")) for s in statements)
+    assert dashboard["total_monthly_cost"] == 28.0
+    assert dashboard["total_predicted_monthly_cost"] == 350.0
+    assert dashboard["active_alerts"] == 1
+    budgets = (await db_session.execute(select(BudgetAlert))).scalars().all()
+    assert {b.current_spend for b in budgets} == {23.0, 5.0}
@@ -0,0 +1,169 @@
+"""
+Tests for append-only deploy log storage
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud
+from backend.models import DeploymentLog, User
+from backend.services.deploy_log_service import DeployLogService
+
+
+def _session_factory(db_session):
+    return sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _create_deploy(db_session):
+    user = User(email="logs@example.com", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+    return await crud.create_deploy(
+        db_session,
+        user=user,
+        deploy_id="deploy-logs-1",
+        repo="https://github.com/example/repo",
+        branch="main",
+        environment="dev",
+    )
+
+
+@pytest.mark.asyncio
+async def test_lines_are_batched_until_flush(db_session):
+    """Test lines are buffered and written in one batch"""
+    deploy = await _create_deploy(db_session)
+    service = DeployLogService(session_factory=_session_factory(db_session), flush_interval=60, flush_size=1000)
+
+    for i in range(5):
+        await service.append(deploy.id, f"line {i}")
+
+    count = await db_session.scalar(select(func.count()).select_from(DeploymentLog))
+    assert count == 0
+
+    assert await service.flush() == 5
+    count = await db_session.scalar(select(func.count()).select_from(DeploymentLog))
+    assert count == 5
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_read_pages_by_sequence_including_buffered(db_session):
+    """Test paginated reads see both flushed and buffered lines in order"""
+    deploy = await _create_deploy(db_session)
+    service = DeployLogService(session_factory=_session_factory(db_session), flush_interval=60, flush_size=3)
+
+    for i in range(7):
+        await service.append(deploy.id, f"line {i}")
+
+    first = await service.read(db_session, deploy.id, after_sequence=0, limit=4)
+    assert [e["sequence"] for e in first] == [1, 2, 3, 4]
+
+    rest = await service.read(db_session, deploy.id, after_sequence=first[-1]["sequence"])
+    assert [e["message"] for e in rest] == ["line 4", "line 5", "line 6"]
+
+    tail = await service.tail(db_session, deploy.id, lines=2)
+    assert [e["sequence"] for e in tail] == [6, 7]
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_finish_returns_full_text(db_session):
+    """Test finishing a deployment flushes and renders the snapshot"""
+    deploy = await _create_deploy(db_session)
+    service = DeployLogService(session_factory=_session_factory(db_session), flush_interval=60, flush_size=1000)
+
+    await service.append(deploy.id, "first")
+    await service.append(deploy.id, "second")
+
+    assert await service.finish(deploy.id) == "first\nsecond\n"
+
+    # A later run continues numbering after the stored lines
+    entry = await service.append(deploy.id, "third")
+    assert entry["sequence"] == 3
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_running_deploy_log_text_includes_buffered_lines(db_session, monkeypatch):
+    """Test status endpoints see lines of a running deploy before the snapshot exists"""
+    deploy = await _create_deploy(db_session)
+    service = DeployLogService(session_factory=_session_factory(db_session), flush_interval=60, flush_size=2)
+    monkeypatch.setattr(crud, "deploy_log_service", service)
+
+    for line in ("cloning", "building", "pushing"):
+        await service.append(deploy.id, line)
+
+    assert deploy.logs in (None, "")
+    assert await crud.get_deploy_log_text(db_session, deploy) == "cloning\nbuilding\npushing\n"
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_rejected_line_is_dropped_without_blocking_the_batch(db_session):
+    """Test a line violating a constraint is isolated and the rest are written"""
+    deploy = await _create_deploy(db_session)
+    service = DeployLogService(session_factory=_session_factory(db_session), flush_interval=60, flush_size=1000)
+
+    for i in range(5):
+        await service.append(deploy.id, f"line {i}")
+    # Another writer already stored sequence 3
+    db_session.add(DeploymentLog(deployment_id=deploy.id, sequence=3, log_type="deploy", message="dup"))
+    await db_session.commit()
+
+    assert await service.flush() == 4
+    assert service._pending == []
+    messages = (await db_session.execute(
+        select(DeploymentLog.message).order_by(DeploymentLog.sequence)
+    )).scalars().all()
+    assert messages == ["line 0", "line 1", "dup", "line 3", "line 4"]
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_unwritable_buffer_is_bounded():
+    """Test lines are kept while the database is down, up to max_pending"""
+
+    def unavailable():
+        raise ConnectionError("database down")
+
+    service = DeployLogService(session_factory=unavailable, flush_interval=60, flush_size=1000, max_pending=3)
+    service._next_sequence["d"] = 1
+    for i in range(5):
+        await service.append("d", f"line {i}")
+
+    assert await service.flush() == 0
+    assert [e["message"] for e in service._pending] == ["line 2", "line 3", "line 4"]
+
+
+@pytest.mark.asyncio
+async def test_lines_being_flushed_stay_readable(db_session):
+    """Test a reader does not skip lines whose flush has not committed yet"""
+    deploy = await _create_deploy(db_session)
+    service = DeployLogService(session_factory=_session_factory(db_session), flush_interval=60, flush_size=1000)
+    release = asyncio.Event()
+    write = service._write
+
+    async def blocked_write(batch):
+        await release.wait()
+        return await write(batch)
+
+    service._write = blocked_write
+    for i in range(3):
+        await service.append(deploy.id, f"line {i}")
+    flushing = asyncio.create_task(service.flush())
+    await asyncio.sleep(0)
+    assert service._pending == []
+    await service.append(deploy.id, "line 3")
+
+    entries = await service.read(db_session, deploy.id, after_sequence=1)
+    assert [e["message"] for e in entries] == ["line 1", "line 2", "line 3"]
+    assert [e["message"] for e in await service.tail(db_session, deploy.id, lines=2)] == ["line 2", "line 3"]
+
+    release.set()
+    assert await flushing == 3
+    assert service._inflight == []
+    await service.stop()
@@ -0,0 +1,135 @@
+"""
+Tests for the edge middleware (CORS, rate limiting, lockout, error mapping)
+"""
+
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from backend.middleware.edge import EdgeMiddleware
+from backend.middleware.limiter import InMemoryRateLimiter
+from backend.middleware.lockout import AccountLockout
+from backend.utils.ttl_store import RedisTTLStore
+
+ORIGIN = "http://localhost:3000"
+
+
+def make_client(limits=None, lockout=None, max_body=None) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.post("/login")
+    async def login(request: Request):
+        data = await request.json()
+        if data.get("password") != "correct":
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+        return {"email": data["email"], "state_email": request.state.login_email}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"body": await request.json(), "length": request.headers["content-length"]}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(
+        EdgeMiddleware,
+        limiter=InMemoryRateLimiter(),
+        limits=limits or {"default": (1000, 60)},
+        lockout=lockout,
+        **({"max_body": max_body} if max_body else {}),
+    )
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_cors_preflight_and_response_headers():
+    """Test allowed origins get CORS headers and others are refused on preflight"""
+    client = make_client()
+
+    preflight = client.options("/health", headers={"Origin": ORIGIN})
+    assert preflight.status_code == 200
+    assert preflight.headers["access-control-allow-origin"] == ORIGIN
+    assert preflight.headers["access-control-max-age"] == "3600"
+
+    assert client.options("/health", headers={"Origin": "https://evil.example"}).status_code == 403
+
+    response = client.get("/health", headers={"Origin": ORIGIN})
+    assert response.json() == {"status": "healthy"}
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert "access-control-allow-origin" not in client.get("/health").headers
+
+
+def test_rate_limit_response_keeps_cors_headers():
+    """Test a 429 carries Retry-After and CORS headers so browsers can read it"""
+    client = make_client(limits={"/health": (2, 60), "default": (1000, 60)})
+
+    for _ in range(2):
+        assert client.get("/health").status_code == 200
+    response = client.get("/health", headers={"Origin": ORIGIN})
+
+    assert response.status_code == 429
+    assert response.json()["detail"]["error"] == "rate_limit_exceeded"
+    assert int(response.headers["retry-after"]) > 0
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+
+
+def test_login_lockout_after_failed_attempts():
+    """Test repeated 401s lock the account while the handler still sees the body"""
+    client = make_client(lockout=AccountLockout(max_attempts=3))
+    bad = {"email": "User@Example.com", "password": "wrong"}
+
+    for _ in range(3):
+        assert client.post("/login", json=bad).status_code == 401
+
+    locked = client.post("/login", json={"email": "user@example.com", "password": "correct"})
+    assert locked.status_code == 429
+    assert locked.json()["detail"]["error"] == "account_locked"
+
+    other = client.post("/login", json={"email": "Other@example.com", "password": "correct"})
+    assert other.json() == {"email": "Other@example.com", "state_email": "other@example.com"}
+
+
+def test_lockout_is_shared_between_workers():
+    """Test failures counted by one process lock the account in another"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+    store = fakeredis.FakeAsyncRedis()
+    workers = [
+        make_client(lockout=AccountLockout(max_attempts=2, store=RedisTTLStore(client=store, prefix="lockout:")))
+        for _ in range(2)
+    ]
+    bad = {"email": "user@example.com", "password": "wrong"}
+
+    assert workers[0].post("/login", json=bad).status_code == 401
+    assert workers[1].post("/login", json=bad).status_code == 401
+    assert workers[0].post("/login", json=bad).json()["detail"]["error"] == "account_locked"
+
+
+def test_unhandled_error_becomes_json():
+    """Test unhandled exceptions are returned as a JSON 500"""
+    response = make_client().get("/boom", headers={"Origin": ORIGIN})
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Internal server error"
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+
+
+def test_gzip_request_bodies_are_decompressed():
+    """Test gzip bodies reach handlers decoded and bad or oversized ones are refused"""
+    client = make_client(max_body=1024)
+    payload = json.dumps({"samples": [{"cpu_usage": 1.5}] * 10}).encode()
+
+    response = client.post("/echo", content=gzip.compress(payload), headers={"Content-Encoding": "gzip"})
+    assert response.json() == {"body": json.loads(payload), "length": str(len(payload))}
+
+    bomb = gzip.compress(b" " * 4096)
+    assert client.post("/echo", content=bomb, headers={"Content-Encoding": "gzip"}).status_code == 413
+    assert client.post("/echo", content=b"not gzip", headers={"Content-Encoding": "gzip"}).status_code == 400
+    assert client.post("/echo", content=payload, headers={"Content-Encoding": "br"}).status_code == 415
@@ -0,0 +1,167 @@
+"""
+Tests for the durable deploy job queue and worker pool
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import DeployJob, User
+from backend.services.job_queue import PRIORITY_DEPLOY, PRIORITY_ROLLBACK, JobQueue, QueueFull
+from backend.worker import DeployWorker
+
+
+def _queue(db_session, **kwargs) -> JobQueue:
+    factory = sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    queue = JobQueue(session_factory=factory, **kwargs)
+    queue.register("noop", _noop)
+    return queue
+
+
+async def _noop(**payload):
+    pass
+
+
+async def _users(db_session, *emails):
+    users = [User(email=email, password_hash="x") for email in emails]
+    db_session.add_all(users)
+    await db_session.commit()
+    return users
+
+
+@pytest.mark.asyncio
+async def test_rollbacks_are_claimed_before_deploys(db_session):
+    """Test the rollback lane is served before older fresh deploys"""
+    (user,) = await _users(db_session, "jobs-priority@example.com")
+    queue = _queue(db_session, per_user_limit=5)
+
+    deploy = await queue.enqueue(db_session, "noop", {"n": 1}, user.id, PRIORITY_DEPLOY)
+    rollback = await queue.enqueue(db_session, "noop", {"n": 2}, user.id, PRIORITY_ROLLBACK)
+
+    assert (await queue.claim("w1")).id == rollback.id
+    assert (await queue.claim("w1")).id == deploy.id
+    assert await queue.claim("w1") is None
+
+
+@pytest.mark.asyncio
+async def test_per_user_limits(db_session):
+    """Test a user's burst neither exceeds its running cap nor its queue bound"""
+    busy, other = await _users(db_session, "jobs-busy@example.com", "jobs-other@example.com")
+    queue = _queue(db_session, per_user_limit=1, max_queued_per_user=2)
+
+    await queue.enqueue(db_session, "noop", {}, busy.id)
+    await queue.enqueue(db_session, "noop", {}, busy.id)
+    with pytest.raises(QueueFull):
+        await queue.check_capacity(db_session, busy.id)
+    later = await queue.enqueue(db_session, "noop", {}, other.id)
+
+    first = await queue.claim("w1")
+    assert first.user_id == busy.id
+    assert (await queue.claim("w1")).id == later.id
+    assert await queue.claim("w1") is None
+
+    await queue.complete(first)
+    assert (await queue.claim("w1")).user_id == busy.id
+
+
+@pytest.mark.asyncio
+async def test_stale_jobs_are_requeued_then_failed(db_session):
+    """Test jobs from a dead worker run again until attempts are exhausted"""
+    (user,) = await _users(db_session, "jobs-stale@example.com")
+    queue = _queue(db_session, max_attempts=2, stale_after=60)
+    job = await queue.enqueue(db_session, "noop", {}, user.id)
+
+    for expected in ("queued", "failed"):
+        claimed = await queue.claim("dead-worker")
+        assert claimed.id == job.id
+        stored = await db_session.get(DeployJob, job.id)
+        stored.heartbeat_at = datetime.utcnow() - timedelta(minutes=5)
+        await db_session.commit()
+
+        assert await queue.requeue_stale() == 1
+        await db_session.refresh(stored)
+        assert stored.status == expected
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_jobs_with_bounded_concurrency(db_session):
+    """Test the worker pool never runs more jobs than its concurrency"""
+    users = await _users(db_session, *[f"jobs-worker-{i}@example.com" for i in range(6)])
+    queue = _queue(db_session)
+    active, peak, done = 0, 0, []
+
+    async def handler(n):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        done.append(n)
+
+    queue.register("count", handler)
+    for i, user in enumerate(users):
+        await queue.enqueue(db_session, "count", {"n": i}, user.id)
+
+    worker = DeployWorker(queue=queue, concurrency=2, poll_interval=0.05)
+    await worker.start()
+    for _ in range(100):
+        if len(done) == len(users):
+            break
+        await asyncio.sleep(0.05)
+    await worker.stop()
+
+    assert sorted(done) == list(range(len(users)))
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_exhausted_job_finishes_its_records(db_session):
+    """Test a job failed for a dead worker runs its kind's abandon hook in the same commit"""
+    (user,) = await _users(db_session, "jobs-abandoned@example.com")
+    queue = _queue(db_session, max_attempts=1, stale_after=60)
+    abandoned = []
+
+    async def on_abandoned(session, error, n):
+        abandoned.append((n, error, session.in_transaction()))
+
+    queue.register("tracked", _noop, on_abandoned=on_abandoned)
+    job = await queue.enqueue(db_session, "tracked", {"n": 7}, user.id)
+    await queue.claim("dead-worker")
+    stored = await db_session.get(DeployJob, job.id)
+    stored.heartbeat_at = datetime.utcnow() - timedelta(minutes=5)
+    await db_session.commit()
+
+    assert await queue.requeue_stale() == 1
+    await db_session.refresh(stored)
+    assert (stored.status, stored.last_error) == ("failed", "Worker stopped responding")
+    assert abandoned == [(7, "Worker stopped responding", True)]
+
+
+@pytest.mark.asyncio
+async def test_handler_failures_are_recorded(db_session):
+    """Test a raised exception or a returned error message fails the job"""
+    (user,) = await _users(db_session, "jobs-errors@example.com")
+    queue = _queue(db_session, per_user_limit=5)
+
+    async def returns_error():
+        return "build failed"
+
+    async def raises():
+        raise RuntimeError("cluster unreachable")
+
+    queue.register("returns", returns_error)
+    queue.register("raises", raises)
+    expected = {
+        "returns": ("failed", "build failed"),
+        "raises": ("failed", "cluster unreachable"),
+        "noop": ("succeeded", None),
+    }
+    for kind, outcome in expected.items():
+        job = await queue.enqueue(db_session, kind, {}, user.id)
+        await queue.run(await queue.claim("w1"))
+        stored = await db_session.get(DeployJob, job.id)
+        await db_session.refresh(stored)
+        assert (stored.status, stored.last_error) == outcome
@@ -0,0 +1,119 @@
+"""
+Tests for the Kubernetes API client
+"""
+
+import base64
+import json
+import os
+
+import httpx
+import pytest
+import yaml
+
+from backend import k8s_api
+from backend.k8s_api import KubernetesAPI, KubernetesAPIError
+from backend.k8s_deploy_engine import K8sDeployEngine
+
+
+def _api(handler) -> KubernetesAPI:
+    client = httpx.AsyncClient(base_url="http://k8s", transport=httpx.MockTransport(handler))
+    return KubernetesAPI(client, namespace="user-apps")
+
+
+@pytest.mark.asyncio
+async def test_apply_uses_server_side_apply():
+    """Test manifests are applied with a single server-side apply PATCH"""
+    requests = []
+
+    async def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json=json.loads(request.content))
+
+    api = _api(handler)
+    manifests = K8sDeployEngine()._create_k8s_manifests(
+        "demo-app", "registry/demo:1", "user-1", "https://github.com/x/demo", "static"
+    )
+    await api.apply_many(manifests)
+
+    paths = sorted(r.url.path for r in requests)
+    assert paths == [
+        "/api/v1/namespaces/user-apps/services/demo-app",
+        "/apis/apps/v1/namespaces/user-apps/deployments/demo-app",
+        "/apis/autoscaling/v2/namespaces/user-apps/horizontalpodautoscalers/demo-app",
+    ]
+    for request in requests:
+        assert request.method == "PATCH"
+        assert request.headers["content-type"] == "application/apply-patch+yaml"
+        assert request.url.params["fieldManager"] == "autostack"
+        assert request.url.params["force"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_api_errors_raise():
+    """Test rejected requests surface the server message"""
+
+    async def handler(request: httpx.Request):
+        return httpx.Response(422, json={"message": "spec.replicas: Invalid value"})
+
+    api = _api(handler)
+    with pytest.raises(KubernetesAPIError) as exc:
+        await api.apply({"apiVersion": "v1", "kind": "Service", "metadata": {"name": "x"}})
+    assert exc.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_delete_by_label_and_pod_logs():
+    """Test label-based delete and concurrent pod log tails"""
+    deleted = []
+
+    async def handler(request: httpx.Request):
+        path = request.url.path
+        if request.method == "DELETE":
+            deleted.append(path)
+            return httpx.Response(200, json={})
+        if path.endswith("/log"):
+            return httpx.Response(200, text=f"log from {path.split('/')[-2]}")
+        if path.endswith("/pods") or path.endswith("/services"):
+            assert request.url.params["labelSelector"] == "app=demo"
+            kind = path.rsplit("/", 1)[-1]
+            return httpx.Response(200, json={"items": [
+                {"metadata": {"name": f"{kind}-a"}},
+                {"metadata": {"name": f"{kind}-b"}},
+            ]})
+        return httpx.Response(200, json={"items": []})
+
+    api = _api(handler)
+    count = await api.delete_by_label([("v1", "Service"), ("apps/v1", "Deployment")], "app=demo")
+    assert count == 2
+    assert sorted(deleted) == [
+        "/api/v1/namespaces/user-apps/services/services-a",
+        "/api/v1/namespaces/user-apps/services/services-b",
+    ]
+
+    logs = await api.pod_logs("app=demo", tail=10)
+    assert logs == "log from pods-a\nlog from pods-b\n"
+
+
+def test_kubeconfig_credentials_are_written_once_and_removed(tmp_path):
+    """Test inline kubeconfig certs reuse one temp file each and are cleaned up"""
+    encoded = lambda text: base64.b64encode(text.encode()).decode()
+    kubeconfig = tmp_path / "config"
+    kubeconfig.write_text(yaml.safe_dump({
+        "current-context": "dev",
+        "contexts": [{"name": "dev", "context": {"cluster": "dev", "user": "dev"}}],
+        "clusters": [{"name": "dev", "cluster": {
+            "server": "https://k8s:6443", "certificate-authority-data": encoded("ca"),
+        }}],
+        "users": [{"name": "dev", "user": {
+            "client-certificate-data": encoded("cert"), "client-key-data": encoded("key"),
+        }}],
+    }))
+
+    first = k8s_api._load_kubeconfig(str(kubeconfig))
+    second = k8s_api._load_kubeconfig(str(kubeconfig))
+    paths = [first["verify"], *first["cert"]]
+    assert [second["verify"], *second["cert"]] == paths
+    assert [open(p).read() for p in paths] == ["ca", "cert", "key"]
+
+    k8s_api._remove_materialized()
+    assert not any(os.path.exists(p) for p in paths)
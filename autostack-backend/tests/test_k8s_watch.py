@@ -0,0 +1,132 @@
+"""
+Tests for watch-based Kubernetes rollout tracking
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.k8s_watch import RolloutTracker
+
+
+class FakeAPIServer:
+    """Minimal list+watch API server: lists from ``objects``, streams queued events"""
+
+    def __init__(self):
+        self.objects = {"jobs": [], "services": []}
+        self.events = {"jobs": asyncio.Queue(), "services": asyncio.Queue()}
+        self.lists = {"jobs": 0, "services": 0}
+        self.watches = {"jobs": 0, "services": 0}
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url="http://k8s", transport=httpx.MockTransport(self.handle))
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        kind = request.url.path.rsplit("/", 1)[-1]
+        if request.url.params.get("watch"):
+            self.watches[kind] += 1
+            return httpx.Response(200, content=self._stream(kind))
+        self.lists[kind] += 1
+        return httpx.Response(200, json={
+            "items": self.objects[kind],
+            "metadata": {"resourceVersion": str(self.lists[kind])},
+        })
+
+    async def _stream(self, kind: str):
+        while True:
+            event = await self.events[kind].get()
+            if event is None:
+                return
+            yield (json.dumps(event) + "\n").encode()
+
+    async def emit(self, kind: str, event_type: str, obj: dict):
+        await self.events[kind].put({"type": event_type, "object": obj})
+
+
+def _job(name: str, **status) -> dict:
+    return {"metadata": {"name": name, "resourceVersion": "10"}, "status": status}
+
+
+def _service(name: str, hostname: str | None = None) -> dict:
+    ingress = [{"hostname": hostname}] if hostname else []
+    return {
+        "metadata": {"name": name, "resourceVersion": "10"},
+        "status": {"loadBalancer": {"ingress": ingress}},
+    }
+
+
+@pytest.mark.asyncio
+async def test_job_completion_resolves_on_event():
+    """Test a build job wait resolves as soon as the Complete event arrives"""
+    server = FakeAPIServer()
+    tracker = RolloutTracker(server.client(), retry_delay=0.01)
+
+    wait = asyncio.create_task(tracker.wait_for_job("build-1", timeout=2))
+    await asyncio.sleep(0.05)
+    assert not wait.done()
+
+    await server.emit("jobs", "MODIFIED", _job("build-1", conditions=[{"type": "Complete", "status": "True"}]))
+    assert await wait is True
+    await tracker.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_resolves_false():
+    """Test a Failed condition resolves the wait with False"""
+    server = FakeAPIServer()
+    tracker = RolloutTracker(server.client(), retry_delay=0.01)
+
+    wait = asyncio.create_task(tracker.wait_for_job("build-2", timeout=2))
+    await asyncio.sleep(0.05)
+    await server.emit("jobs", "MODIFIED", _job("build-2", failed=1, conditions=[{"type": "Failed", "status": "True"}]))
+    assert await wait is False
+    await tracker.close()
+
+
+@pytest.mark.asyncio
+async def test_one_stream_per_kind_across_deploys():
+    """Test concurrent waits share a single watch stream"""
+    server = FakeAPIServer()
+    tracker = RolloutTracker(server.client(), retry_delay=0.01)
+
+    waits = [
+        asyncio.create_task(tracker.wait_for_load_balancer(f"app-{i}", timeout=2))
+        for i in range(5)
+    ]
+    await asyncio.sleep(0.05)
+    for i in range(5):
+        await server.emit("services", "MODIFIED", _service(f"app-{i}", f"lb-{i}.example.com"))
+
+    assert await asyncio.gather(*waits) == [f"lb-{i}.example.com" for i in range(5)]
+    assert server.watches["services"] == 1
+    assert server.watches["jobs"] == 0
+    await tracker.close()
+
+
+@pytest.mark.asyncio
+async def test_relists_after_resource_version_expired():
+    """Test a 410 Gone error triggers a relist that picks up the current state"""
+    server = FakeAPIServer()
+    tracker = RolloutTracker(server.client(), retry_delay=0.01)
+
+    wait = asyncio.create_task(tracker.wait_for_job("build-3", timeout=2))
+    await asyncio.sleep(0.05)
+
+    server.objects["jobs"] = [_job("build-3", succeeded=1)]
+    await server.events["jobs"].put({"type": "ERROR", "object": {"code": 410, "message": "too old"}})
+
+    assert await wait is True
+    assert server.lists["jobs"] == 2
+    await tracker.close()
+
+
+@pytest.mark.asyncio
+async def test_load_balancer_wait_times_out_to_none():
+    """Test a LoadBalancer that never gets an address returns None"""
+    server = FakeAPIServer()
+    tracker = RolloutTracker(server.client(), retry_delay=0.01)
+
+    assert await tracker.wait_for_load_balancer("pending-app", timeout=0.1) is None
+    await tracker.close()
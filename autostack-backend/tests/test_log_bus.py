@@ -0,0 +1,94 @@
+"""
+Tests for the live log bus
+"""
+
+import asyncio
+
+import pytest
+
+from backend.services.log_bus import InMemoryLogBus, LogBusLagged, RedisLogBus
+
+
+def _entry(sequence: int) -> dict:
+    return {"sequence": sequence, "log_type": "build", "message": f"line {sequence}"}
+
+
+async def _collect(bus, topic: str, after_sequence: int = 0) -> list[int]:
+    return [e["sequence"] async for e in bus.subscribe(topic, after_sequence=after_sequence)]
+
+
+@pytest.mark.asyncio
+async def test_subscriber_receives_live_lines_until_close():
+    """Test live lines are pushed to subscribers and close ends the stream"""
+    bus = InMemoryLogBus()
+    task = asyncio.create_task(_collect(bus, "deploy:1"))
+    await asyncio.sleep(0)
+
+    for i in range(1, 4):
+        await bus.publish("deploy:1", _entry(i))
+    await bus.close("deploy:1", last_sequence=3)
+
+    assert await asyncio.wait_for(task, 1) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_idle_follower_times_out_and_unsubscribes():
+    """Test a follower giving up on a quiet topic leaves no subscriber behind"""
+    bus = InMemoryLogBus()
+    await bus.publish("deploy:1", _entry(1))
+    stream = bus.subscribe("deploy:1", after_sequence=1).__aiter__()
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(stream.__anext__(), 0.05)
+    await stream.aclose()
+
+    assert not bus._topics["deploy:1"].subscribers
+
+
+@pytest.mark.asyncio
+async def test_resume_from_offset_replays_history():
+    """Test a late subscriber resumes after its offset"""
+    bus = InMemoryLogBus()
+    for i in range(1, 6):
+        await bus.publish("deploy:1", _entry(i))
+    await bus.close("deploy:1", last_sequence=5)
+
+    assert await _collect(bus, "deploy:1", after_sequence=3) == [4, 5]
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_resynced_without_blocking_publisher():
+    """Test an overflowing subscriber queue does not stall publishing or lose lines"""
+    bus = InMemoryLogBus(history=100, queue_size=2)
+    task = asyncio.create_task(_collect(bus, "deploy:1"))
+    await asyncio.sleep(0)
+
+    # Publish far more than the queue holds without yielding to the subscriber
+    for i in range(1, 21):
+        await bus.publish("deploy:1", _entry(i))
+    await bus.close("deploy:1", last_sequence=20)
+
+    assert await asyncio.wait_for(task, 1) == list(range(1, 21))
+
+
+@pytest.mark.asyncio
+async def test_offset_older_than_history_raises_lagged():
+    """Test resuming from an evicted offset tells the caller to use storage"""
+    bus = InMemoryLogBus(history=3)
+    for i in range(1, 11):
+        await bus.publish("deploy:1", _entry(i))
+
+    with pytest.raises(LogBusLagged):
+        await _collect(bus, "deploy:1", after_sequence=2)
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_resume_and_close():
+    """Test the Redis Streams backend against a local stand-in"""
+    fakeredis = pytest.importorskip("fakeredis")
+    bus = RedisLogBus(client=fakeredis.FakeAsyncRedis(), block_ms=50)
+
+    for i in range(1, 5):
+        await bus.publish("deploy:1", _entry(i))
+    await bus.close("deploy:1", last_sequence=4)
+
+    assert await asyncio.wait_for(_collect(bus, "deploy:1", after_sequence=1), 1) == [2, 3, 4]
@@ -0,0 +1,93 @@
+"""
+Tests for bulk agent metrics ingestion
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from backend import crud
+from backend.models import Agent, Metrics, MetricsRollup1m, User
+from backend.schemas import MetricSample
+from backend.services.metrics_store import metrics_store
+
+
+async def _agents(db_session):
+    owner = User(email="ingest-owner@example.com", password_hash="x")
+    other = User(email="ingest-other@example.com", password_hash="x")
+    db_session.add_all([owner, other])
+    await db_session.commit()
+    agents = [
+        Agent(name=name, host=name, ip="10.0.0.1", user_id=user.id)
+        for name, user in (("web", owner), ("db", owner), ("foreign", other))
+    ]
+    db_session.add_all(agents)
+    await db_session.commit()
+    return owner, agents
+
+
+@pytest.mark.asyncio
+async def test_bulk_ingest_stores_samples_and_latest_status(db_session):
+    """Test samples from several agents land in one call and agents move to their newest sample"""
+    owner, (web, database, foreign) = await _agents(db_session)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    samples = [
+        {"agent_id": web.id, "timestamp": start + timedelta(seconds=i), "cpu_usage": float(i), "memory_usage": 50.0}
+        for i in range(10)
+    ]
+    samples.reverse()  # arrival order does not matter
+    samples.append({"agent_id": database.id, "timestamp": start.replace(tzinfo=timezone.utc), "cpu_usage": 5.0, "memory_usage": 7.0})
+    samples.append({"agent_id": foreign.id, "timestamp": start, "cpu_usage": 1.0, "memory_usage": 1.0})
+    samples.append({"agent_id": web.id, "timestamp": start - timedelta(days=30), "cpu_usage": 1.0, "memory_usage": 1.0})
+
+    assert await crud.ingest_metrics(db_session, user=owner, samples=samples) == (11, 2, 2)
+
+    stored = await db_session.scalar(select(func.count()).select_from(Metrics).where(Metrics.user_id == owner.id))
+    assert stored == 11
+    rows = {a.name: a for a in (await db_session.execute(select(Agent).execution_options(populate_existing=True))).scalars()}
+    assert (rows["web"].status, rows["web"].cpu_usage, rows["web"].last_heartbeat) == ("online", 9.0, start + timedelta(seconds=9))
+    assert rows["db"].last_heartbeat == start
+    assert rows["foreign"].status == "offline"
+
+    # A late batch from a spool is stored but does not roll the agent back
+    late = [{"agent_id": web.id, "timestamp": start - timedelta(minutes=5), "cpu_usage": 99.0, "memory_usage": 99.0}]
+    assert await crud.ingest_metrics(db_session, user=owner, samples=late) == (1, 0, 1)
+    await db_session.refresh(rows["web"])
+    assert rows["web"].cpu_usage == 9.0
+
+
+@pytest.mark.asyncio
+async def test_owned_agent_ids_drops_unknown_and_foreign(db_session):
+    """Test only the caller's existing agents count as owned, so the endpoint can 404 deleted ones"""
+    owner, (web, database, foreign) = await _agents(db_session)
+    assert await crud.owned_agent_ids(db_session, owner, [web.id, foreign.id, "deleted"]) == {web.id}
+    assert await crud.owned_agent_ids(db_session, owner, ["deleted"]) == set()
+
+
+@pytest.mark.asyncio
+async def test_window_spread_is_stored_and_rolled_up(db_session):
+    """Test min/max/p95, interface rates and process count from the agent are kept"""
+    owner, (web, _, _) = await _agents(db_session)
+    minute = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=5)
+    sample = MetricSample(
+        agent_id=web.id, timestamp=minute, cpu_usage=20.0, memory_usage=50.0, readings=6,
+        cpu={"min": 5.0, "max": 90.0, "avg": 20.0, "p95": 80.0},
+        memory={"min": 49.0, "max": 52.0, "avg": 50.0, "p95": 51.0},
+        network={"eth0": {"in_bytes_per_sec": 10.0, "out_bytes_per_sec": 4.0}},
+        process_count=120,
+    )
+    assert await crud.ingest_metrics(db_session, user=owner, samples=[sample.model_dump()]) == (1, 0, 1)
+
+    stored = await db_session.scalar(select(Metrics).where(Metrics.agent_id == web.id))
+    assert (stored.readings, stored.cpu_p95, stored.process_count) == (6, 80.0, 120)
+    assert stored.network_interfaces == {"eth0": {"in_bytes_per_sec": 10.0, "out_bytes_per_sec": 4.0}}
+
+    rollup = await db_session.scalar(select(MetricsRollup1m).where(MetricsRollup1m.agent_id == web.id))
+    assert (rollup.cpu_min, rollup.cpu_max, rollup.memory_max) == (5.0, 90.0, 52.0)
+
+    _, points = await metrics_store.series(
+        db_session, user_id=owner.id, agent_id=web.id,
+        start=minute, end=minute + timedelta(minutes=1), resolution="raw",
+    )
+    assert (points[0]["cpu_min"], points[0]["cpu_max"], points[0]["cpu_p95"]) == (5.0, 90.0, 80.0)
@@ -0,0 +1,65 @@
+"""
+Tests for the metrics overview aggregate and its cache
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import crud
+from backend.models import Agent, User
+from backend.utils.overview_cache import OverviewCache
+
+
+def test_cache_expires_and_refuses_results_older_than_invalidation(fake_clock):
+    """Test entries expire and a query started before a heartbeat is not cached"""
+    cache = OverviewCache(ttl=5, clock=fake_clock)
+
+    cache.put("u", {"active_agents": 1}, fake_clock())
+    assert cache.get("u") == {"active_agents": 1}
+    fake_clock.now += 6
+    assert cache.get("u") is None
+
+    computed_at = fake_clock()
+    fake_clock.now += 1
+    cache.invalidate("u")
+    cache.put("u", {"active_agents": 1}, computed_at)
+    assert cache.get("u") is None
+
+    fake_clock.now += 1
+    cache.put("u", {"active_agents": 2}, fake_clock())
+    assert cache.get("u") == {"active_agents": 2}
+
+
+@pytest.mark.asyncio
+async def test_overview_aggregates_in_sql(db_session):
+    """Test the overview averages and counts online agents of the user only"""
+    owner = User(email="overview@example.com", password_hash="x")
+    other = User(email="overview-other@example.com", password_hash="x")
+    db_session.add_all([owner, other])
+    await db_session.commit()
+    now = datetime.utcnow()
+    db_session.add_all([
+        Agent(name="a", host="a", ip="10.0.0.1", user_id=owner.id, status="online",
+              cpu_usage=20.0, memory_usage=40.0, last_heartbeat=now),
+        Agent(name="b", host="b", ip="10.0.0.2", user_id=owner.id, status="online",
+              cpu_usage=40.0, memory_usage=60.0, last_heartbeat=now - timedelta(minutes=10)),
+        Agent(name="c", host="c", ip="10.0.0.3", user_id=owner.id, status="offline",
+              cpu_usage=90.0, memory_usage=90.0),
+        Agent(name="d", host="d", ip="10.0.0.4", user_id=other.id, status="online",
+              cpu_usage=99.0, memory_usage=99.0, last_heartbeat=now),
+    ])
+    await db_session.commit()
+
+    assert await crud.get_metrics_overview(db_session, owner) == {
+        "total_cpu_usage": 30.0,
+        "total_memory_usage": 50.0,
+        "uptime_percentage": 66.67,
+        "active_agents": 2,
+        "total_agents": 3,
+    }
+
+    empty = User(email="overview-empty@example.com", password_hash="x")
+    db_session.add(empty)
+    await db_session.commit()
+    assert (await crud.get_metrics_overview(db_session, empty))["total_cpu_usage"] == 0.0
@@ -0,0 +1,79 @@
+"""
+Tests for metrics rollups and resolution selection
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import crud
+from backend.models import Agent, User
+from backend.services.metrics_store import MetricsStore, metrics_store
+
+
+def test_resolution_is_finest_that_fits_and_is_retained():
+    """Test the store picks raw for short ranges and coarser rollups for long or old ones"""
+    store = MetricsStore(
+        raw_retention=timedelta(days=7),
+        rollup_retention={"1m": timedelta(days=30), "1h": timedelta(days=365), "1d": None},
+    )
+    now = datetime(2026, 6, 1)
+
+    assert store.choose_resolution(now - timedelta(hours=1), now, now, 1000) == "raw"
+    assert store.choose_resolution(now - timedelta(hours=12), now, now, 1000) == "1m"
+    assert store.choose_resolution(now - timedelta(days=3), now, now, 1000) == "1h"
+    # Ten minutes from two weeks ago: raw samples are gone, the 1m rollup is not
+    old = now - timedelta(days=14)
+    assert store.choose_resolution(old, old + timedelta(minutes=10), now, 1000) == "1m"
+    assert store.choose_resolution(now - timedelta(days=400), now, now, 1000) == "1d"
+
+
+@pytest.mark.asyncio
+async def test_ingests_merge_into_rollups(db_session):
+    """Test separate ingests into one bucket merge sums, counts and extremes"""
+    user = User(email="rollup@example.com", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+    agent = Agent(name="web", host="web", ip="10.0.0.1", user_id=user.id)
+    db_session.add(agent)
+    await db_session.commit()
+
+    minute = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=5)
+    for cpu, second in ((10.0, 1), (30.0, 20), (20.0, 40)):
+        sample = {"agent_id": agent.id, "timestamp": minute + timedelta(seconds=second),
+                  "cpu_usage": cpu, "memory_usage": 50.0, "network_in": cpu}
+        await crud.ingest_metrics(db_session, user=user, samples=[sample])
+
+    resolution, points = await metrics_store.series(
+        db_session, user_id=user.id, agent_id=agent.id,
+        start=minute, end=minute + timedelta(minutes=1), resolution="1m",
+    )
+    assert resolution == "1m"
+    assert len(points) == 1
+    point = points[0]
+    assert (point["samples"], point["cpu_avg"], point["cpu_min"], point["cpu_max"]) == (3, 20.0, 10.0, 30.0)
+    assert point["network_in"] == 20.0
+
+    _, raw = await metrics_store.series(
+        db_session, user_id=user.id, agent_id=agent.id,
+        start=minute, end=minute + timedelta(minutes=1),
+    )
+    assert [p["cpu_avg"] for p in raw] == [10.0, 30.0, 20.0]
+
+    _, foreign = await metrics_store.series(
+        db_session, user_id="someone-else", agent_id=agent.id,
+        start=minute, end=minute + timedelta(minutes=1), resolution="1h",
+    )
+    assert foreign == []
+
+    # Explicit resolutions honour max_points instead of returning everything
+    with pytest.raises(ValueError):
+        await metrics_store.series(
+            db_session, user_id=user.id, agent_id=agent.id,
+            start=minute, end=minute + timedelta(days=1), resolution="1m", max_points=10,
+        )
+    with pytest.raises(ValueError):
+        await metrics_store.series(
+            db_session, user_id=user.id, agent_id=agent.id,
+            start=minute, end=minute + timedelta(minutes=1), resolution="raw", max_points=2,
+        )
@@ -0,0 +1,61 @@
+"""
+Tests for the bounded password hashing pool
+"""
+
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from backend.utils.password_pool import HASH_PENDING, PasswordHasherPool, PasswordPoolBusy
+
+
+class BlockingContext:
+    """Hashes only once released, to hold calls on the pool"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.release.wait(5)
+        return f"hashed:{password}"
+
+    def verify(self, password, hashed):
+        self.release.wait(5)
+        return hashed == f"hashed:{password}"
+
+
+@pytest.mark.asyncio
+async def test_hashing_runs_off_the_event_loop():
+    """Test argon2 hashes and verifies on the pool"""
+    context = CryptContext(schemes=["argon2"], argon2__memory_cost=1024, argon2__rounds=1)
+    pool = PasswordHasherPool(context, max_workers=2, max_pending=4)
+
+    hashed = await pool.hash("s3cret-password")
+    assert hashed.startswith("$argon2")
+    assert await pool.verify("s3cret-password", hashed)
+    assert not await pool.verify("wrong-password", hashed)
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_calls_beyond_max_pending_are_rejected():
+    """Test a saturated pool sheds load while the loop stays responsive"""
+    context = BlockingContext()
+    pool = PasswordHasherPool(context, max_workers=1, max_pending=3)
+
+    held = [asyncio.create_task(pool.hash(f"pw{i}")) for i in range(3)]
+    await asyncio.sleep(0.05)
+    assert pool.pending == 3
+    assert HASH_PENDING.value() == 3
+
+    with pytest.raises(PasswordPoolBusy):
+        await pool.verify("pw0", "hashed:pw0")
+
+    context.release.set()
+    assert await asyncio.gather(*held) == ["hashed:pw0", "hashed:pw1", "hashed:pw2"]
+    assert pool.pending == 0
+    assert await pool.verify("pw0", "hashed:pw0")
+    pool.shutdown()
@@ -0,0 +1,52 @@
+"""
+Tests for the deployment port allocator
+"""
+
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from backend.port_allocator import PortAllocator, container_port_leases
+
+
+def test_concurrent_allocations_are_unique():
+    """Test parallel deploys never share a port and exhaustion returns None"""
+    ports = PortAllocator(30000, 30200, probe=False)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        leased = list(pool.map(lambda i: ports.allocate(f"deploy-{i}"), range(200)))
+
+    assert sorted(leased) == list(range(30000, 30200))
+    assert ports.allocate("one-too-many") is None
+
+    ports.release(30042)
+    assert ports.allocate("again") == 30042
+
+
+def test_reconcile_from_container_labels_and_bindings():
+    """Test leases are recovered from labelled and legacy deploy containers"""
+    containers = [
+        SimpleNamespace(name="deploy-a", labels={"autostack.port": "30001", "autostack.deploy_id": "a"}, attrs={}),
+        SimpleNamespace(
+            name="deploy-b",
+            labels={},
+            attrs={"HostConfig": {"PortBindings": {"80/tcp": [{"HostIp": "", "HostPort": "30002"}]}}},
+        ),
+        SimpleNamespace(name="postgres", labels={}, attrs={"HostConfig": {"PortBindings": {"5432/tcp": [{"HostPort": "30003"}]}}}),
+    ]
+    ports = PortAllocator(30000, 30004, probe=False)
+    ports.reconcile(container_port_leases(containers))
+
+    assert ports.owner(30001) == "a"
+    assert ports.owner(30002) == "deploy-b"
+    assert [ports.allocate("x"), ports.allocate("y")] == [30000, 30003]
+    assert ports.allocate("z") is None
+
+
+def test_ports_bound_elsewhere_are_skipped():
+    """Test a port held by another process is not leased"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("", 0))
+        s.listen()
+        taken = s.getsockname()[1]
+        ports = PortAllocator(taken, taken + 2)
+        assert ports.allocate("deploy") == taken + 1
@@ -0,0 +1,70 @@
+"""
+Tests for cached JWT principal resolution and token revocation
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from backend import auth, crud
+from backend.models import User
+from backend.utils.principal_cache import PrincipalCache
+
+
+class Principal:
+    def __init__(self, id):
+        self.id = id
+
+
+def test_cache_is_versioned_expiring_and_bounded(fake_clock):
+    """Test entries match one token version, expire and evict least recently used"""
+    cache = PrincipalCache(ttl=30, max_entries=2, clock=fake_clock)
+    alice, bob, carol = Principal("a"), Principal("b"), Principal("c")
+
+    cache.put(alice, 0)
+    assert cache.get("a", 0) is alice
+    assert cache.get("a", 1) is None  # token from another version evicts the entry
+    assert cache.get("a", 0) is None
+
+    cache.put(alice, 1)
+    cache.put(bob, 0)
+    cache.get("a", 1)
+    cache.put(carol, 0)
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 1) is alice
+
+    fake_clock.now += 31
+    assert cache.get("a", 1) is None
+    cache.put(carol, 0)
+    cache.invalidate("c")
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_principal_skips_the_database(db_session, monkeypatch):
+    """Test repeated requests resolve the user once and revocation rejects old tokens"""
+    user = User(email="principal@example.com", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+
+    monkeypatch.setattr(auth, "principal_cache", PrincipalCache(ttl=30))
+    lookups = []
+    get_user_by_id = crud.get_user_by_id
+
+    async def counting_get_user_by_id(db, user_id):
+        lookups.append(user_id)
+        return await get_user_by_id(db, user_id)
+
+    monkeypatch.setattr(crud, "get_user_by_id", counting_get_user_by_id)
+
+    token = auth.create_access_token(user.id, token_version=user.token_version)
+    for _ in range(3):
+        assert (await auth.get_current_user(db_session, token)).id == user.id
+    assert lookups == [user.id]
+
+    await auth.revoke_access_tokens(db_session, user)
+    with pytest.raises(HTTPException) as exc:
+        await auth.get_current_user(db_session, token)
+    assert exc.value.status_code == 401
+
+    fresh = auth.create_access_token(user.id, token_version=1)
+    assert (await auth.get_current_user(db_session, fresh)).id == user.id
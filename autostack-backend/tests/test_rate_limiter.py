@@ -0,0 +1,97 @@
+"""
+Tests for the GCRA rate limiter backends and route matching
+"""
+
+import pytest
+
+from backend.middleware.limiter import InMemoryRateLimiter, RedisRateLimiter
+from backend.middleware.routes import DEFAULT_RATE_LIMITS, UNMATCHED_ROUTE, RouteLimitMatcher, load_rate_limits
+
+
+@pytest.mark.asyncio
+async def test_burst_then_steady_rate(fake_clock):
+    """Test a full burst is allowed, then one request per emission interval"""
+    limiter = InMemoryRateLimiter(clock=fake_clock)
+
+    results = [await limiter.hit("1.2.3.4:/login", 10, 60) for _ in range(11)]
+    assert [r.allowed for r in results] == [True] * 10 + [False]
+    assert [r.remaining for r in results[:3]] == [9, 8, 7]
+    assert results[-1].retry_after == pytest.approx(6.0)
+
+    fake_clock.now += 6
+    assert (await limiter.hit("1.2.3.4:/login", 10, 60)).allowed
+    assert not (await limiter.hit("1.2.3.4:/login", 10, 60)).allowed
+    assert (await limiter.hit("5.6.7.8:/login", 10, 60)).allowed
+
+
+@pytest.mark.asyncio
+async def test_state_is_bounded(fake_clock):
+    """Test idle keys expire and a key flood cannot exceed max_keys"""
+    limiter = InMemoryRateLimiter(max_keys=100, clock=fake_clock)
+
+    for i in range(1000):
+        await limiter.hit(f"10.0.{i // 256}.{i % 256}:/", 100, 60)
+    assert len(limiter) == 100
+
+    fake_clock.now += 61
+    await limiter.hit("10.9.9.9:/", 100, 60)
+    assert len(limiter) == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_limit_is_shared_between_processes():
+    """Test two limiter instances on one store enforce a single limit"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+    store = fakeredis.FakeAsyncRedis()
+    worker_a = RedisRateLimiter(client=store)
+    worker_b = RedisRateLimiter(client=store)
+
+    allowed = [
+        (await (worker_a if i % 2 else worker_b).hit("1.2.3.4:/login", 4, 60)).allowed
+        for i in range(6)
+    ]
+    assert allowed == [True] * 4 + [False] * 2
+
+    rejected = await worker_a.hit("1.2.3.4:/login", 4, 60)
+    assert 0 < rejected.retry_after <= 15
+    assert 0 < await store.pttl("ratelimit:1.2.3.4:/login") <= 60_000
+
+
+def test_routes_share_a_bucket_per_template():
+    """Test concrete paths map to their route template and the most specific rule"""
+    matcher = RouteLimitMatcher(
+        {"/login": (10, 60), "/auth/github": (5, 60), "/api/projects/{id}/deploy": (3, 60), "default": (100, 60)},
+        routes=[
+            "/login",
+            "/auth/github/callback",
+            "/api/projects/{project_id}",
+            "/api/projects/{project_id}/deploy",
+            "/api/projects/stats",
+            "/static/{file_path:path}",
+        ],
+    )
+
+    assert matcher.match("/api/projects/123") == ("/api/projects/{project_id}", 100, 60)
+    assert matcher.match("/api/projects/456/") == ("/api/projects/{project_id}", 100, 60)
+    assert matcher.match("/api/projects/stats").key == "/api/projects/stats"
+    assert matcher.match("/api/projects/9/deploy") == ("/api/projects/{project_id}/deploy", 3, 60)
+    assert matcher.match("/auth/github/callback") == ("/auth/github/callback", 5, 60)
+    assert matcher.match("/auth/github/anything-else") == ("/auth/github", 5, 60)
+    assert matcher.match("/static/css/app.css").key == "/static/{file_path:path}"
+    assert matcher.match("/wp-admin/setup.php") == (UNMATCHED_ROUTE, 100, 60)
+
+
+def test_limits_load_from_settings(monkeypatch, tmp_path):
+    """Test limits come from RATE_LIMITS, then RATE_LIMITS_FILE, then defaults"""
+    monkeypatch.setenv("RATE_LIMITS", '{"/login": "2/30", "/api": [50, 60]}')
+    assert load_rate_limits() == {"/login": (2, 30.0), "/api": (50, 60.0), "default": (100, 60)}
+
+    config = tmp_path / "limits.json"
+    config.write_text('{"default": "500/60"}')
+    monkeypatch.delenv("RATE_LIMITS")
+    monkeypatch.setenv("RATE_LIMITS_FILE", str(config))
+    assert load_rate_limits() == {"default": (500, 60.0)}
+
+    config.write_text("not json")
+    assert load_rate_limits() == DEFAULT_RATE_LIMITS
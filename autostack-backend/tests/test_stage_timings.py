@@ -0,0 +1,51 @@
+"""
+Tests for deploy pipeline stage timings
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from backend.deploy_engine import DeployEngine
+from backend.metrics import registry
+from backend.stage_timings import DEPLOY_STAGE_SECONDS, StageTimings
+
+
+def test_stages_are_recorded_even_when_they_fail():
+    """Test a failing stage still gets a duration and a histogram sample"""
+    timings = StageTimings("test")
+    before = DEPLOY_STAGE_SECONDS.count(engine="test", stage="build")
+
+    with pytest.raises(RuntimeError):
+        with timings.stage("build"):
+            raise RuntimeError("kaniko exploded")
+    timings.record("push", 2.5)
+    timings.finish("failed")
+
+    assert DEPLOY_STAGE_SECONDS.count(engine="test", stage="build") == before + 1
+    assert set(timings.as_dict()) == {"build", "push", "total"}
+    assert timings.sum("build", "push") >= 2.5
+    assert 'autostack_deploy_stage_duration_seconds_count{engine="test",stage="push"}' in registry.render()
+
+
+@pytest.mark.asyncio
+async def test_docker_engine_reports_each_stage(tmp_path):
+    """Test build_and_deploy times the slot wait, build and container start"""
+    def build(path, tag, **kwargs):
+        yield {"stream": "Step 1/1 : FROM nginx\n"}
+        yield {"aux": {"ID": f"sha256:{tag}"}}
+
+    engine = DeployEngine()
+    engine.docker_client = SimpleNamespace(
+        api=SimpleNamespace(build=build),
+        images=SimpleNamespace(get=lambda tag: SimpleNamespace(id=tag)),
+        containers=SimpleNamespace(run=lambda **kwargs: SimpleNamespace(id="c1")),
+    )
+    engine.ports.probe = False
+    (tmp_path / "index.html").write_text("<h1>hi</h1>")
+
+    timings = StageTimings("docker")
+    success, info, error = await engine.build_and_deploy(str(tmp_path), "timed", "static", timings=timings)
+
+    assert success, error
+    assert {"build_wait", "dockerfile", "fingerprint", "build", "run"} <= set(info["stage_timings"])
@@ -0,0 +1,47 @@
+"""
+Tests for the TTL store backends
+"""
+
+import pytest
+
+from backend.utils.ttl_store import InMemoryTTLStore, RedisTTLStore
+
+
+@pytest.mark.asyncio
+async def test_counters_expire_after_their_window(fake_clock):
+    """Test a counter keeps its first TTL and expired keys are dropped"""
+    store = InMemoryTTLStore(clock=fake_clock)
+
+    assert [await store.incr("a", 10) for _ in range(3)] == [1, 2, 3]
+    fake_clock.now += 6
+    assert await store.incr("a", 10) == 4
+    assert await store.ttl("a") == pytest.approx(4)
+
+    await store.set("b", 1, 100)
+    fake_clock.now += 5
+    assert await store.get("a") is None
+    assert await store.incr("c", 10) == 1
+    assert len(store) == 2
+
+    await store.delete("b", "missing")
+    assert await store.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_store_matches_in_memory_semantics():
+    """Test the Redis backend counts, expires and deletes the same way"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+    client = fakeredis.FakeAsyncRedis()
+    store = RedisTTLStore(client=client, prefix="test:")
+
+    assert [await store.incr("a", 10) for _ in range(3)] == [1, 2, 3]
+    assert 0 < await store.ttl("a") <= 10
+    assert await store.get("a") == 3
+    assert await client.get("test:a") == b"3"
+
+    await store.set("b", 1, 0.5)
+    assert await store.ttl("b") <= 0.5
+    await store.delete("a", "b")
+    assert await store.get("a") is None
+    assert await store.ttl("b") is None